@@ -429,14 +429,21 @@ class MIDIMap:
         else:
             return status in self.midi_map
 
-Minilab2Map = MIDIMap()
-Minilab2Map.map_midi(*(eDefaultMidi.NOTE_ON().target(15,0,None).bytes_tuple()),
-                     midasstd.eCommand.pressed().status_id,
-                     midasstd.eCommand.pressed().command_id,
-                     bytes([0x00, 0x00, 0x00, 0x00])
-                )
-
-print(Minilab2Map.match(status=bytes([0x90]),port=bytes([0x0F]),note=bytes([0x00]),value=None))
+Minilab2Map = None
+
+def get_minilab2_map():
+    '''
+        Returns the Minilab2 MIDIMap, built on first use instead of when FL Studio imports the script.
+    '''
+    global Minilab2Map
+    if Minilab2Map is None:
+        Minilab2Map = MIDIMap()
+        Minilab2Map.map_midi(*(eDefaultMidi.NOTE_ON().target(15,0,None).bytes_tuple()),
+                             midasstd.eCommand.pressed().status_id,
+                             midasstd.eCommand.pressed().command_id,
+                             bytes([0x00, 0x00, 0x00, 0x00])
+                        )
+    return Minilab2Map
 
 def float_to_2int32(f):
     integer_part = int(f)
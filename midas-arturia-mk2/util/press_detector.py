@@ -0,0 +1,37 @@
+from util.timer import Timer
+
+
+class PressDetector:
+    """
+    Detects hold and double press gestures of a single button using timers on a `TimingWheel`.
+
+    Call `press` and `release` from the button handlers. `on_hold` is called once the
+    button has been held for `hold_duration`, `on_double_press` when a second press
+    follows within `double_press_interval` of the first one.
+    """
+
+    hold_duration = 0.5
+    double_press_interval = 0.3
+
+    def __init__(self, timing_wheel, *, on_hold=None, on_double_press=None):
+        self.on_hold = on_hold
+        self.on_double_press = on_double_press
+        self._hold_timer = Timer(timing_wheel, on_finished=self._handle_hold)
+        self._double_press_timer = Timer(timing_wheel)
+
+    def press(self):
+        if self._double_press_timer.running():
+            self._double_press_timer.stop()
+            if self.on_double_press:
+                self.on_double_press()
+        else:
+            self._double_press_timer.start(self.double_press_interval)
+        self._hold_timer.start(self.hold_duration)
+
+    def release(self):
+        self._hold_timer.stop()
+
+    def _handle_hold(self):
+        self._double_press_timer.stop()
+        if self.on_hold:
+            self.on_hold()
@@ -1,29 +1,23 @@
 class Scroller:
-    ticks_before_move = 6
+    delay_before_move = 0.3
 
-    def __init__(self, on_step, ticks_per_step):
+    def __init__(self, timing_wheel, on_step, seconds_per_step):
+        self.timing_wheel = timing_wheel
         self.on_step = on_step
-        self.ticks_per_step = ticks_per_step
-        self.num_ticks = 0
+        self.seconds_per_step = seconds_per_step
         self.active = False
+        self._handle = None
 
     def set_active(self):
-        self.num_ticks = 0
+        self.timing_wheel.cancel(self._handle)
         self.active = True
+        self._handle = self.timing_wheel.schedule(self.delay_before_move, self._step)
 
     def set_not_active(self):
         self.active = False
+        self.timing_wheel.cancel(self._handle)
+        self._handle = None
 
-    def tick(self):
-        if not self.active:
-            return
-
-        self.num_ticks += 1
-        if self._tick_matches_step(self.num_ticks):
-            self.on_step()
-
-    def _tick_matches_step(self, tick):
-        tick = tick - self.ticks_before_move
-        if tick < 0:
-            return False
-        return tick % self.ticks_per_step == 0
+    def _step(self):
+        self._handle = self.timing_wheel.schedule(self.seconds_per_step, self._step)
+        self.on_step()
@@ -1,27 +1,27 @@
 class Timer:
-    def __init__(self, action_dispatcher, *, on_finished=None):
-        self.action_dispatcher = action_dispatcher
+    def __init__(self, timing_wheel, *, on_finished=None):
+        self.timing_wheel = timing_wheel
         self.on_finished = on_finished
-        self.duration_in_timer_events = 0
-        self.number_of_events_passed = self.duration_in_timer_events
+        self._handle = None
+        self._finished = True
 
-    def start(self, duration_in_timer_events):
-        self.duration_in_timer_events = duration_in_timer_events
-        self.number_of_events_passed = 0
-        self.action_dispatcher.subscribe(self)
+    def start(self, duration_in_seconds):
+        self.stop()
+        self._finished = False
+        self._handle = self.timing_wheel.schedule(duration_in_seconds, self._handle_duration_reached)
 
     def stop(self):
-        self.action_dispatcher.unsubscribe(self)
+        self.timing_wheel.cancel(self._handle)
+        self._handle = None
+
+    def running(self):
+        return self._handle is not None
 
     def finished(self):
-        return self.number_of_events_passed >= self.duration_in_timer_events
+        return self._finished
 
     def _handle_duration_reached(self):
-        self.stop()
+        self._handle = None
+        self._finished = True
         if self.on_finished:
             self.on_finished()
-
-    def handle_TimerEventAction(self, action):
-        self.number_of_events_passed += 1
-        if self.finished():
-            self._handle_duration_reached()
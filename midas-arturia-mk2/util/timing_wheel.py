@@ -0,0 +1,142 @@
+import math
+import time
+
+
+class TimerHandle:
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self._slot = None
+
+    def active(self):
+        return self._slot is not None
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel driven by a monotonic clock.
+
+    Scheduling and cancelling a timer is O(1). Advancing the wheel only touches the
+    timers that expire, plus an occasional cascade of a higher level slot into the
+    levels below it. Timers that are further away than the wheel can hold are parked
+    until the top level wraps around.
+
+    The wheel can be advanced from `OnIdle` by calling `advance`, or by subscribing it
+    to an `ActionDispatcher` so that every `TimerEventAction` advances it once.
+    """
+
+    def __init__(self, *, tick_duration=0.01, slot_bits=6, num_levels=4, clock=time.monotonic):
+        """
+        Args:
+            tick_duration: Resolution of the wheel in seconds.
+            slot_bits: Each level has 2 ** slot_bits slots.
+            num_levels: Number of levels in the hierarchy.
+            clock: Monotonic clock returning seconds.
+        """
+        self.tick_duration = tick_duration
+        self._slot_bits = slot_bits
+        self._slot_mask = (1 << slot_bits) - 1
+        self._num_levels = num_levels
+        self._clock = clock
+        self._start_time = clock()
+        self._current_tick = 0
+        self._num_timers = 0
+        self._levels = [[{} for _ in range(1 << slot_bits)] for _ in range(num_levels)]
+        self._overflow = {}
+
+    def schedule(self, delay_in_seconds, callback):
+        """
+        Call `callback` once `delay_in_seconds` have passed.
+
+        Returns:
+            A `TimerHandle` that can be passed to `cancel`.
+        """
+        deadline = self._current_tick + max(1, math.ceil(delay_in_seconds / self.tick_duration - 1e-9))
+        handle = TimerHandle(deadline, callback)
+        self._insert(handle, self._current_tick + 1)
+        self._num_timers += 1
+        return handle
+
+    def cancel(self, handle):
+        """
+        Cancel a scheduled timer. Cancelling an expired or cancelled timer does nothing.
+        """
+        if handle is None or handle._slot is None:
+            return
+        del handle._slot[handle]
+        handle._slot = None
+        self._num_timers -= 1
+
+    def pending(self):
+        return self._num_timers
+
+    def advance(self, now=None):
+        """
+        Advance the wheel to the current time, calling the callbacks of all expired timers.
+
+        Args:
+            now: Current time of the clock, read from the clock if not given.
+        """
+        if now is None:
+            now = self._clock()
+        # Small epsilon so that float rounding never holds a tick back a whole tick.
+        target_tick = int((now - self._start_time) / self.tick_duration + 1e-9)
+
+        while self._current_tick < target_tick:
+            if self._num_timers == 0:
+                # Nothing can expire, jump straight to the target tick.
+                self._current_tick = target_tick
+                return
+            self._tick()
+
+    def handle_TimerEventAction(self, action):
+        self.advance()
+
+    def _insert(self, handle, earliest_tick):
+        # Re-inserts during a tick may land on the current tick: its level 0 slot is expired after them.
+        deadline = max(handle.deadline, earliest_tick)
+        for level in range(self._num_levels):
+            shift = self._slot_bits * (level + 1)
+            # The lowest level whose parent block holds both the current tick and the deadline.
+            if (deadline >> shift) == (self._current_tick >> shift):
+                slot = self._levels[level][(deadline >> (self._slot_bits * level)) & self._slot_mask]
+                break
+        else:
+            slot = self._overflow
+        slot[handle] = None
+        handle._slot = slot
+
+    def _cascade(self, level, index):
+        slots = self._levels[level]
+        handles = slots[index]
+        slots[index] = {}
+        for handle in handles:
+            self._insert(handle, self._current_tick)
+
+    def _tick(self):
+        self._current_tick += 1
+        tick = self._current_tick
+
+        if tick & ((1 << (self._slot_bits * self._num_levels)) - 1) == 0:
+            overflow = self._overflow
+            self._overflow = {}
+            for handle in overflow:
+                self._insert(handle, tick)
+
+        # Cascade from the highest level down, so timers can fall through several levels in one tick.
+        for level in range(self._num_levels - 1, 0, -1):
+            shift = self._slot_bits * level
+            if tick & ((1 << shift) - 1) == 0:
+                self._cascade(level, (tick >> shift) & self._slot_mask)
+
+        slots = self._levels[0]
+        index = tick & self._slot_mask
+        expired = slots[index]
+        if not expired:
+            return
+        slots[index] = {}
+        for handle in expired:
+            handle._slot = None
+            self._num_timers -= 1
+        for handle in expired:
+            handle.callback()
@@ -54,25 +54,50 @@
 
 import time
 
-### import midas scripts as needed
-import midas.hardware.apc40.app
-import midas.system
-import midas.device
-from midas.hardware.apc40.data import BUTTON_LED_OUT_DATA
-from midas.hardware.apc40.data import CONTROL_LED_OUT_DATA
+# Startup profiler, measures the imports below and OnInit. The report is printed at the end of OnInit.
+import midaslib.startup
+StartupProfiler = midaslib.startup.MidasStartupProfiler()
 
-import flsl.device
+### import midas scripts as needed
+with StartupProfiler.measure("import midas.hardware.apc40.app"):
+	import midas.hardware.apc40.app
+with StartupProfiler.measure("import midas.system"):
+	import midas.system
+with StartupProfiler.measure("import midas.device"):
+	import midas.device
+with StartupProfiler.measure("import midaslib"):
+	import midaslib.beat
+	import midaslib.event
+	import midaslib.fill
+	import midaslib.grid
+	import midaslib.journal
+	import midaslib.led
+	import midaslib.pattern
+	import midaslib.pickup
+	import midaslib.playhead
+	import midaslib.rack
+	import midaslib.ring
+	import midaslib.scheduler
+	import midaslib.writes
+with StartupProfiler.measure("import midas.hardware.apc40.data"):
+	from midas.hardware.apc40.data import BUTTON_LED_OUT_DATA
+	from midas.hardware.apc40.data import CONTROL_LED_OUT_DATA
+	from midas.hardware.apc40.data import APC40_MODE_GENERIC, APC40_MODE_ABLETON_LIVE, APC40_MODE_ALTERNATE_ABLETON_LIVE
+	from midas.hardware.apc40.data import APC40_RINGS_TRACK_CONTROL, APC40_RINGS_DEVICE_CONTROL, apc40_introduction_sysex
+
+with StartupProfiler.measure("import flsl.device"):
+	import flsl.device
 ### Import fl studio scripts as needed
 #import device as flsl.device
 # import playlist as flslPlaylist
 import channels as flslChannels
-# import mixer as flslMixer
-# import patterns as flslPatterns
+import mixer as flslMixer
+import patterns as flslPatterns
 # import arrangement as flslArrangement
 # import ui as flslUi
 import transport as flslTransport
 # import device as flsl.device
-# import general as flslGeneral
+import general as flslGeneral
 # import launchMapPages as flslLaunchMapPages 
 # import midi	as flslMidi # The script will use MIDI functions.  
 import midi
@@ -85,54 +110,157 @@ DrumPadFuncCCVPPControl_State = 0 # Current Channel Volume Pan Pitch Control 0=V
 DrumPadTargetChannel = 0
 DrumPadTargetChannelOffset = 0
 
+# Midas OS, owns the services that are advanced from OnIdle.
+MidasOperatingSystem = midaslib.event.MidasOS()
+MidasOperatingSystem.beat_scheduler = midaslib.beat.MidasBeatScheduler(flslMixer.getSongTickPos,flslGeneral.getRecPPQ,flslMixer.getCurrentTempo,flslTransport.isPlaying)
+GridCache = midaslib.grid.MidasGridCache(flslChannels.getGridBit,flslChannels.setGridBit) # Step grid of the channels, redraws read from here instead of FL Studio.
+MidasOperatingSystem.journal = midaslib.journal.MidasGridJournal(GridCache,flslPatterns.patternNumber) # Undo history of the pad and fill edits
+MidasOperatingSystem.grid_cache = GridCache # Batches of grid writes from MidasOperatingSystem.grid_batch() go through the cache
+ChannelRack = midaslib.rack.MidasChannelRack(flslChannels.channelCount,flslChannels.getChannelIndex,flslChannels.getChannelName,flslChannels.getChannelColor,flslChannels.isChannelMuted,flslChannels.isChannelSolo,flslChannels.getChannelVolume,flslChannels.getChannelPan,flslChannels.getChannelPitch) # Channel rack metadata, navigation reads from here instead of FL Studio.
+ChannelRackLoadTask = None # Task reading the whole channel rack in OnIdle, restarted after a project is loaded.
+ChannelKnobPickup = midaslib.pickup.MidasPickup(lambda key: ReadChannelKnobValue(*key),lambda key,value: QueueChannelKnobValue(*key,value)) # Soft takeover of the channel volume, pan and pitch knob.
+MidasOperatingSystem.writes.register(midaslib.writes.MIDAS_WRITE_KIND_CHANNEL,lambda channel,param,value: WriteChannelValue(channel,param,value)) # Channel setters, called at most 60 times per second per target
+PatternCache = midaslib.pattern.MidasPatternCache(flslPatterns.patternNumber,flslPatterns.getPatternLength,flslPatterns.getPatternName,flslPatterns.getPatternColor) # Pattern number, length, name and colour, paging stops at the end of the pattern.
+DrumPadNeighboursTask = None # Task reading the previous and next drum pad windows into the grid cache.
+FillMasks = midaslib.fill.MidasFillMasks() # Step masks of the fill buttons
+LedState = midaslib.led.MidasLedState(flsl.device.midi_out_msg_params) # Last value sent to every LED, only changes are sent.
+AkaiAPC40Mode = APC40_MODE_GENERIC # Introduction mode sent in OnInit, the APC40 starts in generic mode
+AkaiAPC40RingModes = {
+	APC40_MODE_GENERIC: midaslib.ring.MIDAS_RING_MODE_DEVICE, # the rings follow the knobs, styles reset to single
+	APC40_MODE_ABLETON_LIVE: midaslib.ring.MIDAS_RING_MODE_DEVICE, # the rings follow the knobs, the host may update them
+	APC40_MODE_ALTERNATE_ABLETON_LIVE: midaslib.ring.MIDAS_RING_MODE_HOST, # the host draws every ring
+}
+LedRings = midaslib.ring.MidasLedRings(LedState,APC40_RINGS_TRACK_CONTROL + APC40_RINGS_DEVICE_CONTROL,AkaiAPC40RingModes[AkaiAPC40Mode]) # Style and value of the knob rings, sent once per frame from OnIdle.
+TestLEDSweepTask = None # Task of the LED test sweep started by OnRefresh, cancelled when a new sweep starts.
+DrumPadWindowHash = None # Hash of the steps last drawn on the drum pads, refreshes that leave it unchanged are skipped.
+Playhead = midaslib.playhead.MidasPlayhead(MidasOperatingSystem.beat_scheduler,lambda step: FollowAkaiAPC40Playhead(),get_steps=PatternCache.steps) # Step under the song position wrapped by the pattern, advanced by the beat scheduler.
+PlayheadLEDValue = 5 # Yellow, the pad under the playhead
+
 # def ClearAkaiAPC40DrumPadLEDs(value):
 # 	for row in range(4):  # Iterate over each row
 # 		for col in range(8):  # Iterate over each column in the row
 # 			# Access the LED in the current row and column
 # 			flsl.device.midi_out_msg_params(144,0+col,53+row,value)
 
-# def UpdateAkaiAPC40DrumPadLEDs(channel,zoom,offset):
-# 	print("Updating AKAI APC 40 Drumpad LEDs to Channel : ",DrumPadTargetChannel, "Zoom :", ZoomLevel , "Index 0")
-# 	for row in range(4):  # Iterate over each row
-# 		for col in range(8):  # Iterate over each column in the row
-# 			# Access the LED in the current row and column
-# 			if(flslChannels.getGridBit(channel,((((col)*zoom)) + ((row)*8)*zoom) + ((offset * 32)*zoom)) > 0) : # Check if the grid bit is on.
-# 				flsl.device.midi_out_msg_params(144,0+col,53+row,3)	# Turn the LED on		
-# 			else : # the bit is off
-# 				flsl.device.midi_out_msg_params(144,0+col,53+row,0)	#update the led	
-
-# def updateZoomLevel():
-# 	global ZoomLevel
-# 	print("Updating Zoom Level of Channel Drum Pads...",ZoomLevel)
-# 	if ZoomLevel == 1:
-# 		ZoomLevel = 2
-# 		UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-# 		return ZoomLevel
-# 	if ZoomLevel == 2:
-# 		ZoomLevel = 4
-# 		UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-# 		return ZoomLevel
-# 	if ZoomLevel == 4:
-# 		ZoomLevel = 8
-# 		UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-# 		return ZoomLevel
-# 	if ZoomLevel == 8:
-# 		ZoomLevel = 1
-# 		UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-# 		return ZoomLevel
-
-# def UpdateAkaiAPC40DrumPadFunctionLEDs():
-# 	print("Updating AKAI APC 40 Drumpad Function LEDs")
-# 	flsl.device.midi_out_msg_params(144,0,57,5) # Zoom Level
-# 	flsl.device.midi_out_msg_params(144,1,57,5) # Prev Channel
-# 	flsl.device.midi_out_msg_params(144,2,57,5) # Next Channel
-# 	flsl.device.midi_out_msg_params(144,3,57,5) # Prev Index
-# 	flsl.device.midi_out_msg_params(144,4,57,5) # Next Index
+def GetAkaiAPC40DrumPadWindowHash(channel,zoom,offset):
+	return GridCache.window_hash(channel,(offset * 32)*zoom,32*zoom)
+
+def UpdateAkaiAPC40DrumPadLEDs(channel,zoom,offset):
+	global DrumPadWindowHash
+	print("Updating AKAI APC 40 Drumpad LEDs to Channel : ",DrumPadTargetChannel, "Zoom :", ZoomLevel , "Index 0")
+	DrumPadWindowHash = GetAkaiAPC40DrumPadWindowHash(channel,zoom,offset)
+	window = GridCache.get_window(channel,(offset * 32)*zoom,32*zoom) # Steps shown on the pads, read from the cache
+	playhead_pad = Playhead.locate((offset * 32)*zoom,32,zoom) # None if the playhead is stopped or on another page
+	for row in range(4):  # Iterate over each row
+		for col in range(8):  # Iterate over each column in the row
+			# Access the LED in the current row and column
+			if (row*8) + col == playhead_pad:
+				LedState.set(144,0+col,53+row,PlayheadLEDValue) # The playhead is drawn over the step
+			elif (window >> (((col)*zoom) + ((row)*8)*zoom)) & 1 : # Check if the grid bit is on.
+				LedState.set(144,0+col,53+row,3)	# Turn the LED on, only sent if the pad changed since the last frame
+			else : # the bit is off
+				LedState.set(144,0+col,53+row,0)	#update the led	
+	RestartAkaiAPC40DrumPadNeighbours(channel,zoom,offset)
+
+def PrerenderAkaiAPC40DrumPadNeighbours(channel,zoom,offset):
+	# Task: reads the next and previous windows into the grid cache, paging to them then only costs the LED diff.
+	for neighbour in (offset + 1, offset - 1):
+		if 0 <= neighbour < PatternCache.page_count(32*zoom):
+			GridCache.get_window(channel,(neighbour * 32)*zoom,32*zoom)
+			yield
+
+def RestartAkaiAPC40DrumPadNeighbours(channel,zoom,offset):
+	global DrumPadNeighboursTask
+	MidasOperatingSystem.scheduler.cancel(DrumPadNeighboursTask)
+	DrumPadNeighboursTask = MidasOperatingSystem.scheduler.spawn(PrerenderAkaiAPC40DrumPadNeighbours(channel,zoom,offset),midaslib.scheduler.MIDAS_TASK_PRIORITY_LOW,"PrerenderAkaiAPC40DrumPadNeighbours")
+
+def FollowAkaiAPC40Playhead():
+	global DrumPadTargetChannelOffset
+	# Called by the playhead on every step while the transport plays
+	start, previous, pad = Playhead.follow((DrumPadTargetChannelOffset * 32)*ZoomLevel,32,ZoomLevel)
+	if start != (DrumPadTargetChannelOffset * 32)*ZoomLevel:
+		DrumPadTargetChannelOffset = PatternCache.clamp_page(start // (32*ZoomLevel),32*ZoomLevel) # The playhead left the pads, page to it and repaint
+		UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+		UpdateAkaiAPC40DrumPadFunctionLEDs() # Prev and Next Index follow the page
+	elif previous != pad:
+		# At most two messages per step: restore the old pad from the cached grid and highlight the new one
+		if previous is not None:
+			LedState.set(144,previous % 8,53 + (previous // 8),3 if GridCache.get_bit(DrumPadTargetChannel,start + (previous*ZoomLevel)) else 0)
+		if pad is not None:
+			LedState.set(144,pad % 8,53 + (pad // 8),PlayheadLEDValue)
+
+def ReadChannelKnobValue(channel,param):
+	# Value of the channel volume, pan or pitch, 0 to 1. Pan and pitch are stored from -1 to 1.
+	queued = MidasOperatingSystem.writes.get(midaslib.writes.MIDAS_WRITE_KIND_CHANNEL,channel,param)
+	if queued is not None:
+		return queued # Not flushed yet, an OnDirtyChannel before the flush makes the mirror read the older FL Studio value
+	if param == 0:
+		return ChannelRack.volume(channel)
+	elif param == 1:
+		return (ChannelRack.pan(channel) + 1) / 2
+	return (ChannelRack.pitch(channel) + 1) / 2
+
+def QueueChannelKnobValue(channel,param,value):
+	# Called by the pickup, the mirror is updated at once and FL Studio from OnIdle
+	if param == 0:
+		ChannelRack.set_volume(channel,value)
+	elif param == 1:
+		ChannelRack.set_pan(channel,(value*2)-1)
+	elif param == 2:
+		ChannelRack.set_pitch(channel,(value*2)-1)
+	MidasOperatingSystem.writes.queue(midaslib.writes.MIDAS_WRITE_KIND_CHANNEL,channel,param,value)
+
+def WriteChannelValue(channel,param,value):
+	# Flushed by MidasOperatingSystem.writes, only the last value of a sweep is written
+	if param == midaslib.writes.MIDAS_WRITE_PARAM_VOLUME:
+		flslChannels.setChannelVolume(ChannelRack.global_index(channel),value)
+	elif param == midaslib.writes.MIDAS_WRITE_PARAM_PAN:
+		flslChannels.setChannelPan(ChannelRack.global_index(channel),(value*2)-1)
+	elif param == midaslib.writes.MIDAS_WRITE_PARAM_PITCH:
+		flslChannels.setChannelPitch(ChannelRack.global_index(channel),(value*2)-1)
+
+def UpdateAkaiAPC40ChannelKnob():
+	# Show the cached value of the target on the Track Control 1 knob ring, sent with the next frame if it changed
+	# Ring type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
+	LedRings.set(0,int(ReadChannelKnobValue(DrumPadTargetChannel,DrumPadFuncCCVPPControl_State)*127.0),2 if DrumPadFuncCCVPPControl_State == 0 else 3)
+
+def SetAkaiAPC40Mode(mode):
+	global AkaiAPC40Mode
+	# Introduce the script to the APC40, every ring is sent again in the new mode
+	AkaiAPC40Mode = mode
+	flsl.device.midi_out_sysex(apc40_introduction_sysex(mode))
+	LedRings.set_mode(AkaiAPC40RingModes[mode])
+
+def updateZoomLevel():
+	global ZoomLevel
+	global DrumPadTargetChannelOffset
+	print("Updating Zoom Level of Channel Drum Pads...",ZoomLevel)
+	if ZoomLevel == 1:
+		ZoomLevel = 2
+	elif ZoomLevel == 2:
+		ZoomLevel = 4
+	elif ZoomLevel == 4:
+		ZoomLevel = 8
+	else:
+		ZoomLevel = 1
+	DrumPadTargetChannelOffset = PatternCache.clamp_page(DrumPadTargetChannelOffset,32*ZoomLevel) # zoomed out, the pattern may fill fewer pages
+	UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+	return ZoomLevel
+
+def UpdateAkaiAPC40DrumPadFunctionLEDs():
+	print("Updating AKAI APC 40 Drumpad Function LEDs")
+	LedState.set(144,0,57,1 if ZoomLevel == 1 else 5) # Zoom Level, green when we are at zoom level 1
+	LedState.set(144,1,57,5) # Prev Channel
+	LedState.set(144,2,57,5) # Next Channel
+	LedState.set(144,3,57,5 if DrumPadTargetChannelOffset > 0 else 0) # Prev Index, off on the first page
+	LedState.set(144,4,57,5 if DrumPadTargetChannelOffset < PatternCache.page_count(32*ZoomLevel) - 1 else 0) # Next Index, off on the last page of the pattern
 
 def OnInit():
+	StartupProfiler.begin("OnInit")
 	# Check for Linked and Dispatch FL Studio Devices
 	if not flsl.device.is_assigned() :
 		print("[FATAL ERROR] Device not linked. In Fl Studio MIDI Setting, set the input and output target channels of the device to the same channel.")
+		StartupProfiler.end("OnInit")
 		return False # Stop initializing device module
 	else: 
 		# Begin initialization
@@ -147,46 +275,83 @@ def OnInit():
 
 	print("Initialization OK")
 	# ClearAkaiAPC40DrumPadLEDs(0)
-	# UpdateAkaiAPC40DrumPadLEDs(0,1,0)
-	# UpdateAkaiAPC40DrumPadFunctionLEDs()
+	LedState.invalidate() # The device state is unknown, send the first frame in full
+	SetAkaiAPC40Mode(AkaiAPC40Mode)
+	UpdateAkaiAPC40ChannelKnob()
+	UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+	UpdateAkaiAPC40DrumPadFunctionLEDs()
+	RestartChannelRackLoad()
+	Playhead.start()
+	StartupProfiler.end("OnInit")
+	StartupProfiler.report()
     # CR_HighlightChannels = 1
     #flslUi.crDisplayRect(32,0,64,1, flslMidi.MaxInt)
     #flslUi.cut()
 	
 def OnDeInit():
 	print("Deinitializing script")
+	Playhead.stop()
+	MidasOperatingSystem.on_deinit()
+
+def SweepAkaiAPC40TestLEDs():
+	# Task: yields after every message so the sweep is spread over as many OnIdle ticks as needed.
+	# Testing buttons by turning all led on or off on referesh
+	for btn in BUTTON_LED_OUT_DATA:
+		LedState.set(144,btn["channel"],btn["id"],127)
+		yield
+	# testing controllers by setting all values to 127
+	for cntrl in CONTROL_LED_OUT_DATA:
+		LedState.set(176,cntrl["channel"],cntrl["id"],127)
+		yield
+
+def RestartChannelRackLoad():
+	global ChannelRackLoadTask
+	# Read the whole channel rack in the background, a few channels per OnIdle tick.
+	MidasOperatingSystem.scheduler.cancel(ChannelRackLoadTask)
+	ChannelRackLoadTask = MidasOperatingSystem.scheduler.spawn(ChannelRack.loader(),midaslib.scheduler.MIDAS_TASK_PRIORITY_LOW,"ChannelRack.loader")
+
+def OnProjectLoad(status):
+	# 0 = load started, 100 = load finished, 101 = load failed
+	if status == 100:
+		ChannelRack.invalidate_all()
+		RestartChannelRackLoad()
+
+def OnDirtyChannel(index,flag):
+	# Drop the cached steps and metadata of the changed channel(s)
+	GridCache.on_dirty_channel(index,flag)
+	ChannelRack.on_dirty_channel(index,flag)
+	if not ChannelRack.is_loaded():
+		RestartChannelRackLoad() # read the dropped channels again in OnIdle
 
 def OnRefresh(flags):
+	global TestLEDSweepTask
+	global DrumPadTargetChannelOffset
+	GridCache.on_refresh(flags)
+	ChannelRack.on_refresh(flags)
+	PatternCache.on_refresh(flags)
+	if not ChannelRack.is_loaded():
+		RestartChannelRackLoad()
+	if ((flags & 256) == 256) and Playhead.step is not None and not flslTransport.isPlaying(): # HW_Dirty_LEDs	256	the transport stopped
+		Playhead.step = None
+		FollowAkaiAPC40Playhead() # restore the highlighted pad
 	if ((flags & 1024) == 1024): # HW_Dirty_Patterns	1024	pattern changes
+		DrumPadTargetChannelOffset = PatternCache.clamp_page(DrumPadTargetChannelOffset,32*ZoomLevel) # the new pattern may be shorter
+		UpdateAkaiAPC40DrumPadFunctionLEDs()
+		if GetAkaiAPC40DrumPadWindowHash(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset) == DrumPadWindowHash:
+			return # The steps on the pads did not change, skip the repaint and the sweep
 		UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-		# Testing buttons by turning all led on or off on referesh
-		for btn in BUTTON_LED_OUT_DATA:
-			flsl.device.midi_out_msg_params(144,btn["channel"],btn["id"],127)
-		# testing controllers by setting all values to 127
-		for cntrl in CONTROL_LED_OUT_DATA:
-			flsl.device.midi_out_msg_params(176,cntrl["channel"],cntrl["id"],127)
-
-# CurrentTime = time.monotonic()
-# AccumDiff = 0
-
-# def OnIdle():
-# 	global CurrentTime
-# 	global AccumDiff
-# 	LastTime = CurrentTime
-# 	CurrentTime = time.monotonic()
-# 	TimeDiff = CurrentTime - LastTime
-# 	AccumDiff += TimeDiff
-
-# 	if AccumDiff > 1.0:
-# 		Overtime = AccumDiff - 1.0 # (optional) Respond to overtime
-# 		print("This print is delayed by:", Overtime ," Seconds!")  
-# 		# Reset our accumulated time
-# 		AccumDiff = 0
-# 		# Do something every X seconds
-# 		print("Printing............")
-# 	else:
-# 		# Continue accumulating time (pass)
-# 		print("Not gonna print yet.")
+		# Restart the test sweep in the background instead of blocking the refresh callback.
+		MidasOperatingSystem.scheduler.cancel(TestLEDSweepTask)
+		TestLEDSweepTask = MidasOperatingSystem.scheduler.spawn(SweepAkaiAPC40TestLEDs(),midaslib.scheduler.MIDAS_TASK_PRIORITY_LOW,"SweepAkaiAPC40TestLEDs")
+
+def OnIdle():
+	# Advance the Midas OS services, each tick only spends the scheduler budget.
+	LedRings.render() # the knob rings that changed since the last frame
+	MidasOperatingSystem.on_idle() # also writes the queued knob values, at most 60 times per second
+
+def OnUpdateBeatIndicator(value):
+	# 0 = off, 1 = bar, 2 = beat. Used by the beat scheduler to correct drift.
+	MidasOperatingSystem.on_update_beat_indicator(value)
 
 def OnMidiIn(event):
 	print("Recieved Midi Input : ",'\n')
@@ -197,43 +362,35 @@ def OnMidiMsg(event):
 	global DrumPadTargetChannel
 	global DrumPadTargetChannelOffset
 	global DrumPadFuncCCVPPControl_State
+	global DrumPadWindowHash
 	
 	event.handled = True					# If the script does not recognize the event, do nothing. It's then passed onto FL Studio to use. 
 	#print("*********EVENT OCCURED:", "id:",event.midiId,"channel:",event.midiChan,"data1:" ,event.data1,"status:",event.status)		# Prints the data recieved to the 'Script output' window				
 	if event.data2 > 0:														# If there is data in the second byte 		
 		# Handle MIDI CC Events
 		if event.data1 == 48 and event.midiChan == 0: # Channel Volume CC Control
-			if DrumPadFuncCCVPPControl_State == 0: # Targeting Volume Knob
-				flslChannels.setChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel),event.data2/127.0) # set the volume in fl studio
-				flsl.device.midi_out_msg_params(176,0,48,event.data2) 				# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-
-			elif DrumPadFuncCCVPPControl_State == 1: # Targeting Pan Knob
-				flslChannels.setChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
-				flsl.device.midi_out_msg_params(176,0,48,event.data2)
-
-			elif DrumPadFuncCCVPPControl_State == 2: # Targeting Pitch Knob
-				flslChannels.setChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
-				flsl.device.midi_out_msg_params(176,0,48,event.data2)
+			# Volume, pan or pitch of the target channel: ignored until the knob reaches the cached value, then written from OnIdle
+			if ChannelKnobPickup.move((DrumPadTargetChannel,DrumPadFuncCCVPPControl_State),event.data2/127.0):
+				LedRings.set(0,event.data2) 				# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
+			LedRings.on_knob(0,event.data2) # until the knob picks the value up its ring shows the cached value again
 
 		# Handle MIDI Note Events
 		if event.midiId == 128:
 			if event.data1 > 52 and event.data1 < 57:	#if its a released event of the pad buttons
 																				# flslChannels.getGridBit(channel,(((col)*zoom)) + ((row)*8)*zoom) > 0
 				currGridBit = (((event.midiChan)*ZoomLevel)) + (((event.data1 - 53)*8)*ZoomLevel) + ((DrumPadTargetChannelOffset * 32)*ZoomLevel)		# Check if the current pad is on, using flslChannels.getGridBit() int index, int position, get grid bit value at "position" for channel at "index".
-				if(flslChannels.getGridBit(DrumPadTargetChannel,currGridBit) > 0) :					# if bit is above 0 then its on
-					flslChannels.setGridBit(DrumPadTargetChannel,currGridBit,0)						# Turn the bit off	
-					flsl.device.midi_out_msg_params(144,event.midiChan,event.data1,0)			#update the led			
+				if(GridCache.get_bit(DrumPadTargetChannel,currGridBit) > 0) :					# if bit is above 0 then its on
+					MidasOperatingSystem.journal.set_bit(DrumPadTargetChannel,currGridBit,0)						# Turn the bit off, recorded for undo
+					LedState.set(144,event.midiChan,event.data1,0)			#update the led			
 				else :															# the bit is off
-					flslChannels.setGridBit(DrumPadTargetChannel,currGridBit,1)						# set the bit on using flslChannels.setGridBit	int index, int position, int value Set grid bit value at "position" for channel at "index".
-					flsl.device.midi_out_msg_params(144,event.midiChan,event.data1,3)			#update the led				
+					MidasOperatingSystem.journal.set_bit(DrumPadTargetChannel,currGridBit,1)						# set the bit on using flslChannels.setGridBit	int index, int position, int value Set grid bit value at "position" for channel at "index".
+					LedState.set(144,event.midiChan,event.data1,3)			#update the led				
+				DrumPadWindowHash = GetAkaiAPC40DrumPadWindowHash(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset) # The pads show the toggle, its own pattern refresh is then skipped
 				event.handled = True											# Flag the event was handled so it does not go to FL Studio and get used twice.
 			
 			if event.data1 == 57 and event.midiChan == 0: # Zoom Level Button
-				# updateZoomLevel()
-				# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-				# UpdateAkaiAPC40DrumPadFunctionLEDs()
-				if ZoomLevel == 1: # Set the LED to green when we are at zoom level 1
-						flsl.device.midi_out_msg_params(144,0,57,1) # Prev Channel(1)
+				updateZoomLevel()
+				UpdateAkaiAPC40DrumPadFunctionLEDs() # Sets the LED to green when we are at zoom level 1
 
 			if event.data1 == 57 and event.midiChan == 1: # Previous Channel Button
 				if(DrumPadTargetChannel > 0):
@@ -241,12 +398,12 @@ def OnMidiMsg(event):
 					# Set the selected channel to the selected channel in FL Studio
 					# selectOneChannel	int index	-	Select channel at "index" exclusively.
 					# getChannelIndex	int index	int	Returns 'indexGlobal' for channel at "index" (respecting the groups).
-					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", flslChannels.getChannelIndex(DrumPadTargetChannel))
-					flslChannels.selectOneChannel(flslChannels.getChannelIndex(DrumPadTargetChannel))
+					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", ChannelRack.global_index(DrumPadTargetChannel))
+					flslChannels.selectOneChannel(ChannelRack.global_index(DrumPadTargetChannel))
 
 					# Update the LEDs
-					# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-					# UpdateAkaiAPC40DrumPadFunctionLEDs()
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+					UpdateAkaiAPC40DrumPadFunctionLEDs()
 					#if DrumPadTargetChannel == 0: # Set the next button led to green when we are on the first channel
 						#SetAkaiAPC40DrumPadFunctionLED_PrevChannel(1) 
 					# set the next button led to green when we are on the last channel
@@ -255,49 +412,35 @@ def OnMidiMsg(event):
 
 					print("Current Drum Pad Channel:",DrumPadTargetChannel)
 				else: # The channel is 0 or less, warp back to the last channel in the current group
-					DrumPadTargetChannel = flslChannels.channelCount() - 1
+					DrumPadTargetChannel = ChannelRack.count() - 1
 					# Set the selected channel to the selected channel in FL Studio
 					# selectOneChannel	int index	-	Select channel at "index" exclusively.
 					# getChannelIndex	int index	int	Returns 'indexGlobal' for channel at "index" (respecting the groups).
-					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", flslChannels.getChannelIndex(DrumPadTargetChannel))
-					flslChannels.selectOneChannel(flslChannels.getChannelIndex(DrumPadTargetChannel))
-					# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-					# UpdateAkaiAPC40DrumPadFunctionLEDs()
+					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", ChannelRack.global_index(DrumPadTargetChannel))
+					flslChannels.selectOneChannel(ChannelRack.global_index(DrumPadTargetChannel))
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+					UpdateAkaiAPC40DrumPadFunctionLEDs()
 					#if DrumPadTargetChannel == (flslChannels.channelCount()-1): # set the next button led to green when we are on the last channel
 						#SetAkaiAPC40DrumPadFunctionLED_NextChannel(1)
 
 					#print("Current Drum Pad Channel:",DrumPadTargetChannel)
 				
-				# Update the CCVPPControl
-				if DrumPadFuncCCVPPControl_State == 0: # Targeting volume knob
-					# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-					flsl.device.midi_out_msg_params(176,0,48,int(flslChannels.getChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel))*127.0))
-					# Update the type  Track Control 1 Knob Type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
-					flsl.device.midi_out_msg_params(176,0,0x38,2)
-				elif DrumPadFuncCCVPPControl_State == 1: # Targeting Pan knob
-					# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-					flsl.device.midi_out_msg_params(176,0,48,int(flslChannels.getChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel))*127.0))
-					# Update the type  Track Control 1 Knob Type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
-					flsl.device.midi_out_msg_params(176,0,0x38,3)
-				elif DrumPadFuncCCVPPControl_State == 2: # Targeting Pitch knob
-					# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-					flsl.device.midi_out_msg_params(176,0,48,int(flslChannels.getChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel))*127.0))
-					# Update the type  Track Control 1 Knob Type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
-					flsl.device.midi_out_msg_params(176,0,0x38,3)
+				# Update the CCVPPControl from the channel rack mirror
+				UpdateAkaiAPC40ChannelKnob()
 
 			if event.data1 == 57 and event.midiChan == 2: # Next Channel Button
-				if DrumPadTargetChannel < (flslChannels.channelCount()-1):
+				if DrumPadTargetChannel < (ChannelRack.count()-1):
 					DrumPadTargetChannel = DrumPadTargetChannel + 1
 
 					# Set the selected channel to the selected channel in FL Studio
 					# selectOneChannel	int index	-	Select channel at "index" exclusively.
 					# getChannelIndex	int index	int	Returns 'indexGlobal' for channel at "index" (respecting the groups).
-					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", flslChannels.getChannelIndex(DrumPadTargetChannel))
-					flslChannels.selectOneChannel(flslChannels.getChannelIndex(DrumPadTargetChannel))
+					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", ChannelRack.global_index(DrumPadTargetChannel))
+					flslChannels.selectOneChannel(ChannelRack.global_index(DrumPadTargetChannel))
 
 					# Update the LEDs
-					# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-					# UpdateAkaiAPC40DrumPadFunctionLEDs()
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+					UpdateAkaiAPC40DrumPadFunctionLEDs()
 
 					# set the next button led to green when we are on the last channel
 					#if DrumPadTargetChannel == (flslChannels.channelCount()-1):
@@ -310,53 +453,57 @@ def OnMidiMsg(event):
 					# Set the selected channel to the selected channel in FL Studio
 					# selectOneChannel	int index	-	Select channel at "index" exclusively.
 					# getChannelIndex	int index	int	Returns 'indexGlobal' for channel at "index" (respecting the groups).
-					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", flslChannels.getChannelIndex(DrumPadTargetChannel))
-					flslChannels.selectOneChannel(flslChannels.getChannelIndex(DrumPadTargetChannel))
-					# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-					# UpdateAkaiAPC40DrumPadFunctionLEDs()
+					print("Selecting AKAIAPC40 DrumPads Target Channel in Fl Studio: Target Channel:", DrumPadTargetChannel," Global Channel Index: ", ChannelRack.global_index(DrumPadTargetChannel))
+					flslChannels.selectOneChannel(ChannelRack.global_index(DrumPadTargetChannel))
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+					UpdateAkaiAPC40DrumPadFunctionLEDs()
 					#if DrumPadTargetChannel == 0: # Set the next button led to green when we are on the first channel
 					#	SetAkaiAPC40DrumPadFunctionLED_PrevChannel(1) 
 					print("Current Drum Pad Channel:",DrumPadTargetChannel)
 
+				# Update the CCVPPControl from the channel rack mirror
+				UpdateAkaiAPC40ChannelKnob()
+
 			if event.data1 == 57 and event.midiChan == 3: # Previous Channel Offset Button
 				if(DrumPadTargetChannelOffset > 0):
 					DrumPadTargetChannelOffset = DrumPadTargetChannelOffset - 1
-					# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-					# UpdateAkaiAPC40DrumPadFunctionLEDs()
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+					UpdateAkaiAPC40DrumPadFunctionLEDs()
 					print("Current Drum Pad Channel Offset:",DrumPadTargetChannelOffset)
 				#if DrumPadTargetChannelOffset == 0: # Set the LED to green when we are at index 0
 				#	SetAkaiAPC40DrumPadFunctionLED_PrevIndex(1)
 
 			if event.data1 == 57 and event.midiChan == 4: # Next Channel Offset Button
-				DrumPadTargetChannelOffset = DrumPadTargetChannelOffset + 1
-				# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-				# UpdateAkaiAPC40DrumPadFunctionLEDs()
-				print("Current Drum Pad Channel Offset:",DrumPadTargetChannelOffset)
+				if DrumPadTargetChannelOffset < PatternCache.page_count(32*ZoomLevel) - 1: # Stop at the last page of the pattern
+					DrumPadTargetChannelOffset = DrumPadTargetChannelOffset + 1
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+					UpdateAkaiAPC40DrumPadFunctionLEDs()
+					print("Current Drum Pad Channel Offset:",DrumPadTargetChannelOffset)
 			if event.data1 == 57 and event.midiChan == 5: # Fill 16 Pattern Button
-				for bit_idx in range(0 + (DrumPadTargetChannelOffset*32),(32+(DrumPadTargetChannelOffset*32)) * ZoomLevel):
-					flslChannels.setGridBit(DrumPadTargetChannel,bit_idx,0)
-				for bit_idx in range(0 + (DrumPadTargetChannelOffset*32),(32+(DrumPadTargetChannelOffset*32)) * ZoomLevel,2):
-					flslChannels.setGridBit(DrumPadTargetChannel,bit_idx,1)
-				# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-				# UpdateAkaiAPC40DrumPadFunctionLEDs()
+				# Only the steps of the window that differ from the fill are written to FL Studio, the fill is one undo step
+				MidasOperatingSystem.journal.apply_mask(DrumPadTargetChannel,(DrumPadTargetChannelOffset*32)*ZoomLevel,32*ZoomLevel,FillMasks.stride(32*ZoomLevel,2))
+				UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+				UpdateAkaiAPC40DrumPadFunctionLEDs()
 				print("Pattern filled at zoom level:",ZoomLevel)
 			if event.data1 == 57 and event.midiChan == 6: # Fill 8 Pattern Button
-				for bit_idx in range(0 + (DrumPadTargetChannelOffset*32),(32+(DrumPadTargetChannelOffset*32)) * ZoomLevel):
-					flslChannels.setGridBit(DrumPadTargetChannel,bit_idx,0)
-				for bit_idx in range(0 + (DrumPadTargetChannelOffset*32),(32+(DrumPadTargetChannelOffset*32)) * ZoomLevel,4):
-					flslChannels.setGridBit(DrumPadTargetChannel,bit_idx,1)
-				# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-				# UpdateAkaiAPC40DrumPadFunctionLEDs()
+				# Only the steps of the window that differ from the fill are written to FL Studio, the fill is one undo step
+				MidasOperatingSystem.journal.apply_mask(DrumPadTargetChannel,(DrumPadTargetChannelOffset*32)*ZoomLevel,32*ZoomLevel,FillMasks.stride(32*ZoomLevel,4))
+				UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+				UpdateAkaiAPC40DrumPadFunctionLEDs()
 				print("Pattern filled at zoom level:",ZoomLevel)
 			if event.data1 == 57 and event.midiChan == 7: # Fill 4 Pattern Button
-				for bit_idx in range(0 + (DrumPadTargetChannelOffset*32),(32+(DrumPadTargetChannelOffset*32)) * ZoomLevel):
-					flslChannels.setGridBit(DrumPadTargetChannel,bit_idx,0)
-				for bit_idx in range(0 + (DrumPadTargetChannelOffset*32),(32+(DrumPadTargetChannelOffset*32)) * ZoomLevel,8):
-					flslChannels.setGridBit(DrumPadTargetChannel,bit_idx,1)
-				# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
-				# UpdateAkaiAPC40DrumPadFunctionLEDs()
+				# Only the steps of the window that differ from the fill are written to FL Studio, the fill is one undo step
+				MidasOperatingSystem.journal.apply_mask(DrumPadTargetChannel,(DrumPadTargetChannelOffset*32)*ZoomLevel,32*ZoomLevel,FillMasks.stride(32*ZoomLevel,8))
+				UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+				UpdateAkaiAPC40DrumPadFunctionLEDs()
 				print("Pattern filled at zoom level:",ZoomLevel)
 
+			if event.data1 == 101 and event.midiChan == 0: # Nudge- Button, undo the last pad or fill edit
+				if MidasOperatingSystem.undo():
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
+			if event.data1 == 100 and event.midiChan == 0: # Nudge+ Button, redo the last undone edit
+				if MidasOperatingSystem.redo():
+					UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
 			if event.data1 == 91 and event.midiChan == 0: # Play Button
 				#FPT_Play	10	(button) play/pause
 				flslTransport.start()
@@ -388,22 +535,8 @@ def OnMidiMsg(event):
 					DrumPadFuncCCVPPControl_State = DrumPadFuncCCVPPControl_State + 1
 				print("Updating Target Channel Knob, Target:",DrumPadFuncCCVPPControl_State)
 
-				# Update the CCVPPControl
-				if DrumPadFuncCCVPPControl_State == 0: # Targeting volume knob
-					# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-					flsl.device.midi_out_msg_params(176,0,48,int(flslChannels.getChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel))*127.0))
-					# Update the type  Track Control 1 Knob Type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
-					flsl.device.midi_out_msg_params(176,0,0x38,2)
-				elif DrumPadFuncCCVPPControl_State == 1: # Targeting Pan knob
-					# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-					flsl.device.midi_out_msg_params(176,0,48,int(flslChannels.getChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel))*127.0))
-					# Update the type  Track Control 1 Knob Type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
-					flsl.device.midi_out_msg_params(176,0,0x38,3)
-				elif DrumPadFuncCCVPPControl_State == 2: # Targeting Pitch knob
-					# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-					flsl.device.midi_out_msg_params(176,0,48,int(flslChannels.getChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel))*127.0))
-					# Update the type  Track Control 1 Knob Type 0=off, 1=Single, 2=Volume Style, 3=Pan Style, 4-127=Single
-					flsl.device.midi_out_msg_params(176,0,0x38,3)
+				# Update the CCVPPControl from the channel rack mirror
+				UpdateAkaiAPC40ChannelKnob()
 
 				# UpdateAkaiAPC40DrumPadLEDs(DrumPadTargetChannel,ZoomLevel,DrumPadTargetChannelOffset)
 				# UpdateAkaiAPC40DrumPadFunctionLEDs()
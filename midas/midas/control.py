@@ -1,10 +1,11 @@
 #import flsi as FLSI
+from midaslib.event import MidasHandlerRegistry
+from midaslib.startup import MidasLazy
 
 class MidasControl :
     __data = [int(-1),int(-1)]
     def __init__(self,group:int = -1,index:int = -1):
-        self.__data[0] = group
-        self.__data[1] = index    
+        self.__data = [group,index] # per instance, the class list was shared by every control
     def data1(self)->int:
         return self.__data[0]
     def data2(self)->int:
@@ -171,6 +172,11 @@ class ApplicationBase:
         cls._controller_map = MidasMidiControlMap()
         cls._command_map = MidasMidiCommandMap()
 
+    def __init__(self):
+        # Handlers are bound methods, so the table is built per instance
+        self._handlers = MidasHandlerRegistry()
+        self.setup_handlers()
+
     # Called by midas OS
     # Events recieved from Fruity Loops
     def __onFruityLoopUpdate(self):
@@ -201,9 +207,12 @@ class ApplicationBase:
         self.onMidasProcess(status,port,data1,data2,sysex)
         for midas_command in self._command_map.get_midas(status-port):
             for midas_control in self._button_map.get_midas(MidiControl(port,data1)):
-                self.onMidasEvent(midas_control,midas_command)
+                if not self._handlers.dispatch(midas_command,midas_control): # one lookup, unhandled controls go to onMidasEvent
+                    self.onMidasEvent(midas_control,midas_command)
         pass        
     # abstract callbacks to be written for each application
+    def setup_handlers(self): # declare handlers with self._handlers.register(command,control,handler), called once from __init__
+        pass
     def onFruityLoopUpdate(self):
         pass
     def onFruityLoopProgramChange(self,flags):
@@ -454,115 +463,114 @@ class App_Beatmaker(ApplicationBase):
     is_filling = False
     fill_type = BEATMAKER_FILL_TYPE_16
 
+    def setup_handlers(self):
+        # Declared once, a button press is then a single lookup in self._handlers
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_UP,self.on_channel_up)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_DOWN,self.on_channel_down)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_ZOOM_IN,self.on_zoom_in)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_ZOOM_OUT,self.on_zoom_out)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_MOVE_LEFT,self.on_move_left)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_MOVE_RIGHT,self.on_move_right)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_FILL,self.on_fill)
+        self._handlers.register(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTON_PAD_FUNC_FILL_TYPE,self.on_fill_type)
+        self._handlers.register_all(BEATMAKER_COMMAND_IN_NOTEOFF,[
+            BEATMAKER_BUTTON_PAD_FUNC_CLEAR,
+            BEATMAKER_BUTTON_PAD_FUNC_SOLO,
+            BEATMAKER_BUTTON_PAD_FUNC_MUTE,
+            BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST,
+            BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_VOLUME_PAN_PITCH,
+            BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_TARGET_BAND
+        ],self.on_unimplemented_button)
+        self._handlers.register_all(BEATMAKER_COMMAND_IN_NOTEOFF,BEATMAKER_BUTTONS_PAD,self.on_pad)
+        self._handlers.register(BEATMAKER_COMMAND_IN_CONTROLCHANGE,BEATMAKER_CONTROLLER_CHANNEL_CONTROL_VOLUME_PAN_PITCH,self.on_channel_control_volume_pan_pitch)
+        self._handlers.register(BEATMAKER_COMMAND_IN_CONTROLCHANGE,BEATMAKER_CONTROLLER_CHANNEL_CONTROL_COMP_GATE_DIST,self.on_channel_control_comp_gate_dist)
+
+    def on_channel_up(self,control):
+        print("Func Channel + Detected.")
+        if self.target_channel > 0:
+            self.target_channel -= 1
+        #FLSI.select_one_channel(FLSI.get_channel_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio
+
+    def on_channel_down(self,control):
+        if self.target_channel < self.channel_count - 1:
+            self.target_channel += 1
+        #FLSI.select_one_channel(FLSI.get_channel_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio              
+
+    def on_zoom_in(self,control):
+        self.zoom_in()        
+
+    def on_zoom_out(self,control):
+        self.zoom_out() 
+
+    def on_move_left(self,control):
+        if self.channel_offset > 0:
+            self.channel_offset -= 1
+
+    def on_move_right(self,control):
+        if self.channel_offset < 4:
+            self.channel_offset += self.channel_offset
+
+    def on_fill(self,control):
+        if self.is_filling == False:
+            self.is_filling = True
+        else:
+            self.is_filling = False
+            # Apply fill based on self.fill_type, none of the BEATMAKER_FILL_TYPE_* fills are implemented yet
+
+    def on_fill_type(self,control):
+        if self.is_filling :
+            if self.fill_type <= 9: # we have 9 fill types
+                self.fill_type += 1
+            else: # warp back to first fill type
+                self.fill_type = BEATMAKER_FILL_TYPE_16
+
+    def on_unimplemented_button(self,control):
+        print("Channel+ button detected.") # handle button presses
+
+    def on_pad(self,control):
+        print("One of the pad buttons detected.") 
+
+    def on_channel_control_volume_pan_pitch(self,control):
+        if self.ccvpp_control_state == BEATMAKER_PCVPP_CONTROL_STATE_VOLUME: # Targeting Volume Knob
+            #flslChannels.setChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel),event.data2/127.0) # set the volume in fl studio
+            #flsl.device.midi_out_msg_params(176,0,48,event.data2) 				# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
+            pass
+        elif self.ccvpp_control_state == BEATMAKER_PCVPP_CONTROL_STATE_PAN: # Targeting Pan Knob
+            #flslChannels.setChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
+            #flsl.device.midi_out_msg_params(176,0,48,event.data2)
+            pass
+        elif self.ccvpp_control_state == BEATMAKER_PCVPP_CONTROL_STATE_PITCH: # Targeting Pitch Knob
+            # flslChannels.setChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
+            # flsl.device.midi_out_msg_params(176,0,48,event.data2)
+            pass
+
+    def on_channel_control_comp_gate_dist(self,control):
+        pass
+
     def onMidasEvent(self,control : MidasControl, command : int):
+        # Only events without a registered handler end up here
         if command ==  BEATMAKER_COMMAND_IN_NOTEON:
             print("Note On Detected")
-            pass
-        elif  command ==  BEATMAKER_COMMAND_IN_NOTEOFF:
-            print("Note Off Detected")
-            if control == BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_UP: 
-                print("Func Channel + Detected.")
-                if self.target_channel > 0:
-                    self.target_channel -= 1
-                #FLSI.select_one_channel(FLSI.get_channel_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_DOWN: 
-                if self.target_channel < self.channel_count - 1:
-                    self.target_channel += 1
-                #FLSI.select_one_channel(FLSI.get_channel_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio              
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_ZOOM_IN:
-                self.zoom_in()        
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_ZOOM_OUT: 
-                self.zoom_out() 
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_MOVE_LEFT: 
-                if self.channel_offset > 0:
-                    self.channel_offset -= 1
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_MOVE_RIGHT: 
-                if self.channel_offset < 4:
-                    self.channel_offset += self.channel_offset
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_FILL: 
-                if self.is_filling == False:
-                    self.is_filling = True
-                else:
-                    self.is_filling = False
-                    # Apply fill based on self.fill_type
-                    if BEATMAKER_FILL_TYPE_16 == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_8 == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_4 == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_16_DOTTED == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_8_DOTTED == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_4_DOTTED == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_16_TRIPLET == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_8_TRIPLET == self.fill_type:
-                        pass
-                    elif BEATMAKER_FILL_TYPE_4_TRIPLET == self.fill_type:
-                        pass
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_FILL_TYPE: 
-                if self.is_filling :
-                    if self.fill_type <= 9: # we have 9 fill types
-                        self.fill_type += 1
-                    else: # warp back to first fill type
-                        self.fill_type = BEATMAKER_FILL_TYPE_16
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_CLEAR: 
-                print("Channel+ button detected.") # handle button presses
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_SOLO: 
-                print("Channel+ button detected.") # handle button presses
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_MUTE: 
-                print("Channel+ button detected.") # handle button presses
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST: 
-                print("Channel+ button detected.") # handle button presses
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_VOLUME_PAN_PITCH: 
-                print("Channel+ button detected.") # handle button presses
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_TARGET_BAND: 
-                print("Channel+ button detected.") # handle button presses
-            elif control == BEATMAKER_BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST: 
-                print("Channel+ button detected.") # handle button presses                
-            elif control in BEATMAKER_BUTTONS_PAD: # handle drum pads
-                print("One of the pad buttons detected.") 
-        elif  command ==  BEATMAKER_COMMAND_IN_CONTROLCHANGE: # Handle Control Change Commands
-                if control == BEATMAKER_CONTROLLER_CHANNEL_CONTROL_VOLUME_PAN_PITCH: 
-                    if self.ccvpp_control_state == BEATMAKER_PCVPP_CONTROL_STATE_VOLUME: # Targeting Volume Knob
-                        #flslChannels.setChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel),event.data2/127.0) # set the volume in fl studio
-                        #flsl.device.midi_out_msg_params(176,0,48,event.data2) 				# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-                        pass
-                    elif self.ccvpp_control_state == BEATMAKER_PCVPP_CONTROL_STATE_PAN: # Targeting Pan Knob
-                        #flslChannels.setChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
-                        #flsl.device.midi_out_msg_params(176,0,48,event.data2)
-                        pass
-                    elif self.ccvpp_control_state == BEATMAKER_PCVPP_CONTROL_STATE_PITCH: # Targeting Pitch Knob
-                        # flslChannels.setChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
-                        # flsl.device.midi_out_msg_params(176,0,48,event.data2)
-                        pass
-                elif control == BEATMAKER_CONTROLLER_CHANNEL_CONTROL_COMP_GATE_DIST: 
-                        pass  
 
-        # print("Midas command recieved:", command)
-        # if command == BEATMAKER_COMMAND_IN_NOTEON:
-        #     print("Command 0 detected.")
-        #     #print(MidasControl(*BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_UP))
-        #     print(control)
-        #     if control == BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_UP:
-        #         print("Midas Control 0 Detected")     
 
+def create_test_app_c():
+    test_app = App_Beatmaker()
+    test_app._command_map.regenerate([0,1],[144,128])
+    test_app._button_map.regenerate([BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_UP],[MidiControl(0,53)])
+    return test_app
 
-MyTestAppC = App_Beatmaker()
-MyTestAppC._command_map.regenerate([0,1],[144,128])
-MyTestAppC._button_map.regenerate([BEATMAKER_BUTTON_PAD_FUNC_CHANNEL_UP],[MidiControl(0,53)])
+# Built on the first midi message instead of when FL Studio imports the script.
+MyTestAppC = MidasLazy(create_test_app_c, "MyTestAppC")
 
-MyTestAppC._onMidasProcessInternal(3,1,0,88)
+if __name__ == "__main__":
+    MyTestAppC.get()._onMidasProcessInternal(3,1,0,88)
 
 def OnInit():
 	print("Initialization OK")
 
 def OnMidiMsg(event): 
 	print(event.midiId,event.midiChan,event.data1)
-	MyTestAppC._onMidasProcessInternal(event.midiId,event.midiChan,event.data1,event.data2)	
+	MyTestAppC.get()._onMidasProcessInternal(event.midiId,event.midiChan,event.data1,event.data2)	
 
 
 
@@ -1,3 +1,15 @@
+from midaslib.event import MidasHandlerRegistry
+from midaslib.fill import MidasFillMasks
+from midaslib.flsi.fl_midi import HW_Dirty_Patterns, HW_Dirty_Mixer_Controls, HW_ChannelEvent, pVelocity, pPitch, pPan, pRelease, pShift, TLC_Release
+from midaslib.grid import MidasGridCache, reduce_window, MIDAS_GRID_REDUCE_ANY, MIDAS_GRID_REDUCE_ALL, MIDAS_GRID_REDUCE_COUNT
+from midaslib.journal import MidasGridJournal
+from midaslib.led import MidasLedState
+from midaslib.live import MidasLiveGrid, MIDAS_LIVE_BLOCK_EMPTY, MIDAS_LIVE_BLOCK_FILLED, MIDAS_LIVE_BLOCK_PLAYING, MIDAS_LIVE_BLOCK_SCHEDULED, MIDAS_LIVE_FIRST_TRACK, MIDAS_LIVE_TRIGGER_FLAGS
+from midaslib.pattern import MidasPatternCache
+from midaslib.rack import MidasChannelRack
+from midaslib.startup import MidasLazy
+from midaslib.steps import MidasStepParamCache
+
 ####################################################################################################################
 ####################################################################################################################
 # Fruity Loop Scripting Module Interface
@@ -16,6 +28,19 @@ class flslTransport:
     @staticmethod
     def global_transport(p1:int,p2:int):
         pass
+    @staticmethod
+    def is_playing():
+        pass
+
+class flslMixer:
+    @staticmethod
+    def get_song_tick_pos():
+        pass
+
+class flslGeneral:
+    @staticmethod
+    def get_rec_ppq():
+        pass
 
 class flslDevice:
     @staticmethod
@@ -57,6 +82,42 @@ class flslChannels:
     def select_single_channel(channel_index):
         pass
 
+    @staticmethod
+    def mute_channel(channel_index,value):
+        pass
+
+    @staticmethod
+    def solo_channel(channel_index,value):
+        pass
+
+    @staticmethod
+    def get_channel_name(channel_index):
+        pass
+
+    @staticmethod
+    def get_channel_color(channel_index):
+        pass
+
+    @staticmethod
+    def is_channel_muted(channel_index):
+        pass
+
+    @staticmethod
+    def is_channel_solo(channel_index):
+        pass
+
+    @staticmethod
+    def get_channel_volume(channel_index):
+        pass
+
+    @staticmethod
+    def get_channel_pan(channel_index):
+        pass
+
+    @staticmethod
+    def get_channel_pitch(channel_index):
+        pass
+
     @staticmethod
     def set_grid_bit(channel,bit,value):
         pass
@@ -65,6 +126,52 @@ class flslChannels:
     def get_grid_bit(channel,bit):
         pass
 
+    @staticmethod
+    def get_current_step_param(index,step,param):
+        pass
+
+    @staticmethod
+    def set_step_parameter_by_index(index,pat_num,step,param,value):
+        pass
+
+class flslPlaylist:
+    @staticmethod
+    def track_count():
+        pass
+
+    @staticmethod
+    def get_live_block_status(index,block_num,mode):
+        pass
+
+    @staticmethod
+    def get_live_block_color(index,block_num):
+        pass
+
+    @staticmethod
+    def trigger_live_clip(index,sub_num,flags,velocity = -1):
+        pass
+
+    @staticmethod
+    def get_performance_mode_state():
+        pass
+
+class flslPatterns:
+    @staticmethod
+    def pattern_number():
+        pass
+
+    @staticmethod
+    def get_pattern_length(index):
+        pass
+
+    @staticmethod
+    def get_pattern_name(index):
+        pass
+
+    @staticmethod
+    def get_pattern_color(index):
+        pass
+
 ####################################################################################################################
 ####################################################################################################################
 ####################################################################################################################
@@ -267,6 +374,12 @@ class MidasMidiControl:
    
 class MidasAppControlMap:
     data = {}
+    reverse = {}
+
+    def __init__(self):
+        # per instance, the button and controller maps share control tuples like (0, 0)
+        self.data = {}
+        self.reverse = {}
 
     def is_control(self,midas_control,midi_channel,midi_id):
         """
@@ -300,6 +413,17 @@ class MidasAppControlMap:
         if midas_control in self.data:
             return self.data[midas_control].channel(),self.data[midas_control].id()
         return None    
+
+    def get_control(self,midi_channel,midi_id):
+        """
+            Returns the midas control mapped to a midi channel and midi id, one dict lookup.
+        Params:
+            param1[midi_channel]: int
+            param2[midi_id]: int 
+        Outputs:
+            output1: MidasControl or None if the midi control is not mapped
+        """
+        return self.reverse.get((midi_channel,midi_id))
     
     def generate(self,midas_control_list,midi_control_list) :
         """
@@ -311,6 +435,7 @@ class MidasAppControlMap:
         for i in range(len(midas_control_list)) :
             if i < len(midi_control_list):
                 self.data[midas_control_list[i]] = MidasMidiControl(midi_control_list[i][MIDAS_MIDICONTROL_CHANNEL],midi_control_list[i][MIDAS_MIDISCONTROL_ID])
+                self.reverse[(midi_control_list[i][MIDAS_MIDICONTROL_CHANNEL],midi_control_list[i][MIDAS_MIDISCONTROL_ID])] = midas_control_list[i]
             else:
                 # if there is not enough midi buttons for each control, the control is set to None, None
                 self.data[midas_control_list[i]:MidasMidiControl(None,None)] 
@@ -331,6 +456,10 @@ class MidasAppControlMap:
     
 class MidasAppCommandMap:
     data = {int:int}
+
+    def __init__(self):
+        self.data = {}
+
     def is_command(self,midas_command,midi_command):
         """
             Checks if button is in the control map, then returns True if match the midi channel and midi id of the associated midi control.
@@ -449,6 +578,42 @@ class MidasApplication:
         cls.controller_map : MidasAppControlMap = MidasAppControlMap()
         cls.command_map : MidasAppCommandMap = MidasAppCommandMap()
         cls.is_running : bool = False
+
+    def __init__(self):
+        self.handlers = MidasHandlerRegistry()
+        self.setup_handlers()
+
+    def setup_handlers(self):
+        """
+            Registers the handlers of the application, called once on construction.
+            Override and call register_handler for every (command, control) the application reacts to.
+        """
+        pass
+
+    def register_handler(self,command,control,handler):
+        """
+            Sets the handler called by onMidasProcess for a control, the handler receives (control, data2).
+        Params:
+            param1[command]: int, one of COMMANDS_IN
+            param2[control]: MidasControl
+            param3[handler]: callable
+        """
+        self.handlers.register(command,control,handler)
+
+    def get_input_command(self,status,port):
+        """
+            Returns the midas command of a midi status, None if it is not an input command.
+        Params:
+            param1[status]: int
+            param2[port]: int 
+        Outputs:
+            output1: int or None
+        """
+        for command in COMMANDS_IN:
+            if self.command_map.is_command_offset_by_channel(command,status,port):
+                return command
+        return None
+
     # Called by midas OS
     # Events recieved from Fruity Loops
     def __onFruityLoopUpdate(self):
@@ -463,6 +628,13 @@ class MidasApplication:
         self.onMidasUpdate()
         self.onFruityLoopScriptInit()
         pass
+    def __onFruityLoopDirtyChannel(self,index,flag):
+        self.onMidasUpdate()
+        self.onFruityLoopDirtyChannel(index,flag)
+        pass
+    def __onFruityLoopIdle(self):
+        self.onFruityLoopIdle()
+        pass
     # Events Recieved from device
     def __onFruityLoopMidiInput(self,message):
         self.onMidasUpdate()
@@ -482,6 +654,10 @@ class MidasApplication:
         pass
     def onFruityLoopScriptInit(self):    
         pass
+    def onFruityLoopDirtyChannel(self,index,flag):
+        pass
+    def onFruityLoopIdle(self):
+        pass
     # Events Recieved from device
     def onFruityLoopMidiInput(self,message):
         pass
@@ -706,7 +882,7 @@ for i in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
 
 APC40_CONTROLLERS_TRACK_CONTROL_LEDRINGTYPE = [(None,None)] * 8
 for i in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
-    APC40_CONTROLLERS_TRACK_CONTROL_ABSOLUTE[i] = APC40_OUT_MIDI_CHANNEL_MASTER, 0x38 + i
+    APC40_CONTROLLERS_TRACK_CONTROL_LEDRINGTYPE[i] = APC40_OUT_MIDI_CHANNEL_MASTER, 0x38 + i
 
 APC40_CONTROLLERS_DEVICE_CONTROL_ABSOLUTE = [(None,None)] * (APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE * APC40_N_CHANNELS)
 for id in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
@@ -726,6 +902,15 @@ APC40_LED_ABSOLUTE_CONTROLLER_STATE_SINGLE = 1
 APC40_LED_ABSOLUTE_CONTROLLER_STATE_VOLUMESTYLE = 2
 APC40_LED_ABSOLUTE_CONTROLLER_STATE_PANSTYLE = 3
 
+# Clip launch LED states
+APC40_LED_CLIP_LAUNCH_STATE_OFF = 0
+APC40_LED_CLIP_LAUNCH_STATE_GREEN = 1
+APC40_LED_CLIP_LAUNCH_STATE_GREEN_BLINK = 2
+APC40_LED_CLIP_LAUNCH_STATE_RED = 3
+APC40_LED_CLIP_LAUNCH_STATE_RED_BLINK = 4
+APC40_LED_CLIP_LAUNCH_STATE_YELLOW = 5
+APC40_LED_CLIP_LAUNCH_STATE_YELLOW_BLINK = 6
+
 APC40_LED_ABSOLUTE_CONTROLLER_STATES= [
     APC40_LED_ABSOLUTE_CONTROLLER_STATE_OFF,
     APC40_LED_ABSOLUTE_CONTROLLER_STATE_SINGLE,
@@ -982,6 +1167,7 @@ COMMANDS = COMMANDS_IN + COMMANDS_OUT
 BUTTONS_GROUP_PAD = 0
 BUTTONS_GROUP_PAD_FUNC = 1
 BUTTONS_GROUP_LED_FUNC = 2
+BUTTONS_GROUP_TRACK = 3
 CONTROLLERS_GROUP_CHANNEL_CONTROL = 0
 
 BUTTONS_PAD = [(None, None)] * 32
@@ -1007,6 +1193,16 @@ BUTTON_LED_FUNC_PROGRAM_CHANGE_CHANNEL_CONTROLS_PAGE = 14, BUTTONS_GROUP_LED_FUN
 BUTTON_LED_FUNC_MUTE_CGD = 15, BUTTONS_GROUP_LED_FUNC  # mute/unmute the compressor gate or distortion/limiter
 BUTTON_LED_FUNC_MUTE_BAND = 16, BUTTONS_GROUP_LED_FUNC
 BUTTON_LED_FUNC_BAND_TYPE = 17, BUTTONS_GROUP_LED_FUNC
+BUTTON_LED_FUNC_OVERVIEW = 18, BUTTONS_GROUP_LED_FUNC # toggle the multi-channel overview page
+BUTTON_LED_FUNC_UNDO = 19, BUTTONS_GROUP_LED_FUNC # undo the last pad, fill or clear edit
+BUTTON_LED_FUNC_REDO = 20, BUTTONS_GROUP_LED_FUNC
+BUTTON_LED_FUNC_GENERATOR = 21, BUTTONS_GROUP_LED_FUNC # hold to preview the rhythm generator, release to write it
+BUTTON_LED_FUNC_STEP_RECORD = 22, BUTTONS_GROUP_LED_FUNC # toggle step record, pads and notes played while the transport runs are written to the target channel
+BUTTON_LED_FUNC_STEP_PARAM_VELOCITY = 23, BUTTONS_GROUP_LED_FUNC # the track knobs edit the velocity of the 8 steps of the pad row, press again to leave
+BUTTON_LED_FUNC_STEP_PARAM_PITCH = 24, BUTTONS_GROUP_LED_FUNC
+BUTTON_LED_FUNC_STEP_PARAM_PAN = 25, BUTTONS_GROUP_LED_FUNC
+BUTTON_LED_FUNC_STEP_PARAM_RELEASE = 26, BUTTONS_GROUP_LED_FUNC
+BUTTON_LED_FUNC_STEP_PARAM_SHIFT = 27, BUTTONS_GROUP_LED_FUNC
 
 BUTTONS_PAD_FUNC = [
     BUTTON_PAD_FUNC_CHANNEL_UP,
@@ -1025,18 +1221,44 @@ BUTTONS_PAD_FUNC = [
     BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST,
 ]
 
+BUTTONS_LED_FUNC_STEP_PARAM = [
+    BUTTON_LED_FUNC_STEP_PARAM_VELOCITY,
+    BUTTON_LED_FUNC_STEP_PARAM_PITCH,
+    BUTTON_LED_FUNC_STEP_PARAM_PAN,
+    BUTTON_LED_FUNC_STEP_PARAM_RELEASE,
+    BUTTON_LED_FUNC_STEP_PARAM_SHIFT
+]
+
 BUTTONS_LED_FUNC = [
     BUTTON_LED_FUNC_PROGRAM_CHANGE_CHANNEL_CONTROLS_PAGE,
     BUTTON_LED_FUNC_MUTE_CGD,
     BUTTON_LED_FUNC_MUTE_BAND,
-    BUTTON_LED_FUNC_BAND_TYPE
-]
-
-BUTTONS = BUTTONS_PAD + BUTTONS_PAD_FUNC + BUTTONS_LED_FUNC
+    BUTTON_LED_FUNC_BAND_TYPE,
+    BUTTON_LED_FUNC_OVERVIEW,
+    BUTTON_LED_FUNC_UNDO,
+    BUTTON_LED_FUNC_REDO,
+    BUTTON_LED_FUNC_GENERATOR,
+    BUTTON_LED_FUNC_STEP_RECORD
+] + BUTTONS_LED_FUNC_STEP_PARAM
+
+# Track buttons: one column per channel of the current bank of 8 channels
+BUTTONS_TRACK_MUTE = [(None, None)] * 8 # lit while the channel plays, press to mute
+BUTTONS_TRACK_SOLO = [(None, None)] * 8
+BUTTONS_TRACK_SELECT = [(None, None)] * 8 # lit on the drum pad target channel, press to target the channel
+for i in range(8):
+    BUTTONS_TRACK_MUTE[i] = i, BUTTONS_GROUP_TRACK
+    BUTTONS_TRACK_SOLO[i] = 8 + i, BUTTONS_GROUP_TRACK
+    BUTTONS_TRACK_SELECT[i] = 16 + i, BUTTONS_GROUP_TRACK
+
+BUTTONS_TRACK = BUTTONS_TRACK_MUTE + BUTTONS_TRACK_SOLO + BUTTONS_TRACK_SELECT
+
+BUTTONS = BUTTONS_PAD + BUTTONS_PAD_FUNC + BUTTONS_LED_FUNC + BUTTONS_TRACK
 
 CONTROLLERS_CHANNEL_CONTROL = [(0, 0)] * 8
 CONTROLLER_CHANNEL_CONTROL_VOLUME_PAN_PITCH = 0 , CONTROLLERS_GROUP_CHANNEL_CONTROL
 CONTROLLER_CHANNEL_CONTROL_COMP_GATE_DIST = 1 , CONTROLLERS_GROUP_CHANNEL_CONTROL
+CONTROLLER_CHANNEL_CONTROL_GENERATOR_PULSES = 2 , CONTROLLERS_GROUP_CHANNEL_CONTROL # hits of the euclidean rhythm, the fill density
+CONTROLLER_CHANNEL_CONTROL_GENERATOR_ROTATION = 3 , CONTROLLERS_GROUP_CHANNEL_CONTROL
 
 for i in range(len(CONTROLLERS_CHANNEL_CONTROL)):
     CONTROLLERS_CHANNEL_CONTROL[i] = i, CONTROLLERS_GROUP_CHANNEL_CONTROL
@@ -1063,30 +1285,338 @@ APP_BEATMAKER_FILL_TYPE_16_TRIPLET = 6
 APP_BEATMAKER_FILL_TYPE_8_TRIPLET = 7
 APP_BEATMAKER_FILL_TYPE_4_TRIPLET = 8
 
+# Rhythm generator: euclidean rhythm over APP_BEATMAKER_GENERATOR_STEPS pads, repeated over the pad window
+APP_BEATMAKER_GENERATOR_STEPS = 16
+
+# Step record: hits are quantised to the nearest step, a step is a 16th note
+APP_BEATMAKER_STEPS_PER_BEAT = 4
+
+# Step parameter editor: the 8 track knobs edit one parameter of the 8 steps of a pad row
+APP_BEATMAKER_STEP_EDIT_STEPS = 8
+APP_BEATMAKER_STEP_PARAMS = [pVelocity,pPitch,pPan,pRelease,pShift] # in the order of BUTTONS_LED_FUNC_STEP_PARAM
+APP_BEATMAKER_STEP_PARAM_MAX = {pVelocity:128,pPitch:127,pPan:128,pRelease:128} # knob 127 is this value, pShift goes up to the ticks of a step
+
+# Overview page: every clip launch row shows one channel, every column one bar
+APP_BEATMAKER_OVERVIEW_ROWS = APC40_N_CLIP_LAUNCH_ROWS
+APP_BEATMAKER_OVERVIEW_COLUMNS = APC40_N_CHANNELS_NO_MASTER
+APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR = 16
+APP_BEATMAKER_OVERVIEW_GLOBAL_BUTTONS = [BUTTON_LED_FUNC_GENERATOR,BUTTON_LED_FUNC_OVERVIEW,BUTTON_LED_FUNC_UNDO,BUTTON_LED_FUNC_REDO,BUTTON_LED_FUNC_STEP_RECORD] # keep their handlers on the overview page
+
 
 class MidasAppBeatmaker(MidasApplication):
     ccvpp_control_state = PCVPP_CONTROL_STATE_VOLUME
     zoom_level = 1
     target_channel = 0
     channel_offset = 0
-    channel_count = 0 # retrieve value from flsl.channels.channel_count()
     is_filling = False
     fill_type = APP_BEATMAKER_FILL_TYPE_16
-    
+    channel_rack = MidasChannelRack(flslChannels.channel_count,flslChannels.get_channel_index,flslChannels.get_channel_name,flslChannels.get_channel_color,flslChannels.is_channel_muted,flslChannels.is_channel_solo,flslChannels.get_channel_volume,flslChannels.get_channel_pan,flslChannels.get_channel_pitch) # channel count, indexes and mixer values without asking flsl.channels on every press
+    grid_cache = MidasGridCache(flslChannels.get_grid_bit,flslChannels.set_grid_bit) # pads are drawn from the cache, not from flsl.channels.get_grid_bit()
+    led_state = MidasLedState(flslDevice.midi_out_msg_params) # only pads that changed since the last frame are sent
+    grid_journal = MidasGridJournal(grid_cache,flslPatterns.pattern_number) # undo history of the edits made from the pads
+    pattern_cache = MidasPatternCache(flslPatterns.pattern_number,flslPatterns.get_pattern_length,flslPatterns.get_pattern_name,flslPatterns.get_pattern_color) # length of the pattern bounds the pad window
+    drum_pad_neighbours_window = None # pad window whose neighbours were last read into the grid cache
+    fill_masks = MidasFillMasks(len(BUTTONS_PAD)) # step masks of the APP_BEATMAKER_FILL_TYPE_* fills for every zoom level
+    zoom_render_mode = MIDAS_GRID_REDUCE_COUNT # how the steps under a pad are reduced to one LED when zoomed out
+    drum_pad_window_hash = None # hash of the steps last drawn on the pads, refreshes that leave it unchanged are skipped
+    is_overview = False
+    is_generating = False
+    generator_pulses = 0
+    generator_rotation = 0
+    generator_mask = None # previewed steps of the pad window, None when there is no preview
+    overview_channel_offset = 0 # first channel shown on the overview page
+    is_step_recording = False
+    step_param_cache = MidasStepParamCache(flslChannels.get_current_step_param,flslChannels.set_step_parameter_by_index,flslPatterns.pattern_number) # parameters of the steps on the knobs, writes are coalesced until the next idle tick
+    step_edit_param = None # step parameter on the track knobs, None when the knobs control the channel
+    step_edit_row = 0 # pad row whose steps are on the track knobs, follows the last pad toggled
+    step_record_pending = {} # steps hit since the last idle tick, channel -> bitset of the steps, written together by flush_step_record
+
+    def get_button_data(self,button):
+        return self.button_map.get_control_data(button)
+
     def clear_drum_pad_leds(self,value):
-        for button in range(BUTTONS_PAD):
-            flslDevice.midi_out_msg_params(COMMAND_IN_NOTEOFF,*self.get_button_data(button),value)
+        for button in BUTTONS_PAD:
+            flslDevice.midi_out_msg_params(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(button),value)
 
     def clear_drum_pad_bits(self,value):
-        for button in range(BUTTONS_PAD):
-            flslDevice.midi_out_msg_params(COMMAND_IN_NOTEOFF,*self.get_button_data(button),value)
+        for button in BUTTONS_PAD:
+            flslDevice.midi_out_msg_params(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(button),value)
+
+    def get_drum_pad_led_value(self,pad_value):
+        # pad_value is 0/1 for the any and all reductions, or the number of steps on under the pad for the count reduction
+        if pad_value == 0:
+            return APC40_LED_CLIP_LAUNCH_STATE_OFF
+        if self.zoom_render_mode != MIDAS_GRID_REDUCE_COUNT or pad_value >= self.zoom_level:
+            return APC40_LED_CLIP_LAUNCH_STATE_RED # every step under the pad is on
+        if pad_value * 2 >= self.zoom_level:
+            return APC40_LED_CLIP_LAUNCH_STATE_YELLOW # at least half of the steps are on
+        return APC40_LED_CLIP_LAUNCH_STATE_GREEN
 
     def update_drum_pad_leds(self):
-        for i in range(BUTTONS_PAD):
-            if(flslChannels.get_grid_bit(self.target_channel,(i+self.channel_offset)*self.zoom_level)) > 0:
-                flslDevice.midi_out_msg_params(COMMAND_IN_NOTEOFF,*self.get_button_data(BUTTONS_PAD[i]),3)  # TODO:3 should be replaced with an mapped led type, for now we pass 3 (red on apc40)      
-            else: # the bit is off
-                flslDevice.midi_out_msg_params(COMMAND_IN_NOTEOFF,*self.get_button_data(BUTTONS_PAD[i]),0)  # TODO:3 should be replaced with an mapped led type, for now we pass 3 (red on apc40)      
+        if self.generator_mask is not None:
+            window = self.generator_mask # the preview is drawn instead of the grid until it is written
+        else:
+            window = self.grid_cache.get_window(self.target_channel,self.channel_offset*self.zoom_level,len(BUTTONS_PAD)*self.zoom_level)
+        pad_values = reduce_window(window,len(BUTTONS_PAD),self.zoom_level,self.zoom_render_mode) # one value per pad over the pad's whole step window
+        self.drum_pad_window_hash = self.get_drum_pad_window_hash()
+        for i in range(len(BUTTONS_PAD)):
+            self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_PAD[i]),self.get_drum_pad_led_value(pad_values[i]))
+        if self.step_edit_param is not None:
+            self.update_step_edit_leds() # the pad window moved, the knobs follow it
+
+    def get_pad_index(self,port,data1):
+        for i in range(len(BUTTONS_PAD)):
+            if self.button_map.is_control(BUTTONS_PAD[i],port,data1):
+                return i
+        return None
+
+    def toggle_drum_pad(self,pad_index):
+        # A pad covers zoom_level steps: if any of them is on the pad is cleared, otherwise its first step is set
+        position = (pad_index+self.channel_offset)*self.zoom_level
+        if self.grid_cache.get_window(self.target_channel,position,self.zoom_level):
+            self.grid_journal.apply_mask(self.target_channel,position,self.zoom_level,0)
+        else:
+            self.grid_journal.set_bit(self.target_channel,position,1)
+
+    def undo(self):
+        if self.grid_journal.undo():
+            self.update_leds()
+
+    def redo(self):
+        if self.grid_journal.redo():
+            self.update_leds()
+
+    def begin_generator(self):
+        self.is_generating = True
+        self.generator_mask = None
+
+    def preview_generator(self,controller,value):
+        # knob turns only redraw the pads, nothing is written to FL Studio until the generator button is released
+        if controller == CONTROLLER_CHANNEL_CONTROL_GENERATOR_PULSES:
+            self.generator_pulses = (value * APP_BEATMAKER_GENERATOR_STEPS) // 127
+        else:
+            self.generator_rotation = (value * (APP_BEATMAKER_GENERATOR_STEPS - 1)) // 127
+        rhythm = self.fill_masks.euclid(self.generator_pulses,APP_BEATMAKER_GENERATOR_STEPS,self.generator_rotation)
+        self.generator_mask = self.fill_masks.tile(rhythm,APP_BEATMAKER_GENERATOR_STEPS,len(BUTTONS_PAD),self.zoom_level)
+        self.update_drum_pad_leds()
+
+    def commit_generator(self):
+        self.is_generating = False
+        if self.generator_mask is not None:
+            mask = self.generator_mask
+            self.generator_mask = None
+            self.grid_journal.apply_mask(self.target_channel,self.channel_offset*self.zoom_level,len(BUTTONS_PAD)*self.zoom_level,mask) # only the changed steps, one undo step
+            self.update_drum_pad_leds()
+
+    def get_song_step(self):
+        # nearest step to the song position, wrapped by the pattern: the last half step rounds to step 0 and song mode keeps counting
+        ppq = flslGeneral.get_rec_ppq() or 96
+        step = (((flslMixer.get_song_tick_pos() or 0) * APP_BEATMAKER_STEPS_PER_BEAT) + (ppq // 2)) // ppq
+        return step % self.pattern_cache.steps()
+
+    def toggle_step_record(self):
+        self.flush_step_record()
+        self.is_step_recording = not self.is_step_recording
+
+    def record_step_hit(self):
+        # the write waits for the next idle tick, a roll of hits becomes one diff against the grid cache
+        if not flslTransport.is_playing():
+            return
+        step = self.get_song_step()
+        pending = self.step_record_pending.get(self.target_channel,0) | (1 << step)
+        self.step_record_pending[self.target_channel] = pending
+        pad_index = (step // self.zoom_level) - self.channel_offset
+        if self.is_overview or self.generator_mask is not None or not 0 <= pad_index < len(BUTTONS_PAD):
+            return
+        # optimistic feedback: the pad is drawn as if the hit was already written
+        position = (pad_index+self.channel_offset)*self.zoom_level
+        window = self.grid_cache.get_window(self.target_channel,position,self.zoom_level) | ((pending >> position) & ((1 << self.zoom_level) - 1))
+        pad_value = reduce_window(window,1,self.zoom_level,self.zoom_render_mode)[0]
+        self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_PAD[pad_index]),self.get_drum_pad_led_value(pad_value))
+
+    def flush_step_record(self):
+        if not self.step_record_pending:
+            return
+        pending = self.step_record_pending
+        self.step_record_pending = {}
+        # steps already on are skipped by the batch, the hits of one tick are one undo step
+        with self.grid_cache.batch(self.grid_journal) as batch:
+            for channel, steps in pending.items():
+                while steps:
+                    low_bit = steps & -steps
+                    batch.set_bit(channel,low_bit.bit_length() - 1,1)
+                    steps ^= low_bit
+        self.update_leds() # the optimistic pads already match, only the LED diff is sent
+
+    def get_step_param_max(self,param):
+        if param == pShift:
+            return ((flslGeneral.get_rec_ppq() or 96) // APP_BEATMAKER_STEPS_PER_BEAT) - 1 # ticks of a step
+        return APP_BEATMAKER_STEP_PARAM_MAX[param]
+
+    def get_step_edit_position(self,knob_index):
+        # the first step of every pad of the row
+        return (self.channel_offset + (self.step_edit_row*APP_BEATMAKER_STEP_EDIT_STEPS) + knob_index)*self.zoom_level
+
+    def toggle_step_edit(self,param):
+        self.step_param_cache.flush()
+        if self.step_edit_param == param:
+            self.step_edit_param = None # the knobs control the channel again
+        else:
+            self.step_edit_param = param
+            self.update_step_edit_leds()
+        for i in range(len(BUTTONS_LED_FUNC_STEP_PARAM)):
+            self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_LED_FUNC_STEP_PARAM[i]),1 if APP_BEATMAKER_STEP_PARAMS[i] == self.step_edit_param else 0)
+
+    def update_step_edit_leds(self):
+        # one pass over the window when it changed, then the knob rings are drawn from the cache
+        self.step_param_cache.load(self.target_channel,self.get_step_edit_position(0),APP_BEATMAKER_STEP_EDIT_STEPS*self.zoom_level)
+        param_max = self.get_step_param_max(self.step_edit_param)
+        for i in range(APP_BEATMAKER_STEP_EDIT_STEPS):
+            value = self.step_param_cache.get(self.get_step_edit_position(i),self.step_edit_param)
+            self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_CONTROLSET),*self.controller_map.get_control_data(CONTROLLERS_CHANNEL_CONTROL[i]),min(127,(value*127)//max(1,param_max)))
+
+    def edit_step_param(self,knob_index,value):
+        # only the cache changes here, the last value of every step is written on the next idle tick
+        self.step_param_cache.load(self.target_channel,self.get_step_edit_position(0),APP_BEATMAKER_STEP_EDIT_STEPS*self.zoom_level)
+        self.step_param_cache.set(self.get_step_edit_position(knob_index),self.step_edit_param,(value*self.get_step_param_max(self.step_edit_param))//127)
+
+    def get_max_channel_offset(self):
+        # last pad offset that still shows a step of the pattern in the last pad
+        pattern_pads = (self.pattern_cache.steps() + self.zoom_level - 1) // self.zoom_level
+        return max(0,pattern_pads - len(BUTTONS_PAD))
+
+    def clamp_channel_offset(self):
+        self.channel_offset = max(0,min(self.channel_offset,self.get_max_channel_offset()))
+
+    def prerender_drum_pad_neighbours(self):
+        # read the windows one move left and right into the grid cache, scrolling to them then only costs the LED diff
+        window = (self.target_channel,self.channel_offset,self.zoom_level)
+        if window == self.drum_pad_neighbours_window:
+            return
+        self.drum_pad_neighbours_window = window
+        for offset in (self.channel_offset + 1,self.channel_offset - 1):
+            if 0 <= offset <= self.get_max_channel_offset():
+                self.grid_cache.get_window(self.target_channel,offset*self.zoom_level,len(BUTTONS_PAD)*self.zoom_level)
+
+    def onFruityLoopIdle(self):
+        self.grid_cache.on_idle() # before the flush, the refresh of its writes comes before the next idle tick
+        self.flush_step_record()
+        self.step_param_cache.flush()
+        self.prerender_drum_pad_neighbours()
+
+    def get_channel_bank(self):
+        # first channel of the bank of 8 holding the target channel
+        return (self.target_channel // len(BUTTONS_TRACK_MUTE)) * len(BUTTONS_TRACK_MUTE)
+
+    def update_track_leds(self):
+        # read from the channel rack mirror, a bank change only sends the buttons whose state differs
+        bank = self.get_channel_bank()
+        for i in range(len(BUTTONS_TRACK_MUTE)):
+            channel = bank + i
+            if channel < self.channel_rack.count():
+                is_active = 0 if self.channel_rack.is_muted(channel) else 1
+                is_solo = 1 if self.channel_rack.is_solo(channel) else 0
+            else:
+                is_active = 0
+                is_solo = 0
+            self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_TRACK_MUTE[i]),is_active)
+            self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_TRACK_SOLO[i]),is_solo)
+            self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_TRACK_SELECT[i]),1 if channel == self.target_channel else 0)
+
+    def select_target_channel(self,channel):
+        self.target_channel = channel
+        flslChannels.select_single_channel(self.channel_rack.global_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio
+        self.update_drum_pad_leds()
+        self.update_track_leds()
+
+    def toggle_channel_mute(self,channel):
+        is_muted = not self.channel_rack.is_muted(channel)
+        flslChannels.mute_channel(channel,1 if is_muted else 0)
+        self.channel_rack.set_muted(channel,is_muted) # optimistic, OnDirtyChannel reads it again if FL Studio disagrees
+        self.update_track_leds()
+
+    def toggle_channel_solo(self,channel):
+        is_solo = not self.channel_rack.is_solo(channel)
+        flslChannels.solo_channel(channel,1 if is_solo else 0)
+        self.channel_rack.set_solo(channel,is_solo) # the mute state of the other channels arrives with OnDirtyChannel
+        self.update_track_leds()
+
+    def get_overview_led_value(self,step_count):
+        # density of a bar, step_count is the number of steps on out of APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR
+        if step_count == 0:
+            return APC40_LED_CLIP_LAUNCH_STATE_OFF
+        if step_count <= APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR // 4:
+            return APC40_LED_CLIP_LAUNCH_STATE_GREEN
+        if step_count <= APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR // 2:
+            return APC40_LED_CLIP_LAUNCH_STATE_YELLOW
+        return APC40_LED_CLIP_LAUNCH_STATE_RED
+
+    def update_overview_leds(self):
+        # one cached window per channel, popcount per bar, no get_grid_bit calls once the channels are cached
+        for row in range(APP_BEATMAKER_OVERVIEW_ROWS):
+            channel = self.overview_channel_offset + row
+            if channel < self.channel_rack.count() or self.channel_rack.count() == 0:
+                window = self.grid_cache.get_window(channel,0,APP_BEATMAKER_OVERVIEW_COLUMNS*APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR)
+                bar_counts = reduce_window(window,APP_BEATMAKER_OVERVIEW_COLUMNS,APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR,MIDAS_GRID_REDUCE_COUNT)
+            else:
+                bar_counts = [0] * APP_BEATMAKER_OVERVIEW_COLUMNS
+            for column in range(APP_BEATMAKER_OVERVIEW_COLUMNS):
+                self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*APC40_BUTTONS_CLIP_LAUNCH[(row*APC40_N_CHANNELS_NO_MASTER)+column],self.get_overview_led_value(bar_counts[column]))
+
+    def update_leds(self):
+        if self.is_overview:
+            self.update_overview_leds()
+        else:
+            self.update_drum_pad_leds()
+
+    def toggle_overview(self):
+        self.is_overview = not self.is_overview
+        if self.is_overview:
+            self.overview_channel_offset = (self.target_channel // APP_BEATMAKER_OVERVIEW_ROWS) * APP_BEATMAKER_OVERVIEW_ROWS
+        else:
+            # the last clip launch row holds function buttons on the drum pad page, clear what the overview left there
+            for button in APC40_BUTTONS_CLIP_LAUNCH[(APC40_N_CLIP_LAUNCH_ROWS-1)*APC40_N_CHANNELS_NO_MASTER:]:
+                self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*button,APC40_LED_CLIP_LAUNCH_STATE_OFF)
+        self.update_leds()
+
+    def process_overview_button(self,port,data1):
+        # jump the drum pads to the channel and bar of the tapped cell
+        for i in range(APP_BEATMAKER_OVERVIEW_ROWS*APP_BEATMAKER_OVERVIEW_COLUMNS):
+            if APC40_BUTTONS_CLIP_LAUNCH[i] == (port,data1):
+                self.target_channel = self.overview_channel_offset + (i // APC40_N_CHANNELS_NO_MASTER)
+                self.channel_offset = ((i % APC40_N_CHANNELS_NO_MASTER) * APP_BEATMAKER_OVERVIEW_STEPS_PER_BAR) // self.zoom_level
+                self.clamp_channel_offset() # bars past the end of the pattern show its last window
+                flslChannels.select_single_channel(self.channel_rack.global_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio
+                self.update_track_leds()
+                self.toggle_overview()
+                return True
+        return False
+
+    def get_drum_pad_window_hash(self):
+        return self.grid_cache.window_hash(self.target_channel,self.channel_offset*self.zoom_level,len(BUTTONS_PAD)*self.zoom_level)
+
+    def onFruityLoopProgramChange(self,flags):
+        self.grid_cache.on_refresh(flags) # HW_Dirty_Patterns drops the cached steps
+        self.channel_rack.on_refresh(flags)
+        self.step_param_cache.on_refresh(flags)
+        self.pattern_cache.on_refresh(flags)
+        if flags & HW_Dirty_Patterns:
+            self.clamp_channel_offset() # the new pattern may be shorter
+            self.drum_pad_neighbours_window = None
+        if flags & (HW_ChannelEvent | HW_Dirty_Mixer_Controls):
+            self.update_track_leds() # mute and solo changed in FL Studio, only the differing LEDs are sent
+        if self.is_overview:
+            self.update_overview_leds() # keep the overview live
+        elif flags & HW_Dirty_Patterns and self.get_drum_pad_window_hash() != self.drum_pad_window_hash:
+            self.update_drum_pad_leds()
+
+    def onFruityLoopDirtyChannel(self,index,flag):
+        self.grid_cache.on_dirty_channel(index,flag)
+        self.channel_rack.on_dirty_channel(index,flag)
+        self.step_param_cache.on_dirty_channel(index,flag)
+        self.update_track_leds() # only the channels FL Studio reported are read again
+        if self.is_overview:
+            self.update_overview_leds()
                 
     def zoom_in(self):
         if self.zoom_level == 1:
@@ -1112,92 +1642,305 @@ class MidasAppBeatmaker(MidasApplication):
         else :
             print("[LOGICAL ERROR] appBeatmaker.zoom_out() , self.zoom_level set to invalid value. Expected 1, 4 or 8.")  
 
+    def setup_handlers(self):
+        # One dict lookup per event instead of testing every button of the app in turn
+        self.register_handler(COMMAND_IN_NOTEON,BUTTON_LED_FUNC_GENERATOR,self.on_generator_press)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_LED_FUNC_GENERATOR,self.on_generator_release)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_LED_FUNC_OVERVIEW,self.on_overview)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_LED_FUNC_STEP_RECORD,self.on_step_record)
+        self.handlers.register_all(COMMAND_IN_NOTEON,BUTTONS_PAD,self.on_pad_press)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_LED_FUNC_STEP_PARAM,self.on_step_param)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_TRACK_MUTE,self.on_track_mute)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_TRACK_SOLO,self.on_track_solo)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_TRACK_SELECT,self.on_track_select)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_LED_FUNC_UNDO,self.on_undo)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_LED_FUNC_REDO,self.on_redo)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_CHANNEL_UP,self.on_channel_up)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_CHANNEL_DOWN,self.on_channel_down)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_ZOOM_IN,self.on_zoom_in)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_ZOOM_OUT,self.on_zoom_out)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_MOVE_LEFT,self.on_move_left)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_MOVE_RIGHT,self.on_move_right)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_FILL,self.on_fill)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_PAD_FUNC_FILL_TYPE,self.on_fill_type)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,[
+            BUTTON_PAD_FUNC_CLEAR,
+            BUTTON_PAD_FUNC_SOLO,
+            BUTTON_PAD_FUNC_MUTE,
+            BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST,
+            BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_VOLUME_PAN_PITCH,
+            BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_TARGET_BAND
+        ],self.on_unimplemented_button)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_PAD,self.on_pad)
+        self.register_handler(COMMAND_IN_CONTROLCHANGE,CONTROLLER_CHANNEL_CONTROL_GENERATOR_PULSES,self.on_generator_control)
+        self.register_handler(COMMAND_IN_CONTROLCHANGE,CONTROLLER_CHANNEL_CONTROL_GENERATOR_ROTATION,self.on_generator_control)
+        self.register_handler(COMMAND_IN_CONTROLCHANGE,CONTROLLER_CHANNEL_CONTROL_VOLUME_PAN_PITCH,self.on_channel_control_volume_pan_pitch)
+        self.register_handler(COMMAND_IN_CONTROLCHANGE,CONTROLLER_CHANNEL_CONTROL_COMP_GATE_DIST,self.on_channel_control_comp_gate_dist)
+
+    def on_generator_press(self,control,value):
+        self.begin_generator()
+
+    def on_generator_release(self,control,value):
+        self.commit_generator()
+
+    def on_overview(self,control,value):
+        self.toggle_overview()
+
+    def on_step_record(self,control,value):
+        self.toggle_step_record()
+
+    def on_pad_press(self,control,value):
+        if self.is_step_recording:
+            self.record_step_hit() # recorded on press, the release would be late by the length of the hit
+
+    def on_step_param(self,control,value):
+        self.toggle_step_edit(APP_BEATMAKER_STEP_PARAMS[BUTTONS_LED_FUNC_STEP_PARAM.index(control)])
+
+    def on_undo(self,control,value):
+        self.undo()
+
+    def on_redo(self,control,value):
+        self.redo()
+
+    def on_channel_up(self,control,value):
+        print("Func Channel + Detected.")
+        if self.target_channel > 0:
+            self.select_target_channel(self.target_channel - 1)
+        else:
+            self.select_target_channel(self.target_channel)
+
+    def on_channel_down(self,control,value):
+        if self.target_channel < self.channel_rack.count() - 1:
+            self.select_target_channel(self.target_channel + 1)
+        else:
+            self.select_target_channel(self.target_channel)
+
+    def on_track_mute(self,control,value):
+        channel = self.get_channel_bank() + control[BUTTON_INDEX]
+        if channel < self.channel_rack.count():
+            self.toggle_channel_mute(channel)
+
+    def on_track_solo(self,control,value):
+        channel = self.get_channel_bank() + BUTTONS_TRACK_SOLO.index(control)
+        if channel < self.channel_rack.count():
+            self.toggle_channel_solo(channel)
+
+    def on_track_select(self,control,value):
+        channel = self.get_channel_bank() + BUTTONS_TRACK_SELECT.index(control)
+        if channel < self.channel_rack.count():
+            self.select_target_channel(channel)
+
+    def on_zoom_in(self,control,value):
+        self.zoom_in()        
+        self.clamp_channel_offset()
+        self.update_drum_pad_leds()
+
+    def on_zoom_out(self,control,value):
+        self.zoom_out() 
+        self.clamp_channel_offset()
+        self.update_drum_pad_leds()
+
+    def on_move_left(self,control,value):
+        if self.channel_offset > 0:
+            self.channel_offset -= 1
+            self.update_drum_pad_leds()
+
+    def on_move_right(self,control,value):
+        if self.channel_offset < self.get_max_channel_offset(): # stop at the end of the pattern
+            self.channel_offset += 1
+            self.update_drum_pad_leds()
+
+    def apply_fill(self,fill_type):
+        # Only the steps of the pad window that differ from the fill are written to FL Studio
+        mask = self.fill_masks.get(fill_type,len(BUTTONS_PAD),self.zoom_level)
+        self.grid_journal.apply_mask(self.target_channel,self.channel_offset*self.zoom_level,len(BUTTONS_PAD)*self.zoom_level,mask) # one undo step for the whole fill
+        self.update_drum_pad_leds()
+
+    def on_fill(self,control,value):
+        if self.is_filling == False:
+            self.is_filling = True
+        else:
+            self.is_filling = False
+            # Apply fill based on self.fill_type
+            self.apply_fill(self.fill_type)
+
+    def on_fill_type(self,control,value):
+        if self.is_filling :
+            if self.fill_type < APP_BEATMAKER_FILL_TYPE_4_TRIPLET: # we have 9 fill types
+                self.fill_type += 1
+            else: # warp back to first fill type
+                self.fill_type = APP_BEATMAKER_FILL_TYPE_16
+
+    def on_unimplemented_button(self,control,value):
+        print("Channel+ button detected.") # handle button presses
+
+    def on_pad(self,control,value):
+        if self.is_step_recording:
+            return # the pad was recorded when it was pressed
+        self.step_edit_row = control[BUTTON_INDEX] // APP_BEATMAKER_STEP_EDIT_STEPS
+        self.toggle_drum_pad(control[BUTTON_INDEX]) # BUTTONS_PAD[i] is (i, BUTTONS_GROUP_PAD)
+        self.update_drum_pad_leds() # only the toggled pad is sent
+
+    def on_generator_control(self,control,value):
+        if self.is_generating:
+            self.preview_generator(control,value)
+
+    def on_channel_control_volume_pan_pitch(self,control,value):
+        if self.ccvpp_control_state == PCVPP_CONTROL_STATE_VOLUME: # Targeting Volume Knob
+            #flslChannels.setChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel),event.data2/127.0) # set the volume in fl studio
+            #flsl.device.midi_out_msg_params(176,0,48,event.data2) 				# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
+            pass
+        elif self.ccvpp_control_state == PCVPP_CONTROL_STATE_PAN: # Targeting Pan Knob
+            #flslChannels.setChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
+            #flsl.device.midi_out_msg_params(176,0,48,event.data2)
+            pass
+        elif self.ccvpp_control_state == PCVPP_CONTROL_STATE_PITCH: # Targeting Pitch Knob
+            # flslChannels.setChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
+            # flsl.device.midi_out_msg_params(176,0,48,event.data2)
+            pass
+
+    def on_channel_control_comp_gate_dist(self,control,value):
+        pass
+
+    def onMidasProcess(self,status,port,data1,data2,sysex = None):
+        command = self.get_input_command(status,port)
+        if command is None:
+            return
+        if command == COMMAND_IN_CONTROLCHANGE: # Handle Control Change Commands
+            control = self.controller_map.get_control(port,data1)
+        else:
+            control = self.button_map.get_control(port,data1)
+        if command == COMMAND_IN_NOTEOFF and self.is_overview and control not in APP_BEATMAKER_OVERVIEW_GLOBAL_BUTTONS:
+            self.process_overview_button(port,data1) # the overview page owns the whole clip launch grid
+        elif command == COMMAND_IN_NOTEON and control is None and self.is_step_recording and data2 > 0:
+            self.record_step_hit() # a note that is not a button of the app, for example from a keyboard
+        elif command == COMMAND_IN_CONTROLCHANGE and self.step_edit_param is not None and not self.is_generating and control in CONTROLLERS_CHANNEL_CONTROL:
+            self.edit_step_param(control[BUTTON_INDEX],data2) # the track knobs edit the steps of the pad row
+        elif control is not None:
+            self.handlers.dispatch(command,control,data2)
+
+# module: app_clip_launcher
+# The clip launch grid shows 8 playlist tracks (columns) by 5 live blocks (rows) of the performance mode
+BUTTONS_GROUP_CLIP = 4
+BUTTONS_GROUP_CLIP_STOP = 5
+BUTTONS_GROUP_CLIP_NAV = 6
+
+APP_CLIP_LAUNCHER_COLUMNS = APC40_N_CHANNELS_NO_MASTER
+APP_CLIP_LAUNCHER_ROWS = APC40_N_CLIP_LAUNCH_ROWS
+
+BUTTONS_CLIP = [(None, None)] * (APP_CLIP_LAUNCHER_COLUMNS * APP_CLIP_LAUNCHER_ROWS) # cell i of the live grid, row i // 8 and column i % 8
+for i in range(len(BUTTONS_CLIP)):
+    BUTTONS_CLIP[i] = i, BUTTONS_GROUP_CLIP
+
+BUTTONS_CLIP_STOP = [(None, None)] * APP_CLIP_LAUNCHER_COLUMNS # stop the track of the column, lit while a block of the window plays on it
+for i in range(len(BUTTONS_CLIP_STOP)):
+    BUTTONS_CLIP_STOP[i] = i, BUTTONS_GROUP_CLIP_STOP
+
+BUTTON_CLIP_NAV_UP = 0, BUTTONS_GROUP_CLIP_NAV # previous block
+BUTTON_CLIP_NAV_DOWN = 1, BUTTONS_GROUP_CLIP_NAV # next block
+BUTTON_CLIP_NAV_RIGHT = 2, BUTTONS_GROUP_CLIP_NAV # next track
+BUTTON_CLIP_NAV_LEFT = 3, BUTTONS_GROUP_CLIP_NAV # previous track
+BUTTONS_CLIP_NAV = [BUTTON_CLIP_NAV_UP,BUTTON_CLIP_NAV_DOWN,BUTTON_CLIP_NAV_RIGHT,BUTTON_CLIP_NAV_LEFT]
+
+BUTTONS_CLIP_LAUNCHER = BUTTONS_CLIP + BUTTONS_CLIP_STOP + BUTTONS_CLIP_NAV
+
+class MidasAppClipLauncher(MidasApplication):
+    live_grid = MidasLiveGrid(flslPlaylist.get_live_block_status,flslPlaylist.get_live_block_color,flslPlaylist.trigger_live_clip,flslPlaylist.get_performance_mode_state,APP_CLIP_LAUNCHER_COLUMNS,APP_CLIP_LAUNCHER_ROWS) # blocks under the clip buttons, polled a few cells per idle tick
+    led_state = MidasLedState(flslDevice.midi_out_msg_params) # only the clips that changed since the last frame are sent
+
+    def get_button_data(self,button):
+        return self.button_map.get_control_data(button)
+
+    def get_clip_led_value(self,status,color):
+        if status == MIDAS_LIVE_BLOCK_PLAYING:
+            return APC40_LED_CLIP_LAUNCH_STATE_GREEN
+        if status == MIDAS_LIVE_BLOCK_SCHEDULED:
+            return APC40_LED_CLIP_LAUNCH_STATE_GREEN_BLINK
+        if status == MIDAS_LIVE_BLOCK_FILLED:
+            # the clip launch LEDs are not RGB, red blocks are shown red and the other colours yellow
+            red, green, blue = color & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF
+            return APC40_LED_CLIP_LAUNCH_STATE_RED if red > green and red > blue else APC40_LED_CLIP_LAUNCH_STATE_YELLOW
+        return APC40_LED_CLIP_LAUNCH_STATE_OFF
+
+    def update_clip_led(self,cell,status,color):
+        self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_CLIP[cell]),self.get_clip_led_value(status,color))
+
+    def update_clip_stop_led(self,column):
+        # only the blocks of the window are known, a track playing a block outside of it is not lit
+        is_playing = 0
+        for row in range(APP_CLIP_LAUNCHER_ROWS):
+            if self.live_grid.status((row * APP_CLIP_LAUNCHER_COLUMNS) + column) in (MIDAS_LIVE_BLOCK_PLAYING,MIDAS_LIVE_BLOCK_SCHEDULED):
+                is_playing = 1
+                break
+        self.led_state.set(self.command_map.get_command_data(COMMAND_OUT_LEDON),*self.get_button_data(BUTTONS_CLIP_STOP[column]),is_playing)
+
+    def clear_clip_leds(self):
+        for cell in range(len(BUTTONS_CLIP)):
+            self.update_clip_led(cell,MIDAS_LIVE_BLOCK_EMPTY,0)
+        for column in range(len(BUTTONS_CLIP_STOP)):
+            self.update_clip_stop_led(column)
+
+    def on_clip_change(self,cell,status,color):
+        # called by the live grid poll for the cells whose status or colour changed
+        self.update_clip_led(cell,status,color)
+        self.update_clip_stop_led(cell % APP_CLIP_LAUNCHER_COLUMNS)
+
+    def move_window(self,track,block):
+        last_track = max(MIDAS_LIVE_FIRST_TRACK,(flslPlaylist.track_count() or 0) - APP_CLIP_LAUNCHER_COLUMNS + 1)
+        track = max(MIDAS_LIVE_FIRST_TRACK,min(track,last_track))
+        block = max(0,block)
+        if track != self.live_grid.track or block != self.live_grid.block:
+            self.live_grid.set_window(track,block) # every cell is reported again by the next polls, the LED state only sends the ones that differ
+
+    def setup_handlers(self):
+        self.handlers.register_all(COMMAND_IN_NOTEON,BUTTONS_CLIP,self.on_clip_press)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_CLIP,self.on_clip_release)
+        self.handlers.register_all(COMMAND_IN_NOTEOFF,BUTTONS_CLIP_STOP,self.on_clip_stop)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_CLIP_NAV_UP,self.on_window_up)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_CLIP_NAV_DOWN,self.on_window_down)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_CLIP_NAV_RIGHT,self.on_window_right)
+        self.register_handler(COMMAND_IN_NOTEOFF,BUTTON_CLIP_NAV_LEFT,self.on_window_left)
+
+    def on_clip_press(self,control,value):
+        if self.live_grid.is_performance_mode():
+            self.live_grid.trigger(control[BUTTON_INDEX]) # launched on press, the (track, block) was resolved when the window moved
+
+    def on_clip_release(self,control,value):
+        if self.live_grid.is_performance_mode():
+            self.live_grid.trigger(control[BUTTON_INDEX],MIDAS_LIVE_TRIGGER_FLAGS | TLC_Release) # blocks in gate trigger mode stop on release
+
+    def on_clip_stop(self,control,value):
+        if self.live_grid.is_performance_mode():
+            self.live_grid.stop(control[BUTTON_INDEX])
+
+    def on_window_up(self,control,value):
+        self.move_window(self.live_grid.track,self.live_grid.block - 1)
+
+    def on_window_down(self,control,value):
+        self.move_window(self.live_grid.track,self.live_grid.block + 1)
+
+    def on_window_right(self,control,value):
+        self.move_window(self.live_grid.track + 1,self.live_grid.block)
+
+    def on_window_left(self,control,value):
+        self.move_window(self.live_grid.track - 1,self.live_grid.block)
+
+    def onFruityLoopProgramChange(self,flags):
+        self.live_grid.on_refresh(flags)
+        if not self.live_grid.is_performance_mode():
+            self.clear_clip_leds() # nothing is polled outside of performance mode
+
+    def onFruityLoopIdle(self):
+        self.live_grid.poll(self.on_clip_change) # round robin within the poll budget, only changed cells are sent
+
     def onMidasProcess(self,status,port,data1,data2,sysex = None):
-            if self.command_map.is_command_offset_by_channel(COMMAND_IN_NOTEON,status,port):
-                pass
-            elif self.command_map.is_command_offset_by_channel(COMMAND_IN_NOTEOFF,status,port):
-                print("Note On Detected")
-                if self.button_map.is_control(BUTTON_PAD_FUNC_CHANNEL_UP,port,data1): 
-                    print("Func Channel + Detected.")
-                    if self.target_channel > 0:
-                        self.target_channel -= 1
-                    flslChannels.select_single_channel(flslChannels.get_channel_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_CHANNEL_DOWN,port,data1): 
-                    if self.target_channel < self.channel_count - 1:
-                        self.target_channel += 1
-                    flslChannels.select_single_channel(flslChannels.get_channel_index(self.target_channel)) # Set the selected channel to the current_channel in FL Studio              
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_ZOOM_IN,port,data1):
-                    self.zoom_in()        
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_ZOOM_OUT,port,data1): 
-                    self.zoom_out() 
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_MOVE_LEFT,port,data1): 
-                    if self.channel_offset > 0:
-                        self.channel_offset -= 1
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_MOVE_RIGHT,port,data1): 
-                    if self.channel_offset < 4:
-                        self.channel_offset += self.channel_offset
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_FILL,port,data1): 
-                    if self.is_filling == False:
-                        self.is_filling = True
-                    else:
-                        self.is_filling = False
-                        # Apply fill based on self.fill_type
-                        if APP_BEATMAKER_FILL_TYPE_16 == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_8 == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_4 == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_16_DOTTED == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_8_DOTTED == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_4_DOTTED == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_16_TRIPLET == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_8_TRIPLET == self.fill_type:
-                            pass
-                        elif APP_BEATMAKER_FILL_TYPE_4_TRIPLET == self.fill_type:
-                            pass
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_FILL_TYPE,port,data1): 
-                    if self.is_filling :
-                        if self.fill_type <= 9: # we have 9 fill types
-                            self.fill_type += 1
-                        else: # warp back to first fill type
-                            self.fill_type = APP_BEATMAKER_FILL_TYPE_16
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_CLEAR,port,data1): 
-                    print("Channel+ button detected.") # handle button presses
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_SOLO,port,data1): 
-                    print("Channel+ button detected.") # handle button presses
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_MUTE,port,data1): 
-                    print("Channel+ button detected.") # handle button presses
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST,port,data1): 
-                    print("Channel+ button detected.") # handle button presses
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_VOLUME_PAN_PITCH,port,data1): 
-                    print("Channel+ button detected.") # handle button presses
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_TARGET_BAND,port,data1): 
-                    print("Channel+ button detected.") # handle button presses
-                elif self.button_map.is_control(BUTTON_PAD_FUNC_PROGRAM_CHANGE_CHANNEL_COMP_GATE_DIST,port,data1): 
-                    print("Channel+ button detected.") # handle button presses                
-                elif self.button_map.is_control_from_list(BUTTONS_PAD,port,data1): # handle drum pads
-                    print("One of the pad buttons detected.") 
-            elif self.command_map.is_command_offset_by_channel(COMMAND_IN_CONTROLCHANGE,port,status): # Handle Control Change Commands
-                    if self.button_map.is_control(CONTROLLER_CHANNEL_CONTROL_VOLUME_PAN_PITCH,port,data1): 
-                        if self.ccvpp_control_state == PCVPP_CONTROL_STATE_VOLUME: # Targeting Volume Knob
-                            #flslChannels.setChannelVolume(flslChannels.getChannelIndex(DrumPadTargetChannel),event.data2/127.0) # set the volume in fl studio
-                            #flsl.device.midi_out_msg_params(176,0,48,event.data2) 				# Update the value of the Track Control 1 Knob Target to the Volume of selected channel
-                            pass
-                        elif self.ccvpp_control_state == PCVPP_CONTROL_STATE_PAN: # Targeting Pan Knob
-                            #flslChannels.setChannelPan(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
-                            #flsl.device.midi_out_msg_params(176,0,48,event.data2)
-                            pass
-                        elif self.ccvpp_control_state == PCVPP_CONTROL_STATE_PITCH: # Targeting Pitch Knob
-                            # flslChannels.setChannelPitch(flslChannels.getChannelIndex(DrumPadTargetChannel),((event.data2/127.0)*2)-1)
-                            # flsl.device.midi_out_msg_params(176,0,48,event.data2)
-                            pass
-                    elif self.button_map.is_control(CONTROLLER_CHANNEL_CONTROL_COMP_GATE_DIST,port,data1): 
-                            pass          
+        command = self.get_input_command(status,port)
+        if command is None:
+            return
+        control = self.button_map.get_control(port,data1)
+        if control is not None:
+            self.handlers.dispatch(command,control,data2)
+
 # midi input simulation    
 #proccess_event_raw(APP_DRUMPAD_DEVICE_APC40_BUTTON_MAP,APP_DRUMPAD_DEVICE_APC40_COMMAND_MAP,APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,0,APC40_BUTTONS_CLIP_LAUNCH[1][1],127)
 
@@ -1221,50 +1964,94 @@ def merge_list_alternating(list1, list2):
 ####################################################################################################################
 ####################################################################################################################
 
-Test = MidasAppBeatmaker()
-# Generate button map
-Test.button_map.generate(BUTTONS,    
-    # First 4 rows of the Clip Launch section: 32 buttons
-    APC40_BUTTONS_CLIP_LAUNCH[:(APC40_N_CLIP_LAUNCH_ROWS - 1) * (APC40_N_CHANNELS_NO_MASTER)] +
-    # Last row of clip launch and clip stop [first 7 buttons, alternating]: 14 buttons
-    merge_list_alternating(
-        APC40_BUTTONS_CLIP_LAUNCH[(APC40_N_CLIP_LAUNCH_ROWS - 1) * (APC40_N_CHANNELS_NO_MASTER):-1],
-        APC40_BUTTONS_CLIP_STOP[:-1]
-    ) +
-    # Channel Control Buttons = Track Control buttons | 4 buttons
-    [APC40_BUTTON_PAN, APC40_BUTTON_SEND_A, APC40_BUTTON_SEND_B, APC40_BUTTON_SEND_C]
-)
-#print('My button list:', *Test.button_map.data.keys(), sep='\n- ')
-#print('My button list:', *Test.button_map.data.values(), sep='\n- ')
-# for i in range(len(list(Test.button_map.data.values()))):
-#     print("chan:",list(Test.button_map.data.values())[i].channel(int(list(Test.button_map.data.values())[i])))
-    # print("id",list(Test.button_map.data.values())[i].id(list(Test.button_map.data.values())[i]))
-
-
-
-for k, v in Test.button_map.data.items():
-    print(v.channel())
-    print(k, v)
-
-
-# Generate command map
-Test.command_map.generate(COMMANDS,[
-    APC40_IN_MIDI_COMMAND_BUTTON_PRESS,
-    APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,
-    APC40_IN_MIDI_COMMAND_CONTROL_CHANGE,
-    APC40_OUT_MIDI_COMMAND_LED_ON,
-    APC40_OUT_MIDI_COMMAND_LED_OFF,
-    APC40_OUT_MIDI_COMMAND_CONTROL_SET
-    ])
-
-
-#for k, v in Test.command_map.data.items():
-#    print(k, v)
-
-
-#print(APC40_BUTTONS_CLIP_LAUNCH[4*8][1])
-#print(APC40_BUTTONS_CLIP_LAUNCH[4*8][0])
-Test.onMidasProcess(APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,APC40_BUTTONS_CLIP_LAUNCH[4*8][0],APC40_BUTTONS_CLIP_LAUNCH[4*8][1],127)
+def create_beatmaker_test_app():
+    test_app = MidasAppBeatmaker()
+    # Generate button map
+    test_app.button_map.generate(BUTTONS,    
+        # First 4 rows of the Clip Launch section: 32 buttons
+        APC40_BUTTONS_CLIP_LAUNCH[:(APC40_N_CLIP_LAUNCH_ROWS - 1) * (APC40_N_CHANNELS_NO_MASTER)] +
+        # Last row of clip launch and clip stop [first 7 buttons, alternating]: 14 buttons
+        merge_list_alternating(
+            APC40_BUTTONS_CLIP_LAUNCH[(APC40_N_CLIP_LAUNCH_ROWS - 1) * (APC40_N_CHANNELS_NO_MASTER):-1],
+            APC40_BUTTONS_CLIP_STOP[:-1]
+        ) +
+        # Channel Control Buttons = Track Control buttons | 4 buttons
+        [APC40_BUTTON_PAN, APC40_BUTTON_SEND_A, APC40_BUTTON_SEND_B, APC40_BUTTON_SEND_C] +
+        # Overview page toggle | 1 button
+        [APC40_BUTTON_MASTER] +
+        # Undo , Redo | 2 buttons
+        [APC40_BUTTON_NUDGE_MINUS, APC40_BUTTON_NUDGE_PLUS] +
+        # Rhythm generator, held while turning the generator knobs | 1 button
+        [APC40_BUTTON_SHIFT] +
+        # Step record toggle | 1 button
+        [APC40_BUTTON_RECORD] +
+        # Step parameter editor: velocity, pitch, pan, release, shift | 5 buttons
+        APC40_BUTTONS_SCENE_LAUNCH +
+        # Mute, solo and target channel of the 8 channels of the bank | 24 buttons
+        APC40_BUTTONS_ACTIVATOR + APC40_BUTTONS_SOLOCUE + APC40_BUTTONS_RECARM
+    )
+    # Generate controller map, the channel controls are the Track Control knobs
+    test_app.controller_map.generate(CONTROLLERS,APC40_CONTROLLERS_TRACK_CONTROL_ABSOLUTE)
+    #print('My button list:', *test_app.button_map.data.keys(), sep='\n- ')
+    #print('My button list:', *test_app.button_map.data.values(), sep='\n- ')
+    # for i in range(len(list(test_app.button_map.data.values()))):
+    #     print("chan:",list(test_app.button_map.data.values())[i].channel(int(list(test_app.button_map.data.values())[i])))
+        # print("id",list(test_app.button_map.data.values())[i].id(list(test_app.button_map.data.values())[i]))
+
+
+
+    for k, v in test_app.button_map.data.items():
+        print(v.channel())
+        print(k, v)
+
+
+    # Generate command map
+    test_app.command_map.generate(COMMANDS,[
+        APC40_IN_MIDI_COMMAND_BUTTON_PRESS,
+        APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,
+        APC40_IN_MIDI_COMMAND_CONTROL_CHANGE,
+        APC40_OUT_MIDI_COMMAND_LED_ON,
+        APC40_OUT_MIDI_COMMAND_LED_OFF,
+        APC40_OUT_MIDI_COMMAND_CONTROL_SET
+        ])
+
+
+    #for k, v in test_app.command_map.data.items():
+    #    print(k, v)
+
+
+    #print(APC40_BUTTONS_CLIP_LAUNCH[4*8][1])
+    #print(APC40_BUTTONS_CLIP_LAUNCH[4*8][0])
+    return test_app
+
+def create_clip_launcher_test_app():
+    test_app = MidasAppClipLauncher()
+    # Generate button map
+    test_app.button_map.generate(BUTTONS_CLIP_LAUNCHER,
+        # Clip Launch section, 8 tracks by 5 blocks: 40 buttons
+        APC40_BUTTONS_CLIP_LAUNCH +
+        # Clip Stop, one per track: 8 buttons
+        APC40_BUTTONS_CLIP_STOP +
+        # Window navigation | 4 buttons
+        [APC40_BUTTON_UP, APC40_BUTTON_DOWN, APC40_BUTTON_RIGHT, APC40_BUTTON_LEFT]
+    )
+    # Generate command map
+    test_app.command_map.generate(COMMANDS,[
+        APC40_IN_MIDI_COMMAND_BUTTON_PRESS,
+        APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,
+        APC40_IN_MIDI_COMMAND_CONTROL_CHANGE,
+        APC40_OUT_MIDI_COMMAND_LED_ON,
+        APC40_OUT_MIDI_COMMAND_LED_OFF,
+        APC40_OUT_MIDI_COMMAND_CONTROL_SET
+        ])
+    return test_app
+
+# Built on first use instead of when FL Studio imports the script.
+Test = MidasLazy(create_beatmaker_test_app, "Test")
+TestClipLauncher = MidasLazy(create_clip_launcher_test_app, "TestClipLauncher")
+
+if __name__ == "__main__":
+    Test.get().onMidasProcess(APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,APC40_BUTTONS_CLIP_LAUNCH[4*8][0],APC40_BUTTONS_CLIP_LAUNCH[4*8][1],127)
 
 #proccess_event_raw(APP_DRUMPAD_DEVICE_APC40_BUTTON_MAP,APP_DRUMPAD_DEVICE_APC40_COMMAND_MAP,APC40_IN_MIDI_COMMAND_BUTTON_RELEASE,0,APC40_BUTTONS_CLIP_LAUNCH[1][1],127)
 
@@ -62,6 +62,19 @@
 # 10           <Version Low> PC application Software version minor
 # 11           <Bugfix Level> PC Application Software bug-fix level
 # 12           0xF7   MIDI System exclusive message terminator
+APC40_MODE_GENERIC = 0x40
+APC40_MODE_ABLETON_LIVE = 0x41
+APC40_MODE_ALTERNATE_ABLETON_LIVE = 0x42
+
+APC40_MODES = [
+    APC40_MODE_GENERIC,
+    APC40_MODE_ABLETON_LIVE,
+    APC40_MODE_ALTERNATE_ABLETON_LIVE
+    ]
+
+def apc40_introduction_sysex(mode, device_id = 0x7F, version_high = 0, version_low = 0, bugfix_level = 0):
+    # Type 0 outbound message, every LED and LED ring of the device is reset by it
+    return bytes([0xF0, 0x47, device_id, 0x73, 0x60, 0x00, 0x04, mode, version_high, version_low, bugfix_level, 0xF7])
 
 
 
@@ -205,7 +218,7 @@ for i in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
 
 APC40_CONTROLLERS_TRACK_CONTROL_LEDRINGTYPE = [(None,None)] * 8
 for i in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
-    APC40_CONTROLLERS_TRACK_CONTROL_ABSOLUTE[i] = APC40_OUT_MIDI_CHANNEL_MASTER, 0x38 + i
+    APC40_CONTROLLERS_TRACK_CONTROL_LEDRINGTYPE[i] = APC40_OUT_MIDI_CHANNEL_MASTER, 0x38 + i
 
 APC40_CONTROLLERS_DEVICE_CONTROL_ABSOLUTE = [(None,None)] * (APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE * APC40_N_CHANNELS)
 for id in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
@@ -217,6 +230,15 @@ for id in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
     for channel in range(APC40_N_CHANNELS) :
         APC40_CONTROLLERS_DEVICE_CONTROL_LEDRINGTYPE[channel+(id*APC40_N_CHANNELS)] = channel , 0x18 + id
 
+# LED rings as (channel, value id, ring type id), the value is sent to the controller id and the style to the ring type id
+APC40_RINGS_TRACK_CONTROL = [(None,None,None)] * 8
+for i in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE) :
+    APC40_RINGS_TRACK_CONTROL[i] = APC40_CONTROLLERS_TRACK_CONTROL_ABSOLUTE[i] + APC40_CONTROLLERS_TRACK_CONTROL_LEDRINGTYPE[i][1:]
+
+APC40_RINGS_DEVICE_CONTROL = [(None,None,None)] * (APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE * APC40_N_CHANNELS)
+for i in range(APC40_N_DEVICE_CONTROL_CONTROLLER_ABSOLUTE * APC40_N_CHANNELS) :
+    APC40_RINGS_DEVICE_CONTROL[i] = APC40_CONTROLLERS_DEVICE_CONTROL_ABSOLUTE[i] + APC40_CONTROLLERS_DEVICE_CONTROL_LEDRINGTYPE[i][1:]
+
 APC40_CONTROLLER_CUE_LEVEL_RELATIVE = APC40_OUT_MIDI_CHANNEL_MASTER ,0x2F
 
 # Absolute controller LED state types
@@ -0,0 +1,214 @@
+import heapq as midaslib_beat_heapq
+import time as midaslib_beat_time
+
+MIDAS_BEAT_INDICATOR_OFF = 0
+MIDAS_BEAT_INDICATOR_BAR = 1
+MIDAS_BEAT_INDICATOR_BEAT = 2
+
+MIDAS_BEAT_DEFAULT_POLL_INTERVAL = 0.25 # Seconds between polls of the FL Studio song position.
+
+
+class MidasBeatEvent:
+    """
+    A callback scheduled at a musical position of the MidasBeatScheduler.
+
+    Attributes:
+        tick (int): Song position in ticks at which the callback fires next.
+        interval (int): Ticks between repeats, 0 for a one shot event.
+        callback: Called with the song position in ticks it was scheduled for.
+        cancelled (bool): True if the event was cancelled.
+    """
+
+    def __init__(self, tick: int, interval: int, callback):
+        """
+        Initialize a MidasBeatEvent.
+
+        Args:
+            tick (int): Song position in ticks at which the callback fires.
+            interval (int): Ticks between repeats, 0 for a one shot event.
+            callback: Called with the song position in ticks it was scheduled for.
+        """
+        self.tick = tick
+        self.interval = interval
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return self.tick < other.tick
+
+
+class MidasBeatScheduler:
+    """
+    Fires callbacks at musical positions of the FL Studio song.
+
+    The song position is extrapolated from the last known position, tempo and PPQ so that
+    FL Studio only has to be polled every `poll_interval` seconds. Every bar or beat
+    reported by OnUpdateBeatIndicator snaps the estimate to the nearest beat, which
+    corrects drift between polls. Due callbacks are collected and fired together once per
+    call to on_idle. The estimate never moves back by less than a beat, so a correction
+    does not fire an event again; a larger jump back is a loop or seek.
+
+    Attributes:
+        poll_interval (float): Seconds between polls of the FL Studio song position.
+        ppq (int): Ticks per quarter note of the project.
+
+    Methods:
+        __init__(self, get_song_tick_pos, get_ppq, get_tempo, is_playing, poll_interval, clock): Initialize the scheduler.
+        schedule_at(self, tick, callback): Fire a callback once at a song position.
+        schedule_every(self, interval, callback, phase): Fire a callback repeatedly on a musical grid.
+        cancel(self, event): Cancel a scheduled event.
+        current_tick(self): Get the estimated song position in ticks.
+        on_update_beat_indicator(self, value): Forward OnUpdateBeatIndicator to correct drift.
+        on_idle(self): Poll FL Studio if needed and fire all due callbacks.
+    """
+
+    def __init__(self, get_song_tick_pos, get_ppq, get_tempo, is_playing,
+                 poll_interval: float = MIDAS_BEAT_DEFAULT_POLL_INTERVAL, clock=midaslib_beat_time.perf_counter):
+        """
+        Initialize the scheduler.
+
+        Args:
+            get_song_tick_pos: Returns the song position in ticks.
+            get_ppq: Returns the ticks per quarter note of the project.
+            get_tempo: Returns the tempo in beats per minute.
+            is_playing: Returns True if the transport is playing.
+            poll_interval (float): Seconds between polls of the FL Studio song position.
+            clock: Monotonic clock returning seconds.
+        """
+        self.poll_interval = poll_interval
+        self.ppq = 96
+        self.__get_song_tick_pos = get_song_tick_pos
+        self.__get_ppq = get_ppq
+        self.__get_tempo = get_tempo
+        self.__is_playing = is_playing
+        self.__clock = clock
+        self.__events = []
+        self.__playing = False
+        self.__ticks_per_second = 0.0
+        self.__anchor_tick = 0.0
+        self.__anchor_time = 0.0
+        self.__last_poll = None
+        self.__last_tick = 0
+
+    def schedule_at(self, tick: int, callback) -> MidasBeatEvent:
+        """
+        Fire a callback once at a song position.
+
+        Args:
+            tick (int): Song position in ticks.
+            callback: Called with the song position in ticks.
+
+        Returns:
+            MidasBeatEvent: The scheduled event, keep it to cancel the event later.
+        """
+        event = MidasBeatEvent(tick, 0, callback)
+        midaslib_beat_heapq.heappush(self.__events, event)
+        return event
+
+    def schedule_every(self, interval: int, callback, phase: int = 0) -> MidasBeatEvent:
+        """
+        Fire a callback repeatedly on a musical grid, for example every beat with interval=ppq.
+
+        Args:
+            interval (int): Ticks between repeats.
+            callback: Called with the song position in ticks of each grid line.
+            phase (int): Offset of the grid in ticks.
+
+        Returns:
+            MidasBeatEvent: The scheduled event, keep it to cancel the event later.
+        """
+        event = MidasBeatEvent(self.__next_grid_tick(self.__last_tick, interval, phase), max(1, interval), callback)
+        midaslib_beat_heapq.heappush(self.__events, event)
+        return event
+
+    def cancel(self, event: MidasBeatEvent):
+        """
+        Cancel a scheduled event. Cancelled events are discarded the next time they are due.
+
+        Args:
+            event (MidasBeatEvent): The event to cancel.
+        """
+        if event is not None:
+            event.cancelled = True
+
+    def current_tick(self) -> int:
+        """
+        Get the estimated song position in ticks.
+
+        Returns:
+            int: The song position, extrapolated from the last anchor if the transport is playing.
+        """
+        if not self.__playing:
+            return int(self.__anchor_tick)
+        return int(self.__anchor_tick + (self.__clock() - self.__anchor_time) * self.__ticks_per_second)
+
+    def on_update_beat_indicator(self, value: int):
+        """
+        Forward OnUpdateBeatIndicator to correct drift.
+
+        Args:
+            value (int): 0 off, 1 bar, 2 beat.
+        """
+        if value == MIDAS_BEAT_INDICATOR_OFF or not self.__playing:
+            return
+        # The indicator fires on a beat, snap the estimate to the nearest one.
+        now = self.__clock()
+        estimate = self.__anchor_tick + (now - self.__anchor_time) * self.__ticks_per_second
+        self.__anchor_tick = round(estimate / self.ppq) * self.ppq
+        self.__anchor_time = now
+
+    def on_idle(self):
+        """
+        Poll FL Studio if the poll interval passed and fire all due callbacks in one batch.
+        """
+        now = self.__clock()
+        if self.__last_poll is None or now - self.__last_poll >= self.poll_interval:
+            self.__poll(now)
+        if not self.__playing:
+            return
+
+        tick = self.current_tick()
+        if self.__last_tick - tick > self.ppq:
+            # The song position jumped back (loop or seek), move the repeating events back onto the grid.
+            self.__rewind(tick)
+        elif tick < self.__last_tick:
+            # A late beat indicator or poll pulled the estimate back a little, never fire a tick twice.
+            tick = self.__last_tick
+        self.__last_tick = tick
+
+        due = []
+        while self.__events and self.__events[0].tick <= tick:
+            event = midaslib_beat_heapq.heappop(self.__events)
+            if event.cancelled:
+                continue
+            due.append((event.tick, event))
+            if event.interval:
+                # Skip grid lines that were missed while FL Studio was busy, fire them only once.
+                event.tick = self.__next_grid_tick(tick + 1, event.interval, event.tick)
+                midaslib_beat_heapq.heappush(self.__events, event)
+        for event_tick, event in due:
+            event.callback(event_tick)
+
+    def __poll(self, now: float):
+        self.__last_poll = now
+        playing = bool(self.__is_playing())
+        self.ppq = self.__get_ppq() or self.ppq
+        self.__ticks_per_second = self.__get_tempo() / 60.0 * self.ppq
+        self.__anchor_tick = float(self.__get_song_tick_pos())
+        self.__anchor_time = now
+        if playing and not self.__playing:
+            self.__rewind(int(self.__anchor_tick))
+        self.__playing = playing
+
+    def __rewind(self, tick: int):
+        for event in self.__events:
+            if event.interval:
+                event.tick = self.__next_grid_tick(tick, event.interval, event.tick)
+        midaslib_beat_heapq.heapify(self.__events)
+        self.__last_tick = tick
+
+    @staticmethod
+    def __next_grid_tick(tick: int, interval: int, phase: int) -> int:
+        # First grid line at or after tick.
+        interval = max(1, interval)
+        return tick + (phase - tick) % interval
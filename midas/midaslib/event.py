@@ -1,4 +1,7 @@
 from itertools import zip_longest as midaslib_event_zip_longest
+import midaslib.scheduler as midaslib_event_scheduler
+import midaslib.worker as midaslib_event_worker
+import midaslib.writes as midaslib_event_writes
 
 
 class MidasControl:
@@ -278,6 +281,7 @@ class MidasMidiControlMap:
     def __init__(self):
         """Initialize MidasMidiControlMap with an empty dictionary."""
         self.__data = {}
+        self.__reverse = None # MIDI control to Midas controls, rebuilt on first lookup after a change.
 
     def data(self) -> dict:
         """Get the data dictionary."""
@@ -293,6 +297,7 @@ class MidasMidiControlMap:
 
         """
         self.__data[midas_control] = midi_control
+        self.__reverse = None
 
     def get_midas(self, midi_control: MidiControl) -> list[MidasControl]:
         """
@@ -305,7 +310,7 @@ class MidasMidiControlMap:
             list[MidasControl]: A list of Midas controls.
 
         """
-        return [a_midas_control for a_midas_control, a_midi_control in self.__data.items() if a_midi_control == midi_control]
+        return list(self.__get_reverse().get(midi_control, ()))
 
     def get_first_midas(self, midi_control: MidiControl) -> MidasControl or None:
         """
@@ -318,10 +323,8 @@ class MidasMidiControlMap:
             MidasControl or None: The first Midas control associated with the given MIDI control.
 
         """
-        for a_midas_control, a_midi_control in self.__data.items():
-            if a_midi_control == midi_control:
-                return a_midas_control
-        return None
+        midas_controls = self.__get_reverse().get(midi_control)
+        return midas_controls[0] if midas_controls else None
 
     def get_midi(self, midas_control: MidasControl) -> MidiControl:
         """
@@ -372,6 +375,7 @@ class MidasMidiControlMap:
                 self.__data[midas_control_list[i]] = midi_control_list[i]
             else:
                 self.__data[midas_control_list[i]] = MidiControl()
+        self.__reverse = None
 
     def regenerate(self, midas_control_list: list[MidasControl], midi_control_list: list[MidiControl]):
         """
@@ -388,6 +392,7 @@ class MidasMidiControlMap:
                 self.__data.update({midas_control_list[i]: midi_control_list[i]})
             else:
                 self.__data[midas_control_list[i]] = MidiControl()
+        self.__reverse = None
 
     def retarget(self, midi_control_list: list[MidiControl]):
         """
@@ -403,6 +408,14 @@ class MidasMidiControlMap:
                 self.__data[data_keys_list[i]] = midi_control_list[i]
             else:
                 self.__data[data_keys_list[i]] = MidiControl()
+        self.__reverse = None
+
+    def __get_reverse(self) -> dict:
+        if self.__reverse is None:
+            self.__reverse = {}
+            for a_midas_control, a_midi_control in self.__data.items():
+                self.__reverse.setdefault(a_midi_control, []).append(a_midas_control)
+        return self.__reverse
 
 class MidasMidiCommandMap:
     """
@@ -562,6 +575,125 @@ class MidasMidiCommandMap:
             else:
                 self.__data[data_keys_list[i]] = int()
 
+class MidasHandlerRegistry:
+    """
+    Table of the handlers of an application, keyed by command and control.
+
+    An application declares its handlers once, dispatching an event is then a single dict
+    lookup instead of testing the control against every button in turn. Controls are stored
+    by their (index, group), so a MidasControl and an (index, group) tuple of the same
+    button find the same handler, whatever order the MidasControl keeps its data in. A
+    control has one handler per command, registering a second one is refused.
+
+    Methods:
+        __init__(self): Initialize an empty registry.
+        register(self, command, control, handler): Set the handler of a control.
+        register_all(self, command, controls, handler): Set the same handler for several controls.
+        unregister(self, command, control): Remove the handler of a control.
+        get(self, command, control): Get the handler of a control.
+        dispatch(self, command, control, *args): Call the handler of a control.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty registry.
+        """
+        self.__handlers = {}
+
+    @staticmethod
+    def key(command: int, control) -> tuple:
+        """
+        Get the key of a control in the registry.
+
+        Args:
+            command (int): Midas command of the event.
+            control: MidasControl or (index, group) tuple of the control.
+
+        Returns:
+            tuple: (command, index, group).
+        """
+        if hasattr(control, "group"): # a MidasControl, its data may be stored as [group, index]
+            return command, control.index(), control.group()
+        return command, control[0], control[1]
+
+    def register(self, command: int, control, handler) -> bool:
+        """
+        Set the handler of a control, a control that already has a handler for the command is left unchanged.
+
+        Args:
+            command (int): Midas command the handler reacts to.
+            control: MidasControl or (index, group) tuple of the control.
+            handler: Called with (control, *args) by dispatch.
+
+        Returns:
+            bool: True if the handler was set, False if the control already has one.
+        """
+        key = MidasHandlerRegistry.key(command, control)
+        if key in self.__handlers:
+            print("[HANDLERS WARNING] Control ", key[1:], " already has a handler for command ", command, ", unregister it first.")
+            return False
+        self.__handlers[key] = handler
+        return True
+
+    def register_all(self, command: int, controls, handler) -> int:
+        """
+        Set the same handler for several controls, for example every drum pad.
+
+        Args:
+            command (int): Midas command the handler reacts to.
+            controls: Iterable of controls.
+            handler: Called with (control, *args) by dispatch.
+
+        Returns:
+            int: Number of handlers set, controls that already have one are skipped.
+        """
+        count = 0
+        for control in controls:
+            count += self.register(command, control, handler)
+        return count
+
+    def unregister(self, command: int, control):
+        """
+        Remove the handler of a control.
+
+        Args:
+            command (int): Midas command the handler reacts to.
+            control: MidasControl or (index, group) tuple of the control.
+        """
+        self.__handlers.pop(MidasHandlerRegistry.key(command, control), None)
+
+    def get(self, command: int, control):
+        """
+        Get the handler of a control.
+
+        Args:
+            command (int): Midas command of the event.
+            control: MidasControl or (index, group) tuple of the control.
+
+        Returns:
+            The handler, or None if the control has none for this command.
+        """
+        return self.__handlers.get(MidasHandlerRegistry.key(command, control))
+
+    def dispatch(self, command: int, control, *args) -> bool:
+        """
+        Call the handler of a control.
+
+        Args:
+            command (int): Midas command of the event.
+            control: MidasControl or (index, group) tuple of the control.
+            *args: Passed to the handler after the control.
+
+        Returns:
+            bool: True if a handler was called.
+        """
+        handler = self.__handlers.get(MidasHandlerRegistry.key(command, control))
+        if handler is None:
+            return False
+        handler(control, *args)
+        return True
+
+
 class MidasOS:
     """
     Represents the Midas operating system.
@@ -569,9 +701,22 @@ class MidasOS:
     Attributes:
         pages (dict): A dictionary to store pages where keys are page names and values are lists of applications.
         active_page (str): The currently active page.
+        scheduler (MidasTaskScheduler): Cooperative task scheduler advanced from OnIdle.
+        beat_scheduler (MidasBeatScheduler): Optional tempo locked scheduler, set by the device script.
+        worker (MidasWorker): Background worker for pure computations, results are handed back in on_idle.
+        journal (MidasGridJournal): Optional undo history of the step grid edits, set by the device script.
+        grid_cache (MidasGridCache): Optional step grid cache the batches are written through, set by the device script.
+        writes (MidasWriteScheduler): Last value wins queue of parameter writes, flushed from on_idle.
 
     Methods:
         __init__(self): Initialize MidasOS with an empty dictionary for pages and a None active_page.
+        on_idle(self): Advance the services of MidasOS, call from the OnIdle callback of the device script.
+        defer_init(self, lazy): Build a MidasLazy object from OnIdle instead of at import.
+        on_deinit(self): Stop the services of MidasOS, call from the OnDeInit callback of the device script.
+        on_update_beat_indicator(self, value): Forward OnUpdateBeatIndicator to the beat scheduler.
+        undo(self): Revert the last step grid edit.
+        redo(self): Apply the last undone step grid edit again.
+        grid_batch(self): Open a batch of step grid writes recorded as one undo step.
         add_page(self, page_name): Add a new page to MidasOS.
         add_application(self, page_name, application): Add an application to a specific page.
         switch_page(self, page_name): Switch to a different page.
@@ -586,6 +731,92 @@ class MidasOS:
         """
         self.pages = {}
         self.active_page = None
+        self.scheduler = midaslib_event_scheduler.MidasTaskScheduler()
+        self.beat_scheduler = None
+        self.worker = midaslib_event_worker.MidasWorker()
+        self.journal = None
+        self.grid_cache = None
+        self.writes = midaslib_event_writes.MidasWriteScheduler()
+
+    @midaslib_event_worker.main_thread_only
+    def on_idle(self):
+        """
+        Advance the services of MidasOS, call from the OnIdle callback of the device script.
+
+        Long running work such as full surface repaints should be spawned on the scheduler
+        as generator tasks instead of running inside a single FL Studio callback.
+        """
+        if self.beat_scheduler is not None:
+            self.beat_scheduler.on_idle()
+        if self.grid_cache is not None:
+            self.grid_cache.on_idle()
+        self.writes.on_idle()
+        self.worker.on_idle()
+        self.scheduler.run()
+
+    def defer_init(self, lazy):
+        """
+        Build a MidasLazy object from OnIdle instead of at import, unless it is used before that.
+
+        Args:
+            lazy (MidasLazy): The lazy object to build.
+
+        Returns:
+            MidasTask: The queued task building the object.
+        """
+        def build():
+            yield
+            lazy.get()
+        return self.scheduler.spawn(build(), midaslib_event_scheduler.MIDAS_TASK_PRIORITY_LOW, lazy.name)
+
+    def on_deinit(self):
+        """
+        Stop the services of MidasOS, call from the OnDeInit callback of the device script.
+        """
+        self.scheduler.cancel_all()
+        self.writes.flush() # the last knob positions still reach FL Studio
+        self.worker.stop()
+
+    def on_update_beat_indicator(self, value):
+        """
+        Forward OnUpdateBeatIndicator to the beat scheduler.
+
+        Args:
+            value (int): 0 off, 1 bar, 2 beat.
+        """
+        if self.beat_scheduler is not None:
+            self.beat_scheduler.on_update_beat_indicator(value)
+
+    def undo(self) -> bool:
+        """
+        Revert the last step grid edit recorded in the journal.
+
+        Returns:
+            bool: True if an edit was reverted.
+        """
+        if self.journal is None:
+            return False
+        return self.journal.undo()
+
+    def redo(self) -> bool:
+        """
+        Apply the last undone step grid edit again.
+
+        Returns:
+            bool: True if an edit was applied.
+        """
+        if self.journal is None:
+            return False
+        return self.journal.redo()
+
+    def grid_batch(self):
+        """
+        Open a batch of step grid writes, apps queue fills, clears and pastes on it and commit once.
+
+        Returns:
+            MidasGridWriteBatch: The empty batch, recorded in the journal as one undo step on commit.
+        """
+        return self.grid_cache.batch(self.journal)
 
     def add_page(self, page_name):
         """
@@ -697,6 +928,9 @@ class ApplicationBase:
     Methods:
         __init__(self): Initialize the ApplicationBase instance.
         set_midas_os(self, midas_os, page_name): Set the MidasOS instance and page for the application.
+        spawn_task(self, generator, priority, name): Queue a cooperative task on the MidasOS scheduler.
+        setup_handlers(self): Declare the handlers of the application.
+        register_handler(self, command, control, handler): Set the handler of a control.
         on_activate(self): Callback when the application is activated.
         on_deactivate(self): Callback when the application is deactivated.
         on_page_activate(self): Callback when the page containing the application is activated.
@@ -717,11 +951,13 @@ class ApplicationBase:
 
     def __init__(self):
         """
-        Initialize ApplicationBase with MidasMidiControlMap and MidasMidiCommandMap.
+        Initialize ApplicationBase with MidasMidiControlMap, MidasMidiCommandMap and the handlers declared in setup_handlers.
         """
         self._button_map = MidasMidiControlMap()
         self._controller_map = MidasMidiControlMap()
         self._command_map = MidasMidiCommandMap()
+        self._handlers = MidasHandlerRegistry()
+        self.setup_handlers()
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -802,7 +1038,7 @@ class ApplicationBase:
             if midas_command == self.EVENT_TYPE_CONTROLCHANGE:
                 self.__process_control_change_events(port, data1)
             elif midas_command in [self.EVENT_TYPE_NOTEON, self.EVENT_TYPE_NOTEOFF]:
-                self.__process_button_events(port, data1)
+                self.__process_button_events(port, data1, midas_command)
 
     def __process_control_change_events(self, port, data1):
         """
@@ -814,24 +1050,22 @@ class ApplicationBase:
 
         """
         for midas_controller in self._controller_map.get_midas(MidiControl(port, data1)):
-            self.onMidasEvent(midas_controller, self.EVENT_TYPE_CONTROLCHANGE)
+            if not self._handlers.dispatch(self.EVENT_TYPE_CONTROLCHANGE, midas_controller):
+                self.onMidasEvent(midas_controller, self.EVENT_TYPE_CONTROLCHANGE)
 
-    def __process_button_events(self, port, data1):
+    def __process_button_events(self, port, data1, command):
         """
-        Process button events.
+        Process button events, controls without a registered handler go to onMidasEvent.
 
         Args:
             port: MIDI port.
             data1: MIDI data1.
+            command: EVENT_TYPE_NOTEON or EVENT_TYPE_NOTEOFF.
 
         """
         for midas_button in self._button_map.get_midas(MidiControl(port, data1)):
-            command = (
-                self.EVENT_TYPE_NOTEON
-                if midas_button == self.EVENT_TYPE_NOTEON
-                else self.EVENT_TYPE_NOTEOFF
-            )
-            self.onMidasEvent(midas_button, command)
+            if not self._handlers.dispatch(command, midas_button):
+                self.onMidasEvent(midas_button, command)
 
     def map_midi_control(self, midas_control, midi_control):
         """
@@ -886,6 +1120,34 @@ class ApplicationBase:
         """
         pass
 
+    def setup_handlers(self):
+        """
+        Declare the handlers of the application, called once from __init__.
+
+        Override this method in subclasses and call register_handler for every control:
+
+            class CustomApplication(ApplicationBase):
+                def setup_handlers(self):
+                    self.register_handler(self.EVENT_TYPE_NOTEOFF, MY_BUTTON_PLAY, self.on_play)
+
+                def on_play(self, control):
+                    ...
+
+        """
+        pass
+
+    def register_handler(self, command, control, handler):
+        """
+        Set the handler of a control, events of controls with a handler do not reach onMidasEvent.
+
+        Args:
+            command (int): EVENT_TYPE_NOTEON, EVENT_TYPE_NOTEOFF or EVENT_TYPE_CONTROLCHANGE.
+            control: MidasControl or (index, group) tuple of the control.
+            handler: Called with the control when the event occurs.
+
+        """
+        self._handlers.register(command, control, handler)
+
     def set_midas_os(self, midas_os, page_name):
         """
         Set the owning MidasOS and page for the application.
@@ -898,6 +1160,22 @@ class ApplicationBase:
         self._midas_os = midas_os
         self._page_name = page_name
 
+    def spawn_task(self, generator, priority=midaslib_event_scheduler.MIDAS_TASK_PRIORITY_NORMAL, name=""):
+        """
+        Queue a cooperative task on the MidasOS scheduler.
+
+        Args:
+            generator: The generator holding the work of the task, each yield is a point where it may pause.
+            priority (int): Priority of the task, lower values run first.
+            name (str): Name of the task, used in error reports.
+
+        Returns:
+            MidasTask: The queued task, or None if the application is not part of a MidasOS.
+        """
+        if getattr(self, "_midas_os", None) is None:
+            return None
+        return self._midas_os.scheduler.spawn(generator, priority, name or type(self).__name__)
+
     def on_activate(self):
         """
         Callback when the application is activated.
@@ -0,0 +1,195 @@
+MIDAS_FILL_TYPE_16 = 0
+MIDAS_FILL_TYPE_8 = 1
+MIDAS_FILL_TYPE_4 = 2
+MIDAS_FILL_TYPE_16_DOTTED = 3
+MIDAS_FILL_TYPE_8_DOTTED = 4
+MIDAS_FILL_TYPE_4_DOTTED = 5
+MIDAS_FILL_TYPE_16_TRIPLET = 6
+MIDAS_FILL_TYPE_8_TRIPLET = 7
+MIDAS_FILL_TYPE_4_TRIPLET = 8
+
+# Distance between two hits of each fill type in pads, as (numerator, denominator).
+# A pad is a 16th note at zoom 1, dotted notes are 3/2 and triplets 2/3 of the straight note.
+MIDAS_FILL_INTERVALS = [
+    (1, 1), # 16
+    (2, 1), # 8
+    (4, 1), # 4
+    (3, 2), # 16 dotted
+    (3, 1), # 8 dotted
+    (6, 1), # 4 dotted
+    (2, 3), # 16 triplet
+    (4, 3), # 8 triplet
+    (8, 3), # 4 triplet
+]
+
+MIDAS_FILL_ZOOM_LEVELS = (1, 2, 4, 8)
+
+
+def bjorklund(pulses: int, steps: int) -> int:
+    """
+    Spread pulses as evenly as possible over steps with the Bjorklund algorithm, the euclidean rhythm E(pulses, steps).
+
+    Args:
+        pulses (int): Number of hits.
+        steps (int): Length of the rhythm.
+
+    Returns:
+        int: Mask over steps, bit i is step i. The first step is always a hit when pulses > 0.
+    """
+    if steps <= 0 or pulses <= 0:
+        return 0
+    if pulses >= steps:
+        return (1 << steps) - 1
+    heads = [[1] for _ in range(pulses)]
+    tails = [[0] for _ in range(steps - pulses)]
+    while len(tails) > 1:
+        paired = min(len(heads), len(tails))
+        remainder = heads[paired:] if len(heads) > paired else tails[paired:]
+        heads = [heads[i] + tails[i] for i in range(paired)]
+        tails = remainder
+    mask = 0
+    step = 0
+    for group in heads + tails:
+        for hit in group:
+            mask |= hit << step
+            step += 1
+    return mask
+
+
+class MidasFillMasks:
+    """
+    Step masks of the fill types, computed once per fill type, window length and zoom level.
+
+    Bit i of a mask is step i of the window. At zoom z every pad covers z steps, so a hit
+    that falls between two pads lands on the exact step when zoomed out and is rounded down
+    to the pad at zoom 1. Masks are meant to be applied with MidasGridCache.apply_mask,
+    which only writes the steps that differ from the grid.
+
+    Methods:
+        __init__(self, pads, zoom_levels): Initialize and precompute the masks of every fill type.
+        get(self, fill_type, pads, zoom): Get the mask of a fill type.
+        stride(self, length, stride): Get a mask with every stride-th step set.
+        euclid(self, pulses, steps, rotation): Get a rotated euclidean rhythm.
+        tile(self, rhythm, period, pads, zoom): Repeat a rhythm over the pads of a window.
+        build(fill_type, pads, zoom): Compute the mask of a fill type.
+    """
+
+    def __init__(self, pads: int = 32, zoom_levels: tuple = MIDAS_FILL_ZOOM_LEVELS):
+        """
+        Initialize and precompute the masks of every fill type.
+
+        Args:
+            pads (int): Number of pads in the window.
+            zoom_levels (tuple): Zoom levels to precompute.
+        """
+        self.__masks = {}
+        for zoom in zoom_levels:
+            for fill_type in range(len(MIDAS_FILL_INTERVALS)):
+                self.get(fill_type, pads, zoom)
+
+    def get(self, fill_type: int, pads: int, zoom: int = 1) -> int:
+        """
+        Get the mask of a fill type.
+
+        Args:
+            fill_type (int): One of the MIDAS_FILL_TYPE constants.
+            pads (int): Number of pads in the window.
+            zoom (int): Steps per pad.
+
+        Returns:
+            int: Mask over pads * zoom steps.
+        """
+        key = (fill_type, pads, zoom)
+        mask = self.__masks.get(key)
+        if mask is None:
+            mask = self.__masks[key] = MidasFillMasks.build(fill_type, pads, zoom)
+        return mask
+
+    def stride(self, length: int, stride: int) -> int:
+        """
+        Get a mask with every stride-th step set, starting at the first step.
+
+        Args:
+            length (int): Number of steps in the window.
+            stride (int): Steps between two set steps.
+
+        Returns:
+            int: Mask over length steps.
+        """
+        key = ("stride", length, stride)
+        mask = self.__masks.get(key)
+        if mask is None:
+            mask = 0
+            for step in range(0, length, stride):
+                mask |= 1 << step
+            self.__masks[key] = mask
+        return mask
+
+    def euclid(self, pulses: int, steps: int, rotation: int = 0) -> int:
+        """
+        Get the euclidean rhythm E(pulses, steps) rotated by rotation steps, cached by (pulses, steps, rotation).
+
+        Args:
+            pulses (int): Number of hits.
+            steps (int): Length of the rhythm.
+            rotation (int): Steps the rhythm is delayed by, wrapping around.
+
+        Returns:
+            int: Mask over steps.
+        """
+        key = ("euclid", pulses, steps, rotation)
+        mask = self.__masks.get(key)
+        if mask is None:
+            mask = bjorklund(pulses, steps)
+            rotation %= max(steps, 1)
+            if rotation:
+                mask = ((mask << rotation) | (mask >> (steps - rotation))) & ((1 << steps) - 1)
+            self.__masks[key] = mask
+        return mask
+
+    def tile(self, rhythm: int, period: int, pads: int, zoom: int = 1) -> int:
+        """
+        Repeat a rhythm over the pads of a window, every hit lands on the first step of its pad.
+
+        Args:
+            rhythm (int): Mask over period pads.
+            period (int): Length of the rhythm in pads.
+            pads (int): Number of pads in the window.
+            zoom (int): Steps per pad.
+
+        Returns:
+            int: Mask over pads * zoom steps.
+        """
+        key = ("tile", rhythm, period, pads, zoom)
+        mask = self.__masks.get(key)
+        if mask is None:
+            mask = 0
+            for pad in range(pads):
+                if (rhythm >> (pad % period)) & 1:
+                    mask |= 1 << (pad * zoom)
+            self.__masks[key] = mask
+        return mask
+
+    @staticmethod
+    def build(fill_type: int, pads: int, zoom: int = 1) -> int:
+        """
+        Compute the mask of a fill type.
+
+        Args:
+            fill_type (int): One of the MIDAS_FILL_TYPE constants.
+            pads (int): Number of pads in the window.
+            zoom (int): Steps per pad.
+
+        Returns:
+            int: Mask over pads * zoom steps.
+        """
+        numerator, denominator = MIDAS_FILL_INTERVALS[fill_type]
+        length = pads * zoom
+        mask = 0
+        hit = 0
+        step = 0
+        while step < length:
+            mask |= 1 << step
+            hit += 1
+            step = (hit * numerator * zoom) // denominator
+        return mask
@@ -0,0 +1,456 @@
+import midaslib.flsi.fl_midi as midaslib_grid_fl_midi
+import midaslib.worker as midaslib_grid_worker
+
+MIDAS_GRID_BLOCK_SIZE = 32 # Steps read from FL Studio at once when a part of a channel is not cached yet.
+
+MIDAS_GRID_REDUCE_ANY = 0 # A pad is on if any step in its window is on.
+MIDAS_GRID_REDUCE_ALL = 1 # A pad is on if every step in its window is on.
+MIDAS_GRID_REDUCE_COUNT = 2 # A pad holds the number of steps on in its window.
+
+MIDAS_GRID_POPCOUNT_TABLE = bytes(bin(i).count("1") for i in range(256)) # Number of bits set in every byte value.
+
+
+def popcount(bits: int) -> int:
+    """
+    Count the bits set in a bitset using the byte table.
+
+    Args:
+        bits (int): A non negative bitset.
+
+    Returns:
+        int: Number of bits set.
+    """
+    count = 0
+    while bits:
+        count += MIDAS_GRID_POPCOUNT_TABLE[bits & 0xFF]
+        bits >>= 8
+    return count
+
+
+def reduce_window(window: int, pads: int, zoom: int, mode: int = MIDAS_GRID_REDUCE_ANY) -> list[int]:
+    """
+    Reduce a window of steps to one value per pad, every pad covering zoom steps.
+
+    The any and all reductions fold the window onto itself with log2(zoom) shifts, so the
+    cost per redraw does not grow with the zoom level.
+
+    Args:
+        window (int): Bitset of the steps, bit i is step i of the window.
+        pads (int): Number of pads.
+        zoom (int): Steps per pad.
+        mode (int): MIDAS_GRID_REDUCE_ANY, MIDAS_GRID_REDUCE_ALL or MIDAS_GRID_REDUCE_COUNT.
+
+    Returns:
+        list[int]: Value of every pad, 0 or 1 for any and all, 0 to zoom for count.
+    """
+    if zoom <= 1:
+        return [(window >> i) & 1 for i in range(pads)]
+    if mode == MIDAS_GRID_REDUCE_COUNT:
+        pad_mask = (1 << zoom) - 1
+        return [popcount((window >> (i * zoom)) & pad_mask) for i in range(pads)]
+    folded = window
+    if mode == MIDAS_GRID_REDUCE_ALL:
+        folded |= ~((1 << (pads * zoom)) - 1) # Steps past the window count as on, they are never read.
+    span = 1
+    while span < zoom:
+        step = min(span, zoom - span)
+        if mode == MIDAS_GRID_REDUCE_ALL:
+            folded &= folded >> step
+        else:
+            folded |= folded >> step
+        span += step
+    return [(folded >> (i * zoom)) & 1 for i in range(pads)]
+
+
+class MidasGridCache:
+    """
+    Cache of the step sequencer grid bits of the channels, stored as one int bitset per channel.
+
+    Bit i of a channel bitset is step i of the channel in the current pattern. Steps are read
+    from FL Studio lazily, one block at a time, the first time a redraw needs them. Writes made
+    through set_bit go to FL Studio and update the cache in place. Changes made elsewhere are
+    picked up by forwarding OnDirtyChannel and OnRefresh to the cache, which drops the affected
+    channels so they are read again on the next redraw.
+
+    Runs of writes should go through a MidasGridWriteBatch from batch: the batch only writes the
+    steps that end up changed. The pattern refresh FL Studio sends for the batch's own writes,
+    or for a single set_bit, does not drop the cache. That refresh is only expected until the
+    next on_idle, so a pattern switch is never mistaken for it when FL Studio sent none.
+
+    Methods:
+        __init__(self, get_grid_bit, set_grid_bit, block_size): Initialize the cache.
+        get_bit(self, channel, position): Get a single step.
+        get_window(self, channel, start, length): Get a range of steps as a bitset.
+        window_hash(self, channel, start, length): Get a hash of a range of steps and its position.
+        set_bit(self, channel, position, value): Write a step to FL Studio and the cache.
+        apply_mask(self, channel, start, length, mask): Make a range of steps equal to a mask, writing only the differences.
+        batch(self, journal): Open a batch of writes applied together on commit.
+        begin_batch(self): Start ignoring the refreshes caused by the writes of a batch.
+        end_batch(self, writes): Stop ignoring them once the batch is written.
+        invalidate(self, channel): Drop the cached steps of a channel.
+        invalidate_all(self): Drop the cached steps of every channel.
+        on_dirty_channel(self, index, flag): Forward OnDirtyChannel to the cache.
+        on_refresh(self, flags): Forward OnRefresh to the cache.
+        on_idle(self): Stop expecting the refresh of the last batch.
+    """
+
+    def __init__(self, get_grid_bit, set_grid_bit, block_size: int = MIDAS_GRID_BLOCK_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            get_grid_bit: Returns the grid bit of a channel at a position.
+            set_grid_bit: Sets the grid bit of a channel at a position.
+            block_size (int): Steps read from FL Studio at once.
+        """
+        self.__get_grid_bit = get_grid_bit
+        self.__set_grid_bit = set_grid_bit
+        self.__block_size = block_size
+        self.__block_mask = (1 << block_size) - 1
+        self.__rows = {}
+        self.__loaded_blocks = {}
+        self.__batch_depth = 0
+        self.__batch_refreshed = False # a refresh arrived while a batch was being written
+        self.__expect_refresh = False # the refresh of the last batch is still to come
+
+    def get_bit(self, channel: int, position: int) -> int:
+        """
+        Get a single step.
+
+        Args:
+            channel (int): Channel index, as passed to channels.getGridBit.
+            position (int): Step position.
+
+        Returns:
+            int: 1 if the step is on, else 0.
+        """
+        self.__load(channel, position, 1)
+        return (self.__rows[channel] >> position) & 1
+
+    def get_window(self, channel: int, start: int, length: int) -> int:
+        """
+        Get a range of steps as a bitset, bit i is step start + i.
+
+        Args:
+            channel (int): Channel index, as passed to channels.getGridBit.
+            start (int): First step of the window.
+            length (int): Number of steps in the window.
+
+        Returns:
+            int: The steps of the window.
+        """
+        self.__load(channel, start, length)
+        return (self.__rows[channel] >> start) & ((1 << length) - 1)
+
+    def window_hash(self, channel: int, start: int, length: int) -> int:
+        """
+        Get a hash of a range of steps and its position.
+
+        Renderers keep the hash of the window they last drew and compare it after a refresh
+        notification, an unchanged hash means the redraw can be skipped.
+
+        Args:
+            channel (int): Channel index, as passed to channels.getGridBit.
+            start (int): First step of the window.
+            length (int): Number of steps in the window.
+
+        Returns:
+            int: Hash of the channel, the position and the steps of the window.
+        """
+        return hash((channel, start, length, self.get_window(channel, start, length)))
+
+    @midaslib_grid_worker.main_thread_only
+    def set_bit(self, channel: int, position: int, value: int):
+        """
+        Write a step to FL Studio and the cache, the pattern refresh FL Studio sends for it does not drop the cache.
+
+        Args:
+            channel (int): Channel index, as passed to channels.setGridBit.
+            position (int): Step position.
+            value (int): 1 to turn the step on, 0 to turn it off.
+        """
+        self.begin_batch() # a single write is a batch of one
+        try:
+            self.__set_grid_bit(channel, position, 1 if value else 0)
+            if (self.__loaded_blocks.get(channel, 0) >> (position // self.__block_size)) & 1:
+                if value:
+                    self.__rows[channel] |= 1 << position
+                else:
+                    self.__rows[channel] &= ~(1 << position)
+        finally:
+            self.end_batch(1)
+
+    def apply_mask(self, channel: int, start: int, length: int, mask: int) -> int:
+        """
+        Make a range of steps equal to a mask, writing only the steps that differ.
+
+        Args:
+            channel (int): Channel index, as passed to channels.setGridBit.
+            start (int): First step of the range.
+            length (int): Number of steps in the range.
+            mask (int): Bitset of the new steps, bit i is step start + i.
+
+        Returns:
+            int: Number of steps written to FL Studio.
+        """
+        batch = self.batch()
+        batch.set_mask(channel, start, length, mask)
+        return batch.commit()
+
+    def batch(self, journal=None):
+        """
+        Open a batch of writes applied together on commit.
+
+        Args:
+            journal (MidasGridJournal): Journal recording the committed batch as one undo step, None to not record it.
+
+        Returns:
+            MidasGridWriteBatch: The empty batch.
+        """
+        return MidasGridWriteBatch(self, journal)
+
+    def begin_batch(self):
+        """
+        Start ignoring the pattern refreshes caused by the writes of a batch, calls can be nested.
+        """
+        if self.__batch_depth == 0:
+            self.__batch_refreshed = False
+        self.__batch_depth += 1
+
+    def end_batch(self, writes: int):
+        """
+        Stop ignoring refreshes once a batch is written.
+
+        Args:
+            writes (int): Steps written by the batch, FL Studio sends a refresh for them if it did not already.
+        """
+        self.__batch_depth -= 1
+        if self.__batch_depth == 0 and writes and not self.__batch_refreshed:
+            self.__expect_refresh = True
+
+    def invalidate(self, channel: int):
+        """
+        Drop the cached steps of a channel, they are read again on next use.
+
+        Args:
+            channel (int): Channel index.
+        """
+        self.__rows.pop(channel, None)
+        self.__loaded_blocks.pop(channel, None)
+
+    def invalidate_all(self):
+        """
+        Drop the cached steps of every channel.
+        """
+        self.__rows.clear()
+        self.__loaded_blocks.clear()
+
+    def on_dirty_channel(self, index: int, flag: int):
+        """
+        Forward OnDirtyChannel to the cache.
+
+        Args:
+            index (int): Index of the changed channel, -1 for all channels.
+            flag (int): CE_New, CE_Delete, CE_Replace, CE_Rename or CE_Select.
+        """
+        if flag == midaslib_grid_fl_midi.CE_Rename or flag == midaslib_grid_fl_midi.CE_Select:
+            return # The steps did not change.
+        if index < 0 or flag == midaslib_grid_fl_midi.CE_New or flag == midaslib_grid_fl_midi.CE_Delete:
+            self.invalidate_all() # Channel indexes may have shifted.
+        else:
+            self.invalidate(index)
+
+    def on_refresh(self, flags: int):
+        """
+        Forward OnRefresh to the cache, a pattern change drops every channel.
+
+        Args:
+            flags (int): The HW_Dirty flags of the refresh.
+        """
+        if flags & midaslib_grid_fl_midi.HW_Dirty_Patterns:
+            if self.__batch_depth > 0:
+                self.__batch_refreshed = True # caused by the batch being written, the cache already holds its steps
+            elif self.__expect_refresh:
+                self.__expect_refresh = False # the refresh of the last batch
+            else:
+                self.invalidate_all()
+
+    def on_idle(self):
+        """
+        Stop expecting the refresh of the last batch, call from OnIdle.
+
+        FL Studio sends the refresh of the writes before the next idle tick, a later pattern
+        refresh is a real change and drops the cache.
+        """
+        self.__expect_refresh = False
+
+    def __load(self, channel: int, start: int, length: int):
+        loaded = self.__loaded_blocks.get(channel, 0)
+        row = self.__rows.get(channel, 0)
+        first_block = start // self.__block_size
+        last_block = (start + length - 1) // self.__block_size
+        for block in range(first_block, last_block + 1):
+            if (loaded >> block) & 1:
+                continue
+            midaslib_grid_worker.require_main_thread("MidasGridCache")
+            base = block * self.__block_size
+            bits = 0
+            for i in range(self.__block_size):
+                if self.__get_grid_bit(channel, base + i):
+                    bits |= 1 << i
+            row = (row & ~(self.__block_mask << base)) | (bits << base)
+            loaded |= 1 << block
+        self.__rows[channel] = row
+        self.__loaded_blocks[channel] = loaded
+
+
+class MidasGridWriteBatch:
+    """
+    Writes to the step grid queued and applied together on commit.
+
+    Queued writes are kept per (channel, step) and the last one wins, so duplicate writes and
+    writes cancelling each other collapse. On commit the steps whose final value already
+    matches the grid cache are skipped and the rest are written in channel and step order.
+    The pattern refresh FL Studio sends for the committed writes does not drop the grid cache,
+    which already holds the new steps. Open batches with MidasGridCache.batch.
+
+    A batch is a context manager, it is committed at the end of the with block and discarded
+    if the block raises.
+
+    Methods:
+        __init__(self, grid_cache, journal): Initialize an empty batch.
+        get_bit(self, channel, position): Get a step as it will be after commit.
+        set_bit(self, channel, position, value): Queue a step.
+        set_mask(self, channel, start, length, mask): Queue a range of steps.
+        toggle_mask(self, channel, start, length, mask): Queue flipping a range of steps.
+        size(self): Get the number of queued steps.
+        commit(self): Write the queued steps that differ from the grid.
+        discard(self): Drop the queued steps.
+    """
+
+    def __init__(self, grid_cache: MidasGridCache, journal=None):
+        """
+        Initialize an empty batch.
+
+        Args:
+            grid_cache (MidasGridCache): Cache the batch is written through.
+            journal (MidasGridJournal): Journal recording the committed batch as one undo step, None to not record it.
+        """
+        self.__grid_cache = grid_cache
+        self.__journal = journal
+        self.__writes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def get_bit(self, channel: int, position: int) -> int:
+        """
+        Get a step as it will be after commit, the queued value or else the grid cache.
+
+        Args:
+            channel (int): Channel index.
+            position (int): Step position.
+
+        Returns:
+            int: 1 if the step will be on, else 0.
+        """
+        value = self.__writes.get((channel, position))
+        if value is None:
+            return self.__grid_cache.get_bit(channel, position)
+        return value
+
+    def set_bit(self, channel: int, position: int, value: int):
+        """
+        Queue a step, replacing any write queued for it.
+
+        Args:
+            channel (int): Channel index, as passed to channels.setGridBit.
+            position (int): Step position.
+            value (int): 1 to turn the step on, 0 to turn it off.
+        """
+        self.__writes[(channel, position)] = 1 if value else 0
+
+    def set_mask(self, channel: int, start: int, length: int, mask: int):
+        """
+        Queue a range of steps.
+
+        Args:
+            channel (int): Channel index.
+            start (int): First step of the range.
+            length (int): Number of steps in the range.
+            mask (int): Bitset of the new steps, bit i is step start + i.
+        """
+        for i in range(length):
+            self.__writes[(channel, start + i)] = (mask >> i) & 1
+
+    def toggle_mask(self, channel: int, start: int, length: int, mask: int):
+        """
+        Queue flipping the steps of a range, on top of the writes already queued.
+
+        Args:
+            channel (int): Channel index.
+            start (int): First step of the range.
+            length (int): Number of steps in the range.
+            mask (int): Bitset of the steps to flip, bit i is step start + i.
+        """
+        while mask:
+            low_bit = mask & -mask
+            i = low_bit.bit_length() - 1
+            self.__writes[(channel, start + i)] = self.get_bit(channel, start + i) ^ 1
+            mask ^= low_bit
+
+    def size(self) -> int:
+        """
+        Get the number of queued steps, after duplicates collapsed.
+
+        Returns:
+            int: Number of queued steps.
+        """
+        return len(self.__writes)
+
+    def commit(self) -> int:
+        """
+        Write the queued steps that differ from the grid, in channel and step order.
+
+        Returns:
+            int: Number of steps written to FL Studio.
+        """
+        writes = self.__writes
+        self.__writes = {}
+        changed = {}
+        for channel, position in sorted(writes):
+            value = writes[(channel, position)]
+            if self.__grid_cache.get_bit(channel, position) != value:
+                changed.setdefault(channel, []).append((position, value))
+        count = 0
+        self.__grid_cache.begin_batch()
+        try:
+            for channel, steps in changed.items():
+                for position, value in steps:
+                    self.__grid_cache.set_bit(channel, position, value)
+                    count += 1
+        finally:
+            self.__grid_cache.end_batch(count)
+        if self.__journal is not None and changed:
+            self.__journal.begin_group() # the whole batch is one undo step
+            for channel, steps in changed.items():
+                start = steps[0][0]
+                delta = 0
+                for position, value in steps:
+                    delta |= 1 << (position - start)
+                self.__journal.record(channel, start, steps[-1][0] - start + 1, delta)
+            self.__journal.end_group()
+        return count
+
+    def discard(self):
+        """
+        Drop the queued steps without writing them.
+        """
+        self.__writes = {}
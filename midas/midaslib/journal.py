@@ -0,0 +1,244 @@
+from array import array as midaslib_journal_array
+
+MIDAS_JOURNAL_CAPACITY = 1024 # Records kept in the journal, the oldest edits are dropped first.
+MIDAS_JOURNAL_WORD_BITS = 32 # Steps stored in one record.
+MIDAS_JOURNAL_WORD_MASK = (1 << MIDAS_JOURNAL_WORD_BITS) - 1
+
+
+class MidasGridJournal:
+    """
+    Undo and redo history of the step grid edits made through a MidasGridCache.
+
+    Every edit is stored as the xor of the steps before and after it, split into records of
+    (channel, pattern, start, mask) where mask covers MIDAS_JOURNAL_WORD_BITS steps from start.
+    Words of an edit that did not change are not stored, so toggling one pad costs one record
+    and filling 64 steps at most two. The records live in fixed size arrays used as a ring,
+    the oldest edits are dropped when it is full.
+
+    Records of one edit share a group id and are undone and redone together. Undoing queues
+    the same xor again on one MidasGridWriteBatch for the whole group, so only the steps that
+    flip are written to FL Studio. Edits can be grouped further with begin_group and end_group, for
+    example to undo a clear of several channels at once.
+
+    Edits are only undone in the pattern they were made in, grid bits always address the
+    current pattern.
+
+    Methods:
+        __init__(self, grid_cache, get_pattern, capacity): Initialize an empty journal.
+        set_bit(self, channel, position, value): Write a step and record the edit.
+        apply_mask(self, channel, start, length, mask): Write a range of steps and record the edit.
+        record(self, channel, start, length, delta): Record an edit made elsewhere.
+        begin_group(self): Start recording edits as a single undo step.
+        end_group(self): Stop grouping edits.
+        can_undo(self): Check if there is an edit to undo.
+        can_redo(self): Check if there is an edit to redo.
+        undo(self): Revert the last edit.
+        redo(self): Apply the last undone edit again.
+        clear(self): Drop the whole history.
+    """
+
+    def __init__(self, grid_cache, get_pattern=None, capacity: int = MIDAS_JOURNAL_CAPACITY):
+        """
+        Initialize an empty journal.
+
+        Args:
+            grid_cache (MidasGridCache): Cache the edits are written through.
+            get_pattern: Returns the current pattern number, None if edits are not bound to a pattern.
+            capacity (int): Maximum number of records kept.
+        """
+        self.__grid_cache = grid_cache
+        self.__get_pattern = get_pattern
+        self.__capacity = capacity
+        self.__channels = midaslib_journal_array("i", [0] * capacity)
+        self.__patterns = midaslib_journal_array("i", [0] * capacity)
+        self.__starts = midaslib_journal_array("i", [0] * capacity)
+        self.__masks = midaslib_journal_array("L", [0] * capacity)
+        self.__groups = midaslib_journal_array("L", [0] * capacity)
+        self.__first = 0 # Ring index of the oldest record.
+        self.__size = 0 # Records that can be undone.
+        self.__end = 0 # Records that can be undone or redone.
+        self.__next_group = 0
+        self.__open_groups = 0
+        self.__open_group = 0
+
+    def set_bit(self, channel: int, position: int, value: int):
+        """
+        Write a step through the grid cache and record the edit if the step changed.
+
+        Args:
+            channel (int): Channel index, as passed to channels.setGridBit.
+            position (int): Step position.
+            value (int): 1 to turn the step on, 0 to turn it off.
+        """
+        if self.__grid_cache.get_bit(channel, position) != (1 if value else 0):
+            self.__grid_cache.set_bit(channel, position, value)
+            self.record(channel, position, 1, 1)
+
+    def apply_mask(self, channel: int, start: int, length: int, mask: int) -> int:
+        """
+        Make a range of steps equal to a mask through the grid cache and record the edit.
+
+        Args:
+            channel (int): Channel index, as passed to channels.setGridBit.
+            start (int): First step of the range.
+            length (int): Number of steps in the range.
+            mask (int): Bitset of the new steps, bit i is step start + i.
+
+        Returns:
+            int: Number of steps written to FL Studio.
+        """
+        before = self.__grid_cache.get_window(channel, start, length)
+        writes = self.__grid_cache.apply_mask(channel, start, length, mask)
+        if writes:
+            self.record(channel, start, length, before ^ (mask & ((1 << length) - 1)))
+        return writes
+
+    def record(self, channel: int, start: int, length: int, delta: int):
+        """
+        Record an edit made elsewhere, the redo history is dropped.
+
+        Args:
+            channel (int): Channel index.
+            start (int): First step of the edit.
+            length (int): Number of steps covered by delta.
+            delta (int): Xor of the steps before and after the edit, bit i is step start + i.
+        """
+        words = []
+        for offset in range(0, length, MIDAS_JOURNAL_WORD_BITS):
+            word = (delta >> offset) & MIDAS_JOURNAL_WORD_MASK
+            if word:
+                words.append((start + offset, word))
+        if not words:
+            return
+        self.__end = self.__size
+        if len(words) > self.__capacity:
+            print("[JOURNAL WARNING] Edit is larger than the journal, the history was cleared.")
+            self.clear()
+            return
+        if self.__open_groups:
+            group = self.__open_group
+        else:
+            group = self.__new_group()
+        pattern = self.__current_pattern()
+        for position, word in words:
+            if self.__size == self.__capacity:
+                self.__drop_oldest_group()
+            i = (self.__first + self.__size) % self.__capacity
+            self.__channels[i] = channel
+            self.__patterns[i] = pattern
+            self.__starts[i] = position
+            self.__masks[i] = word
+            self.__groups[i] = group
+            self.__size += 1
+        self.__end = self.__size
+
+    def begin_group(self):
+        """
+        Start recording edits as a single undo step, calls can be nested.
+        """
+        if self.__open_groups == 0:
+            self.__open_group = self.__new_group()
+        self.__open_groups += 1
+
+    def end_group(self):
+        """
+        Stop grouping edits, the group is closed when every begin_group has been ended.
+        """
+        if self.__open_groups > 0:
+            self.__open_groups -= 1
+
+    def can_undo(self) -> bool:
+        """
+        Check if there is an edit to undo.
+
+        Returns:
+            bool: True if undo would revert an edit.
+        """
+        return self.__size > 0
+
+    def can_redo(self) -> bool:
+        """
+        Check if there is an edit to redo.
+
+        Returns:
+            bool: True if redo would apply an edit.
+        """
+        return self.__end > self.__size
+
+    def undo(self) -> bool:
+        """
+        Revert the last edit, every record of its group is reverted in one call.
+
+        Returns:
+            bool: True if an edit was reverted.
+        """
+        if not self.can_undo():
+            return False
+        last = (self.__first + self.__size - 1) % self.__capacity
+        if not self.__in_current_pattern(last):
+            return False
+        group = self.__groups[last]
+        batch = self.__grid_cache.batch()
+        while self.__size > 0:
+            i = (self.__first + self.__size - 1) % self.__capacity
+            if self.__groups[i] != group:
+                break
+            self.__apply(i, batch)
+            self.__size -= 1
+        batch.commit()
+        return True
+
+    def redo(self) -> bool:
+        """
+        Apply the last undone edit again, every record of its group is applied in one call.
+
+        Returns:
+            bool: True if an edit was applied.
+        """
+        if not self.can_redo():
+            return False
+        first_undone = (self.__first + self.__size) % self.__capacity
+        if not self.__in_current_pattern(first_undone):
+            return False
+        group = self.__groups[first_undone]
+        batch = self.__grid_cache.batch()
+        while self.__size < self.__end:
+            i = (self.__first + self.__size) % self.__capacity
+            if self.__groups[i] != group:
+                break
+            self.__apply(i, batch)
+            self.__size += 1
+        batch.commit()
+        return True
+
+    def clear(self):
+        """
+        Drop the whole history.
+        """
+        self.__first = 0
+        self.__size = 0
+        self.__end = 0
+
+    def __new_group(self) -> int:
+        self.__next_group = (self.__next_group + 1) & 0xFFFFFFFF
+        return self.__next_group
+
+    def __drop_oldest_group(self):
+        group = self.__groups[self.__first]
+        while self.__size > 0 and self.__groups[self.__first] == group:
+            self.__first = (self.__first + 1) % self.__capacity
+            self.__size -= 1
+
+    def __current_pattern(self) -> int:
+        if self.__get_pattern is None:
+            return 0
+        return self.__get_pattern() or 0
+
+    def __in_current_pattern(self, i: int) -> bool:
+        if self.__patterns[i] == self.__current_pattern():
+            return True
+        print("[JOURNAL WARNING] The edit was made in pattern ", self.__patterns[i], ", select it to undo or redo the edit.")
+        return False
+
+    def __apply(self, i: int, batch):
+        batch.toggle_mask(self.__channels[i], self.__starts[i], MIDAS_JOURNAL_WORD_BITS, self.__masks[i])
@@ -0,0 +1,98 @@
+import midaslib.worker as midaslib_led_worker
+
+
+class MidasLedState:
+    """
+    Remembers the last value sent to every LED of a surface and only sends changes.
+
+    Renderers describe the whole frame every time and call set for every LED, the state
+    filters out the messages that would not change anything on the device. A channel switch
+    or zoom change then only sends the pads that differ from the previous frame.
+
+    Attributes:
+        sent (int): Number of messages sent since the state was created.
+
+    Methods:
+        __init__(self, send): Initialize the LED state.
+        get(self, status, channel, data1): Get the last value sent to an LED.
+        set(self, status, channel, data1, value): Send a value to an LED if it changed.
+        assume(self, status, channel, data1, value): Record a value the device shows without sending it.
+        invalidate(self): Forget every LED so the next frame is sent in full.
+        forget(self, status, channel, data1): Forget a single LED.
+    """
+
+    def __init__(self, send):
+        """
+        Initialize the LED state.
+
+        Args:
+            send: Function taking (status, channel, data1, data2) sending the message to the device.
+        """
+        self.sent = 0
+        self.__send = send
+        self.__values = {}
+
+    def get(self, status: int, channel: int, data1: int):
+        """
+        Get the last value sent to an LED.
+
+        Args:
+            status (int): MIDI status of the LED message.
+            channel (int): MIDI channel of the LED.
+            data1 (int): Id of the LED.
+
+        Returns:
+            The last value sent, None if unknown.
+        """
+        return self.__values.get((status, channel, data1))
+
+    def set(self, status: int, channel: int, data1: int, value: int) -> bool:
+        """
+        Send a value to an LED if it differs from the last value sent.
+
+        Args:
+            status (int): MIDI status of the LED message.
+            channel (int): MIDI channel of the LED.
+            data1 (int): Id of the LED.
+            value (int): New value of the LED.
+
+        Returns:
+            bool: True if a message was sent.
+        """
+        key = (status, channel, data1)
+        if self.__values.get(key) == value:
+            return False
+        midaslib_led_worker.require_main_thread("MidasLedState")
+        self.__values[key] = value
+        self.__send(status, channel, data1, value)
+        self.sent += 1
+        return True
+
+    def assume(self, status: int, channel: int, data1: int, value: int):
+        """
+        Record a value the device shows without sending it, for example a knob ring drawn by the device.
+
+        Args:
+            status (int): MIDI status of the LED message.
+            channel (int): MIDI channel of the LED.
+            data1 (int): Id of the LED.
+            value (int): Value shown by the LED.
+        """
+        self.__values[(status, channel, data1)] = value
+
+    def invalidate(self):
+        """
+        Forget every LED so the next frame is sent in full, for example after the device reconnects.
+        """
+        self.__values.clear()
+
+    def forget(self, status: int, channel: int, data1: int):
+        """
+        Forget a single LED, its next value is always sent.
+
+        Args:
+            status (int): MIDI status of the LED message.
+            channel (int): MIDI channel of the LED.
+            data1 (int): Id of the LED.
+        """
+        self.__values.pop((status, channel, data1), None)
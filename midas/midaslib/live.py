@@ -0,0 +1,223 @@
+from array import array as midaslib_live_array
+import time as midaslib_live_time
+import midaslib.flsi.fl_midi as midaslib_live_fl_midi
+import midaslib.worker as midaslib_live_worker
+
+# Status of a live block with LB_Status_Simple.
+MIDAS_LIVE_BLOCK_EMPTY = 0
+MIDAS_LIVE_BLOCK_FILLED = 1
+MIDAS_LIVE_BLOCK_PLAYING = 2
+MIDAS_LIVE_BLOCK_SCHEDULED = 3
+
+MIDAS_LIVE_FIRST_TRACK = 1 # Playlist tracks are numbered from 1.
+MIDAS_LIVE_POLL_BUDGET = 0.001 # Seconds of block status reads allowed per poll.
+MIDAS_LIVE_TRIGGER_FLAGS = midaslib_live_fl_midi.TLC_MuteOthers | midaslib_live_fl_midi.TLC_Fill # A clip replaces the clip playing on its track.
+
+
+class MidasLiveGrid:
+    """
+    Cache of the status and colour of a window of playlist live blocks, polled round robin.
+
+    The window is columns tracks by rows blocks, cell i is column i % columns and row
+    i // columns. FL Studio does not report when a block starts or stops playing, so poll
+    reads the status of a few cells per call, continuing where the previous call stopped,
+    until its time budget is spent or every cell was read once. on_change is only called for
+    the cells whose status or colour differs from the cache, a renderer then sends one LED
+    message per changed cell. Colours only change with the playlist, they are read again
+    after a refresh instead of on every poll.
+
+    The (track, block) of every cell is resolved when the window moves, trigger goes
+    straight to FL Studio with it.
+
+    Attributes:
+        columns (int): Tracks in the window.
+        rows (int): Blocks in the window.
+        track (int): First track of the window.
+        block (int): First block of the window.
+
+    Methods:
+        __init__(self, get_live_block_status, get_live_block_color, trigger_live_clip, get_performance_mode_state, columns, rows, clock): Initialize an empty window.
+        set_window(self, track, block): Move the window.
+        target(self, cell): Get the (track, block) of a cell.
+        status(self, cell): Get the cached status of a cell.
+        color(self, cell): Get the cached colour of a cell.
+        is_performance_mode(self): Check if the playlist is in performance mode.
+        trigger(self, cell, flags): Trigger the block of a cell.
+        stop(self, column): Stop the live clips of the track of a column.
+        poll(self, on_change, budget): Read cells round robin and report the changed ones.
+        invalidate(self): Report every cell on the next polls.
+        on_refresh(self, flags): Forward OnRefresh to the cache.
+    """
+
+    def __init__(self, get_live_block_status, get_live_block_color, trigger_live_clip, get_performance_mode_state,
+                 columns: int = 8, rows: int = 5, clock=midaslib_live_time.perf_counter):
+        """
+        Initialize an empty window on the first track and block, nothing is read until poll.
+
+        Args:
+            get_live_block_status: Returns the status of a block of a track.
+            get_live_block_color: Returns the colour of a block of a track.
+            trigger_live_clip: Triggers a block of a track.
+            get_performance_mode_state: Returns 1 when the playlist is in performance mode.
+            columns (int): Tracks in the window.
+            rows (int): Blocks in the window.
+            clock: Monotonic clock returning seconds, used to measure the budget.
+        """
+        self.columns = columns
+        self.rows = rows
+        self.track = MIDAS_LIVE_FIRST_TRACK
+        self.block = 0
+        self.__get_live_block_status = get_live_block_status
+        self.__get_live_block_color = get_live_block_color
+        self.__trigger_live_clip = trigger_live_clip
+        self.__get_performance_mode_state = get_performance_mode_state
+        self.__clock = clock
+        self.__performance_mode = None
+        self.__cursor = 0
+        self.__targets = []
+        self.__statuses = midaslib_live_array("b", [-1] * (columns * rows)) # -1 is unknown, reported on the next read
+        self.__colors = midaslib_live_array("l", [0] * (columns * rows))
+        self.__color_loaded = midaslib_live_array("b", [0] * (columns * rows))
+        self.set_window(self.track, self.block)
+
+    def set_window(self, track: int, block: int):
+        """
+        Move the window, every cell is reported again on the next polls.
+
+        Args:
+            track (int): First track of the window.
+            block (int): First block of the window.
+        """
+        self.track = track
+        self.block = block
+        self.__targets = [(track + (cell % self.columns), block + (cell // self.columns)) for cell in range(self.columns * self.rows)]
+        self.invalidate()
+
+    def target(self, cell: int) -> tuple:
+        """
+        Get the (track, block) of a cell.
+
+        Args:
+            cell (int): Cell of the window.
+
+        Returns:
+            tuple: (track, block) passed to FL Studio.
+        """
+        return self.__targets[cell]
+
+    def status(self, cell: int) -> int:
+        """
+        Get the cached status of a cell.
+
+        Args:
+            cell (int): Cell of the window.
+
+        Returns:
+            int: One of the MIDAS_LIVE_BLOCK constants, None if the cell was not read yet.
+        """
+        status = self.__statuses[cell]
+        return None if status < 0 else status
+
+    def color(self, cell: int) -> int:
+        """
+        Get the cached colour of a cell.
+
+        Args:
+            cell (int): Cell of the window.
+
+        Returns:
+            int: The colour of the block as 0xBBGGRR.
+        """
+        return self.__colors[cell]
+
+    def is_performance_mode(self) -> bool:
+        """
+        Check if the playlist is in performance mode, read once until a refresh reports a change.
+
+        Returns:
+            bool: True if live blocks can be triggered.
+        """
+        if self.__performance_mode is None:
+            self.__performance_mode = bool(self.__get_performance_mode_state())
+        return self.__performance_mode
+
+    @midaslib_live_worker.main_thread_only
+    def trigger(self, cell: int, flags: int = MIDAS_LIVE_TRIGGER_FLAGS):
+        """
+        Trigger the block of a cell.
+
+        Args:
+            cell (int): Cell of the window.
+            flags (int): TLC flags, add TLC_Release when the button is released.
+        """
+        track, block = self.__targets[cell]
+        self.__trigger_live_clip(track, block, flags)
+
+    @midaslib_live_worker.main_thread_only
+    def stop(self, column: int):
+        """
+        Stop the live clips of the track of a column.
+
+        Args:
+            column (int): Column of the window.
+        """
+        self.__trigger_live_clip(self.__targets[column][0], -1, midaslib_live_fl_midi.TLC_Fill)
+
+    @midaslib_live_worker.main_thread_only
+    def poll(self, on_change, budget: float = MIDAS_LIVE_POLL_BUDGET) -> int:
+        """
+        Read cells round robin until the budget is spent or every cell was read once, call from OnIdle.
+        Nothing is read while the playlist is not in performance mode.
+
+        Args:
+            on_change: Called with (cell, status, color) for every cell that changed.
+            budget (float): Seconds of reads allowed, at least one cell is read.
+
+        Returns:
+            int: Number of cells read.
+        """
+        if not self.is_performance_mode():
+            return 0
+        deadline = self.__clock() + budget
+        count = len(self.__targets)
+        read = 0
+        while read < count:
+            cell = self.__cursor
+            self.__cursor = (cell + 1) % count
+            track, block = self.__targets[cell]
+            status = self.__get_live_block_status(track, block, midaslib_live_fl_midi.LB_Status_Simple) or 0
+            changed = status != self.__statuses[cell]
+            self.__statuses[cell] = status
+            if not self.__color_loaded[cell]:
+                color = self.__get_live_block_color(track, block) or 0
+                changed = changed or color != self.__colors[cell]
+                self.__colors[cell] = color
+                self.__color_loaded[cell] = 1
+            if changed:
+                on_change(cell, status, self.__colors[cell])
+            read += 1
+            if self.__clock() >= deadline:
+                break
+        return read
+
+    def invalidate(self):
+        """
+        Report every cell on the next polls, their status and colour are read again.
+        """
+        for cell in range(len(self.__statuses)):
+            self.__statuses[cell] = -1
+            self.__color_loaded[cell] = 0
+
+    def on_refresh(self, flags: int):
+        """
+        Forward OnRefresh to the cache, performance, track and colour changes read the cells again.
+
+        Args:
+            flags (int): The HW_Dirty flags of the refresh.
+        """
+        if flags & midaslib_live_fl_midi.HW_Dirty_Performance:
+            self.__performance_mode = None
+            self.invalidate()
+        elif flags & (midaslib_live_fl_midi.HW_Dirty_Tracks | midaslib_live_fl_midi.HW_Dirty_Colors):
+            for cell in range(len(self.__color_loaded)):
+                self.__color_loaded[cell] = 0
@@ -0,0 +1,165 @@
+import midaslib.flsi.fl_midi as midaslib_pattern_fl_midi
+
+MIDAS_PATTERN_STEPS_PER_BEAT = 4 # Step sequencer steps per beat of the pattern length.
+MIDAS_PATTERN_DEFAULT_STEPS = 16 # Steps of a pattern FL Studio reports no length for, an empty pattern is one bar.
+
+
+class MidasPatternCache:
+    """
+    Cache of the metadata of the patterns: current pattern number, length, name and colour.
+
+    Every value is read from FL Studio the first time it is used and kept until a refresh
+    reports that the patterns changed. Paging code asks page_count how many windows the
+    current pattern fills, so navigation stops at the end of the pattern instead of paging
+    into empty steps.
+
+    Methods:
+        __init__(self, pattern_number, get_pattern_length, get_pattern_name, get_pattern_color, steps_per_beat): Initialize an empty cache.
+        current(self): Get the current pattern number.
+        length(self, index): Get the length of a pattern in beats.
+        steps(self, index): Get the length of a pattern in steps.
+        name(self, index): Get the name of a pattern.
+        color(self, index): Get the colour of a pattern.
+        page_count(self, window_steps, index): Get the number of windows a pattern fills.
+        clamp_page(self, page, window_steps, index): Bound a page to the pages of a pattern.
+        invalidate_all(self): Read every value again on next use.
+        on_refresh(self, flags): Forward OnRefresh to the cache.
+    """
+
+    def __init__(self, pattern_number, get_pattern_length, get_pattern_name, get_pattern_color,
+                 steps_per_beat: int = MIDAS_PATTERN_STEPS_PER_BEAT):
+        """
+        Initialize an empty cache, nothing is read from FL Studio until a value is used.
+
+        Args:
+            pattern_number: Returns the current pattern number.
+            get_pattern_length: Returns the length of a pattern in beats.
+            get_pattern_name: Returns the name of a pattern.
+            get_pattern_color: Returns the colour of a pattern.
+            steps_per_beat (int): Steps per beat of the pattern length.
+        """
+        self.__pattern_number = pattern_number
+        self.__get_pattern_length = get_pattern_length
+        self.__get_pattern_name = get_pattern_name
+        self.__get_pattern_color = get_pattern_color
+        self.__steps_per_beat = steps_per_beat
+        self.__current = None
+        self.__lengths = {}
+        self.__names = {}
+        self.__colors = {}
+
+    def current(self) -> int:
+        """
+        Get the current pattern number.
+
+        Returns:
+            int: patterns.patternNumber(), read once until the patterns change.
+        """
+        if self.__current is None:
+            self.__current = self.__pattern_number() or 0
+        return self.__current
+
+    def length(self, index: int = None) -> int:
+        """
+        Get the length of a pattern in beats.
+
+        Args:
+            index (int): Pattern number, the current pattern if None.
+
+        Returns:
+            int: Length in beats, 0 if FL Studio reports none.
+        """
+        index = self.current() if index is None else index
+        if index not in self.__lengths:
+            self.__lengths[index] = self.__get_pattern_length(index) or 0
+        return self.__lengths[index]
+
+    def steps(self, index: int = None) -> int:
+        """
+        Get the length of a pattern in steps.
+
+        Args:
+            index (int): Pattern number, the current pattern if None.
+
+        Returns:
+            int: Length in steps, MIDAS_PATTERN_DEFAULT_STEPS for a pattern without a length.
+        """
+        beats = self.length(index)
+        return beats * self.__steps_per_beat if beats > 0 else MIDAS_PATTERN_DEFAULT_STEPS
+
+    def name(self, index: int = None) -> str:
+        """
+        Get the name of a pattern.
+
+        Args:
+            index (int): Pattern number, the current pattern if None.
+
+        Returns:
+            str: The name of the pattern.
+        """
+        index = self.current() if index is None else index
+        if index not in self.__names:
+            self.__names[index] = self.__get_pattern_name(index) or ""
+        return self.__names[index]
+
+    def color(self, index: int = None) -> int:
+        """
+        Get the colour of a pattern.
+
+        Args:
+            index (int): Pattern number, the current pattern if None.
+
+        Returns:
+            int: The colour of the pattern as 0xBBGGRR.
+        """
+        index = self.current() if index is None else index
+        if index not in self.__colors:
+            self.__colors[index] = self.__get_pattern_color(index) or 0
+        return self.__colors[index]
+
+    def page_count(self, window_steps: int, index: int = None) -> int:
+        """
+        Get the number of windows of window_steps steps a pattern fills, at least one.
+
+        Args:
+            window_steps (int): Steps shown at once, pads times zoom.
+            index (int): Pattern number, the current pattern if None.
+
+        Returns:
+            int: Number of pages.
+        """
+        window_steps = max(1, window_steps)
+        return max(1, (self.steps(index) + window_steps - 1) // window_steps)
+
+    def clamp_page(self, page: int, window_steps: int, index: int = None) -> int:
+        """
+        Bound a page to the pages of a pattern, for example after zooming out.
+
+        Args:
+            page (int): Page to bound.
+            window_steps (int): Steps shown at once, pads times zoom.
+            index (int): Pattern number, the current pattern if None.
+
+        Returns:
+            int: The page, between 0 and page_count - 1.
+        """
+        return max(0, min(page, self.page_count(window_steps, index) - 1))
+
+    def invalidate_all(self):
+        """
+        Read every value again on next use.
+        """
+        self.__current = None
+        self.__lengths.clear()
+        self.__names.clear()
+        self.__colors.clear()
+
+    def on_refresh(self, flags: int):
+        """
+        Forward OnRefresh to the cache, pattern, name and colour changes drop every value.
+
+        Args:
+            flags (int): The HW_Dirty flags of the refresh.
+        """
+        if flags & (midaslib_pattern_fl_midi.HW_Dirty_Patterns | midaslib_pattern_fl_midi.HW_Dirty_Names | midaslib_pattern_fl_midi.HW_Dirty_Colors):
+            self.invalidate_all()
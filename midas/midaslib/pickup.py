@@ -0,0 +1,87 @@
+MIDAS_PICKUP_THRESHOLD = 2 / 127 # A knob this close to the value picks it up, two CC steps.
+
+
+class MidasPickup:
+    """
+    Soft takeover of the parameters controlled by absolute knobs.
+
+    A parameter is identified by a key, for example (channel, param). Knob positions and
+    parameter values are normalized from 0 to 1. A knob does nothing until it reaches the
+    cached value of its parameter: it picks the parameter up when it comes within threshold
+    of the value or crosses it between two moves, so touching a knob never makes the
+    parameter jump. Once picked up, every move is passed to write, which is expected to
+    update the cache at once and queue the FL Studio call on MidasOS.writes.
+
+    A parameter changed somewhere else has to be picked up again: the cached value is read
+    on every move, keep it fresh by forwarding OnDirtyChannel to the cache read from.
+
+    Methods:
+        __init__(self, read, write, threshold): Initialize with no knob picked up.
+        move(self, key, value): Move the knob of a parameter.
+        is_picked_up(self, key): Check if a knob controls its parameter.
+        drop(self, key): Require a knob to pick its parameter up again.
+    """
+
+    def __init__(self, read, write, threshold: float = MIDAS_PICKUP_THRESHOLD):
+        """
+        Initialize with no knob picked up.
+
+        Args:
+            read: Returns the cached value of a key, 0 to 1.
+            write: Called with a key and a value from 0 to 1 for every move of a picked up knob.
+            threshold (float): Distance from the value that picks a parameter up.
+        """
+        self.__read = read
+        self.__write = write
+        self.__threshold = threshold
+        self.__positions = {}
+        self.__values = {}
+
+    def move(self, key, value: float) -> bool:
+        """
+        Move the knob of a parameter, the value is written once the knob picked the parameter up.
+
+        Args:
+            key: The parameter, for example (channel, param).
+            value (float): Knob position from 0 to 1.
+
+        Returns:
+            bool: True if the knob controls the parameter and the value was written.
+        """
+        if key in self.__values and abs(self.__read(key) - self.__values[key]) > self.__threshold:
+            del self.__values[key] # changed somewhere else since the last write
+        previous = self.__positions.get(key)
+        self.__positions[key] = value # also while picked up, a dropped knob crosses from where it is
+        if key not in self.__values:
+            target = self.__read(key)
+            if abs(value - target) > self.__threshold and (previous is None or (previous - target) * (value - target) > 0):
+                return False # still on one side of the value
+        self.__values[key] = value
+        self.__write(key, value)
+        return True
+
+    def is_picked_up(self, key) -> bool:
+        """
+        Check if a knob controls its parameter.
+
+        Args:
+            key: The parameter.
+
+        Returns:
+            bool: True if moves of the knob are written.
+        """
+        return key in self.__values
+
+    def drop(self, key=None):
+        """
+        Require a knob to pick its parameter up again.
+
+        Args:
+            key: The parameter, every parameter if None.
+        """
+        if key is None:
+            self.__values.clear()
+            self.__positions.clear()
+        else:
+            self.__values.pop(key, None)
+            self.__positions.pop(key, None)
@@ -0,0 +1,131 @@
+MIDAS_PLAYHEAD_STEPS_PER_BEAT = 4 # Step sequencer steps per quarter note.
+
+
+class MidasPlayhead:
+    """
+    Follows the song position one step at a time and tracks the pad highlighting it.
+
+    The playhead fires from a MidasBeatScheduler grid event on every step, so it advances from
+    the extrapolated song position that OnUpdateBeatIndicator keeps in phase instead of from
+    polling FL Studio. follow moves the highlight and returns the pad to restore and the pad
+    to highlight: a renderer sends at most those two LED messages per step, the restored pad
+    is drawn from the cached grid. When the step leaves the visible window follow returns the
+    start of the page holding it, the renderer then pages the grid and repaints. The song
+    position keeps counting in song mode, the step is wrapped by the length of the pattern
+    so the playhead never pages past its end.
+
+    The beat scheduler is passed in so the playhead can be driven by any surface:
+        beat_scheduler: MidasOS.beat_scheduler.
+        get_steps: MidasPatternCache.steps, length of the pattern in steps.
+
+    Attributes:
+        step (int): Last step reached, None when stopped.
+        pad (int): Pad currently highlighted, None if the step is not visible.
+
+    Methods:
+        __init__(self, beat_scheduler, on_step, steps_per_beat, get_steps): Initialize a stopped playhead.
+        start(self): Call on_step on every step from the beat scheduler.
+        stop(self): Stop calling on_step and forget the step.
+        is_running(self): Check if the playhead is started.
+        follow(self, start, pads, zoom): Move the highlight to the current step.
+        locate(self, start, pads, zoom): Get the pad of the current step after a repaint.
+    """
+
+    def __init__(self, beat_scheduler, on_step, steps_per_beat: int = MIDAS_PLAYHEAD_STEPS_PER_BEAT, get_steps=None):
+        """
+        Initialize a stopped playhead.
+
+        Args:
+            beat_scheduler (MidasBeatScheduler): Scheduler firing the step events.
+            on_step: Called with the step number every time the song position reaches a new step.
+            steps_per_beat (int): Steps per quarter note.
+            get_steps: Returns the length of the pattern in steps, the step is wrapped by it. None to not wrap.
+        """
+        self.step = None
+        self.pad = None
+        self.__beat_scheduler = beat_scheduler
+        self.__on_step = on_step
+        self.__steps_per_beat = steps_per_beat
+        self.__get_steps = get_steps
+        self.__interval = 1
+        self.__event = None
+
+    def start(self):
+        """
+        Call on_step on every step from the beat scheduler, does nothing if already started.
+        """
+        if self.__event is None:
+            self.__interval = max(1, self.__beat_scheduler.ppq // self.__steps_per_beat)
+            self.__event = self.__beat_scheduler.schedule_every(self.__interval, self.__on_tick)
+
+    def stop(self):
+        """
+        Stop calling on_step and forget the step, the highlighted pad is left to the renderer.
+        """
+        self.__beat_scheduler.cancel(self.__event)
+        self.__event = None
+        self.step = None
+
+    def is_running(self) -> bool:
+        """
+        Check if the playhead is started.
+
+        Returns:
+            bool: True if on_step is called on every step.
+        """
+        return self.__event is not None
+
+    def follow(self, start: int, pads: int, zoom: int = 1) -> tuple:
+        """
+        Move the highlight to the current step.
+
+        Args:
+            start (int): First step of the visible window.
+            pads (int): Number of pads in the window.
+            zoom (int): Steps per pad.
+
+        Returns:
+            tuple: (start, previous, pad). start is the first step of the window showing the
+            step, it differs from the argument when the grid has to page. previous is the pad
+            to restore, None if there is none or the grid pages. pad is the pad to highlight,
+            None when stopped. previous equals pad when the step stays under the same pad.
+        """
+        if self.step is None:
+            previous, self.pad = self.pad, None
+            return start, previous, None
+        length = pads * zoom
+        if not start <= self.step < start + length:
+            start = (self.step // length) * length # page so the step is on the first page holding it
+            self.pad = None # the whole window is repainted
+        previous = self.pad
+        self.pad = (self.step - start) // zoom
+        return start, previous, self.pad
+
+    def locate(self, start: int, pads: int, zoom: int = 1):
+        """
+        Get the pad of the current step in a window, call when the window is repainted.
+
+        Args:
+            start (int): First step of the visible window.
+            pads (int): Number of pads in the window.
+            zoom (int): Steps per pad.
+
+        Returns:
+            int: The pad to highlight, None if the step is not in the window or the playhead is stopped.
+        """
+        if self.step is None or not start <= self.step < start + pads * zoom:
+            self.pad = None
+        else:
+            self.pad = (self.step - start) // zoom
+        return self.pad
+
+    def __on_tick(self, tick: int):
+        interval = max(1, self.__beat_scheduler.ppq // self.__steps_per_beat)
+        if interval != self.__interval: # the project PPQ changed, move the event to the new step grid
+            self.__beat_scheduler.cancel(self.__event)
+            self.__event = None
+            self.start()
+        self.step = tick // interval
+        if self.__get_steps is not None:
+            self.step %= max(1, self.__get_steps())
+        self.__on_step(self.step)
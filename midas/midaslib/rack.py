@@ -0,0 +1,361 @@
+from array import array as midaslib_rack_array
+import midaslib.flsi.fl_midi as midaslib_rack_fl_midi
+import midaslib.worker as midaslib_rack_worker
+
+MIDAS_RACK_LOAD_BATCH = 8 # Channels read from FL Studio per step of the bulk load task.
+
+
+class MidasChannelRack:
+    """
+    Mirror of the channel rack metadata, stored in parallel arrays indexed by channel index.
+    Indexes outside of the channel rack are not mirrored and read from FL Studio directly.
+
+    Navigation and knob feedback read the channel count, global index, name, colour, mute and
+    solo state and volume, pan and pitch from the mirror instead of asking FL Studio on every
+    button press. A channel is read from FL Studio the first time it is used, or ahead of time
+    by the bulk load task spawned from OnIdle after the project is loaded. Forward
+    OnDirtyChannel to the mirror so only the changed channels are read again, and call the
+    set_* methods after the script writes a value to FL Studio itself. OnDirtyChannel does not
+    report mute, solo, volume, pan or pitch changes, those arrive as HW_ChannelEvent refreshes:
+    on_refresh then only drops the values, the names and colours stay mirrored.
+
+    Methods:
+        __init__(self, channel_count, ...): Initialize an empty mirror.
+        count(self): Get the number of channels.
+        global_index(self, index): Get the global index of a channel.
+        name(self, index): Get the name of a channel.
+        color(self, index): Get the colour of a channel.
+        is_muted(self, index): Get the mute state of a channel.
+        is_solo(self, index): Get the solo state of a channel.
+        volume(self, index): Get the volume of a channel.
+        pan(self, index): Get the pan of a channel.
+        pitch(self, index): Get the pitch of a channel.
+        set_muted(self, index, value): Update the mirrored mute state.
+        set_solo(self, index, value): Update the mirrored solo state.
+        set_volume(self, index, value): Update the mirrored volume.
+        set_pan(self, index, value): Update the mirrored pan.
+        set_pitch(self, index, value): Update the mirrored pitch.
+        is_loaded(self): Check if every channel is mirrored.
+        invalidate(self, index): Read a channel again on next use.
+        invalidate_values(self): Read the mute, solo, volume, pan and pitch of every channel again on next use.
+        invalidate_all(self): Read every channel and the channel count again on next use.
+        on_dirty_channel(self, index, flag): Forward OnDirtyChannel to the mirror.
+        on_refresh(self, flags): Forward OnRefresh to the mirror.
+        loader(self, batch): Generator task reading every channel that is not mirrored yet.
+    """
+
+    def __init__(self, channel_count, get_channel_index, get_channel_name, get_channel_color,
+                 is_channel_muted, is_channel_solo, get_channel_volume, get_channel_pan, get_channel_pitch):
+        """
+        Initialize an empty mirror, nothing is read from FL Studio until the channels are used.
+
+        Args:
+            channel_count: Returns the number of channels.
+            get_channel_index: Returns the global index of a channel.
+            get_channel_name: Returns the name of a channel.
+            get_channel_color: Returns the colour of a channel.
+            is_channel_muted: Returns the mute state of a channel.
+            is_channel_solo: Returns the solo state of a channel.
+            get_channel_volume: Returns the volume of a channel, 0 to 1.
+            get_channel_pan: Returns the pan of a channel, -1 to 1.
+            get_channel_pitch: Returns the pitch of a channel, -1 to 1.
+        """
+        self.__channel_count = channel_count
+        self.__get_channel_index = get_channel_index
+        self.__get_channel_name = get_channel_name
+        self.__get_channel_color = get_channel_color
+        self.__is_channel_muted = is_channel_muted
+        self.__is_channel_solo = is_channel_solo
+        self.__get_channel_volume = get_channel_volume
+        self.__get_channel_pan = get_channel_pan
+        self.__get_channel_pitch = get_channel_pitch
+        self.__count = None
+        self.__loaded = midaslib_rack_array("b")
+        self.__values_loaded = midaslib_rack_array("b")
+        self.__global_indexes = midaslib_rack_array("i")
+        self.__colors = midaslib_rack_array("l")
+        self.__muted = midaslib_rack_array("b")
+        self.__solo = midaslib_rack_array("b")
+        self.__volumes = midaslib_rack_array("d")
+        self.__pans = midaslib_rack_array("d")
+        self.__pitches = midaslib_rack_array("d")
+        self.__names = []
+
+    def count(self) -> int:
+        """
+        Get the number of channels.
+
+        Returns:
+            int: channels.channelCount(), read once until the channels are invalidated.
+        """
+        if self.__count is None:
+            self.__resize(self.__channel_count() or 0)
+        return self.__count
+
+    def global_index(self, index: int) -> int:
+        """
+        Get the global index of a channel.
+
+        Args:
+            index (int): Channel index, respecting groups.
+
+        Returns:
+            int: The global index of the channel.
+        """
+        return self.__read(index, self.__global_indexes, self.__get_channel_index)
+
+    def name(self, index: int) -> str:
+        """
+        Get the name of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            str: The name of the channel.
+        """
+        return self.__read(index, self.__names, self.__get_channel_name)
+
+    def color(self, index: int) -> int:
+        """
+        Get the colour of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            int: The colour of the channel as 0xBBGGRR.
+        """
+        return self.__read(index, self.__colors, self.__get_channel_color)
+
+    def is_muted(self, index: int) -> bool:
+        """
+        Get the mute state of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            bool: True if the channel is muted.
+        """
+        return bool(self.__read(index, self.__muted, self.__is_channel_muted))
+
+    def is_solo(self, index: int) -> bool:
+        """
+        Get the solo state of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            bool: True if the channel is solo.
+        """
+        return bool(self.__read(index, self.__solo, self.__is_channel_solo))
+
+    def volume(self, index: int) -> float:
+        """
+        Get the volume of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            float: Volume from 0 to 1.
+        """
+        return self.__read(index, self.__volumes, self.__get_channel_volume)
+
+    def pan(self, index: int) -> float:
+        """
+        Get the pan of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            float: Pan from -1 to 1.
+        """
+        return self.__read(index, self.__pans, self.__get_channel_pan)
+
+    def pitch(self, index: int) -> float:
+        """
+        Get the pitch of a channel.
+
+        Args:
+            index (int): Channel index.
+
+        Returns:
+            float: Pitch from -1 to 1.
+        """
+        return self.__read(index, self.__pitches, self.__get_channel_pitch)
+
+    def set_muted(self, index: int, value: bool):
+        """
+        Update the mirrored mute state after the script changed it in FL Studio.
+
+        Args:
+            index (int): Channel index.
+            value (bool): New mute state.
+        """
+        if self.__contains(index):
+            self.__muted[index] = 1 if value else 0
+
+    def set_solo(self, index: int, value: bool):
+        """
+        Update the mirrored solo state after the script changed it in FL Studio.
+
+        Args:
+            index (int): Channel index.
+            value (bool): New solo state.
+        """
+        if self.__contains(index):
+            self.__solo[index] = 1 if value else 0
+
+    def set_volume(self, index: int, value: float):
+        """
+        Update the mirrored volume after the script wrote it to FL Studio.
+
+        Args:
+            index (int): Channel index.
+            value (float): New volume from 0 to 1.
+        """
+        if self.__contains(index):
+            self.__volumes[index] = value
+
+    def set_pan(self, index: int, value: float):
+        """
+        Update the mirrored pan after the script wrote it to FL Studio.
+
+        Args:
+            index (int): Channel index.
+            value (float): New pan from -1 to 1.
+        """
+        if self.__contains(index):
+            self.__pans[index] = value
+
+    def set_pitch(self, index: int, value: float):
+        """
+        Update the mirrored pitch after the script wrote it to FL Studio.
+
+        Args:
+            index (int): Channel index.
+            value (float): New pitch from -1 to 1.
+        """
+        if self.__contains(index):
+            self.__pitches[index] = value
+
+    def is_loaded(self) -> bool:
+        """
+        Check if every channel is mirrored.
+
+        Returns:
+            bool: True if no channel has to be read from FL Studio.
+        """
+        return self.__count is not None and 0 not in self.__loaded and 0 not in self.__values_loaded
+
+    def invalidate(self, index: int):
+        """
+        Read a channel again on next use.
+
+        Args:
+            index (int): Channel index.
+        """
+        if 0 <= index < len(self.__loaded):
+            self.__loaded[index] = 0
+
+    def invalidate_values(self):
+        """
+        Read the mute, solo, volume, pan and pitch of every channel again on next use.
+        """
+        for index in range(len(self.__values_loaded)):
+            self.__values_loaded[index] = 0
+
+    def invalidate_all(self):
+        """
+        Read every channel and the channel count again on next use.
+        """
+        self.__count = None
+
+    def on_dirty_channel(self, index: int, flag: int):
+        """
+        Forward OnDirtyChannel to the mirror.
+
+        Args:
+            index (int): Index of the changed channel, -1 for all channels.
+            flag (int): CE_New, CE_Delete, CE_Replace, CE_Rename or CE_Select.
+        """
+        if flag == midaslib_rack_fl_midi.CE_Select:
+            return # The selection is not mirrored.
+        if index < 0 or flag == midaslib_rack_fl_midi.CE_New or flag == midaslib_rack_fl_midi.CE_Delete:
+            self.invalidate_all() # Channel indexes may have shifted.
+        else:
+            self.invalidate(index)
+
+    def on_refresh(self, flags: int):
+        """
+        Forward OnRefresh to the mirror, group, name and colour changes drop every channel,
+        channel events and mixer control changes drop the values.
+
+        Args:
+            flags (int): The HW_Dirty flags of the refresh.
+        """
+        if flags & (midaslib_rack_fl_midi.HW_Dirty_ChannelRackGroup | midaslib_rack_fl_midi.HW_Dirty_Names | midaslib_rack_fl_midi.HW_Dirty_Colors):
+            self.invalidate_all()
+        elif flags & (midaslib_rack_fl_midi.HW_ChannelEvent | midaslib_rack_fl_midi.HW_Dirty_Mixer_Controls):
+            self.invalidate_values()
+
+    def loader(self, batch: int = MIDAS_RACK_LOAD_BATCH):
+        """
+        Generator task reading every channel that is not mirrored yet, batch channels per step.
+
+        Spawn it on MidasOS.scheduler after the project is loaded so the channels are read in
+        OnIdle instead of on the first button press.
+
+        Args:
+            batch (int): Channels read per step.
+        """
+        index = 0
+        while index < self.count():
+            for _ in range(batch):
+                if index >= self.count():
+                    break
+                self.__entry(index)
+                index += 1
+            yield
+
+    def __resize(self, count: int):
+        self.__count = count
+        for table in (self.__loaded, self.__values_loaded, self.__global_indexes, self.__colors, self.__muted, self.__solo):
+            del table[:]
+            table.extend([0] * count)
+        for table in (self.__volumes, self.__pans, self.__pitches):
+            del table[:]
+            table.extend([0.0] * count)
+        self.__names = [""] * count
+
+    def __contains(self, index: int) -> bool:
+        return 0 <= index < self.count()
+
+    def __read(self, index: int, table, get):
+        if not self.__contains(index):
+            midaslib_rack_worker.require_main_thread("MidasChannelRack")
+            return get(index) # Not a channel of the mirror, FL Studio decides what happens.
+        self.__entry(index)
+        return table[index]
+
+    def __entry(self, index: int):
+        if not self.__loaded[index]:
+            midaslib_rack_worker.require_main_thread("MidasChannelRack")
+            global_index = self.__get_channel_index(index)
+            self.__global_indexes[index] = index if global_index is None else global_index
+            self.__names[index] = self.__get_channel_name(index) or ""
+            self.__colors[index] = self.__get_channel_color(index) or 0
+            self.__loaded[index] = 1
+            self.__values_loaded[index] = 0
+        if not self.__values_loaded[index]:
+            midaslib_rack_worker.require_main_thread("MidasChannelRack")
+            self.__muted[index] = 1 if self.__is_channel_muted(index) else 0
+            self.__solo[index] = 1 if self.__is_channel_solo(index) else 0
+            self.__volumes[index] = self.__get_channel_volume(index) or 0.0
+            self.__pans[index] = self.__get_channel_pan(index) or 0.0
+            self.__pitches[index] = self.__get_channel_pitch(index) or 0.0
+            self.__values_loaded[index] = 1
@@ -0,0 +1,174 @@
+MIDAS_RING_MODE_DEVICE = 0 # The device draws a ring when its knob turns, the host may update it.
+MIDAS_RING_MODE_HOST = 1 # Only the host draws the rings, knob moves have to be echoed.
+
+MIDAS_RING_STATUS = 0xB0 # Rings are set with control change messages.
+
+
+class MidasLedRings:
+    """
+    Desired style and value of the LED rings around the knobs of a surface, sent once per frame.
+
+    Every ring is a (channel, value_id, style_id) tuple: a control change to value_id sets
+    the value shown by the ring and a control change to style_id its style. Renderers call
+    set whenever they like, only the rings whose style or value changed are marked and
+    render sends them once per frame through a MidasLedState, which skips the messages the
+    device already shows. Switching a bank of knobs then only sends the rings that differ.
+
+    In MIDAS_RING_MODE_DEVICE the device updates a ring itself when its knob turns, forward
+    the knob to on_knob so the state knows what the ring shows. In MIDAS_RING_MODE_HOST
+    nothing is drawn until the host sends it, set the value of a knob that controls its
+    parameter and render echoes it.
+
+    Attributes:
+        mode (int): MIDAS_RING_MODE_DEVICE or MIDAS_RING_MODE_HOST.
+
+    Methods:
+        __init__(self, led_state, rings, mode, status): Initialize with every ring unknown.
+        find(self, channel, value_id): Get the ring of a knob.
+        value(self, ring): Get the desired value of a ring.
+        style(self, ring): Get the desired style of a ring.
+        set(self, ring, value, style): Set the desired value and style of a ring.
+        on_knob(self, ring, value): Forward a knob move of a ring.
+        set_mode(self, mode): Change the mode after the device was introduced again.
+        invalidate(self): Send every ring in full on the next frame.
+        render(self): Send the rings that changed since the last frame.
+    """
+
+    def __init__(self, led_state, rings: list, mode: int = MIDAS_RING_MODE_DEVICE, status: int = MIDAS_RING_STATUS):
+        """
+        Initialize with every ring unknown, nothing is sent until a ring is set.
+
+        Args:
+            led_state (MidasLedState): Last value sent to every LED of the surface.
+            rings (list): (channel, value_id, style_id) of every ring.
+            mode (int): MIDAS_RING_MODE_DEVICE or MIDAS_RING_MODE_HOST.
+            status (int): MIDI status of the ring messages.
+        """
+        self.mode = mode
+        self.__led_state = led_state
+        self.__rings = list(rings)
+        self.__status = status
+        self.__values = [None] * len(self.__rings)
+        self.__styles = [None] * len(self.__rings)
+        self.__dirty = set()
+        self.__index = {}
+        for ring, (channel, value_id, style_id) in enumerate(self.__rings):
+            self.__index[(channel, value_id)] = ring
+
+    def find(self, channel: int, value_id: int):
+        """
+        Get the ring of a knob.
+
+        Args:
+            channel (int): MIDI channel of the knob.
+            value_id (int): Controller number of the knob.
+
+        Returns:
+            int: Index of the ring, None if the knob has no ring.
+        """
+        return self.__index.get((channel, value_id))
+
+    def value(self, ring: int):
+        """
+        Get the desired value of a ring.
+
+        Args:
+            ring (int): Index of the ring.
+
+        Returns:
+            int: The value, None if it was never set.
+        """
+        return self.__values[ring]
+
+    def style(self, ring: int):
+        """
+        Get the desired style of a ring.
+
+        Args:
+            ring (int): Index of the ring.
+
+        Returns:
+            int: The style, None if it was never set.
+        """
+        return self.__styles[ring]
+
+    def set(self, ring: int, value: int = None, style: int = None) -> bool:
+        """
+        Set the desired value and style of a ring, the ring is sent on the next frame if either changed.
+
+        Args:
+            ring (int): Index of the ring.
+            value (int): Value from 0 to 127, unchanged if None.
+            style (int): Style of the ring, unchanged if None.
+
+        Returns:
+            bool: True if the ring was marked for the next frame.
+        """
+        changed = False
+        if value is not None and self.__values[ring] != value:
+            self.__values[ring] = value
+            changed = True
+        if style is not None and self.__styles[ring] != style:
+            self.__styles[ring] = style
+            changed = True
+        if changed:
+            self.__dirty.add(ring)
+        return changed
+
+    def on_knob(self, ring: int, value: int):
+        """
+        Forward every move of the knob of a ring, after set if the knob controls its parameter.
+
+        In MIDAS_RING_MODE_DEVICE the ring already shows the knob, a ring whose desired value
+        differs is drawn again on the next frame. In MIDAS_RING_MODE_HOST nothing is shown.
+
+        Args:
+            ring (int): Index of the ring.
+            value (int): Value sent by the knob.
+        """
+        if self.mode != MIDAS_RING_MODE_DEVICE:
+            return
+        channel, value_id, style_id = self.__rings[ring]
+        self.__led_state.assume(self.__status, channel, value_id, value)
+        if self.__values[ring] is not None and self.__values[ring] != value:
+            self.__dirty.add(ring)
+
+    def set_mode(self, mode: int):
+        """
+        Change the mode, call after the device was introduced again: it resets every ring.
+
+        Args:
+            mode (int): MIDAS_RING_MODE_DEVICE or MIDAS_RING_MODE_HOST.
+        """
+        self.mode = mode
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Send every ring that has a desired value or style in full on the next frame.
+        """
+        for ring, (channel, value_id, style_id) in enumerate(self.__rings):
+            self.__led_state.forget(self.__status, channel, value_id)
+            self.__led_state.forget(self.__status, channel, style_id)
+            if self.__values[ring] is not None or self.__styles[ring] is not None:
+                self.__dirty.add(ring)
+
+    def render(self) -> int:
+        """
+        Send the rings that changed since the last frame, call once per frame from OnIdle.
+        The style is sent before the value so the value is drawn in its style.
+
+        Returns:
+            int: Number of messages sent.
+        """
+        if not self.__dirty:
+            return 0
+        sent = self.__led_state.sent
+        for ring in sorted(self.__dirty):
+            channel, value_id, style_id = self.__rings[ring]
+            if self.__styles[ring] is not None:
+                self.__led_state.set(self.__status, channel, style_id, self.__styles[ring])
+            if self.__values[ring] is not None:
+                self.__led_state.set(self.__status, channel, value_id, self.__values[ring])
+        self.__dirty.clear()
+        return self.__led_state.sent - sent
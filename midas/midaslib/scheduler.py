@@ -0,0 +1,183 @@
+import heapq as midaslib_scheduler_heapq
+import time as midaslib_scheduler_time
+
+MIDAS_TASK_PRIORITY_HIGH = 0
+MIDAS_TASK_PRIORITY_NORMAL = 1
+MIDAS_TASK_PRIORITY_LOW = 2
+
+MIDAS_SCHEDULER_DEFAULT_BUDGET = 0.004 # Seconds of work allowed per OnIdle tick.
+
+
+class MidasTask:
+    """
+    A cooperative task driven by the MidasTaskScheduler.
+
+    A task wraps a generator. Every `yield` inside the generator marks a point where the
+    task may be paused so that the remaining work continues on a later OnIdle tick.
+
+    Attributes:
+        name (str): Name of the task, used in error reports.
+        priority (int): Priority of the task, lower values run first.
+
+    Methods:
+        __init__(self, generator, priority, name): Initialize a MidasTask.
+        cancel(self): Cancel the task, it will not be resumed again.
+        is_alive(self): Check if the task is still pending.
+        step(self): Resume the task until its next yield.
+    """
+
+    def __init__(self, generator, priority: int = MIDAS_TASK_PRIORITY_NORMAL, name: str = ""):
+        """
+        Initialize a MidasTask.
+
+        Args:
+            generator: The generator holding the work of the task.
+            priority (int): Priority of the task, lower values run first.
+            name (str): Name of the task, used in error reports.
+        """
+        self.name = name
+        self.priority = priority
+        self.__generator = generator
+        self.__cancelled = False
+        self.__finished = False
+
+    def cancel(self):
+        """
+        Cancel the task, it will not be resumed again.
+        """
+        if not self.__finished and not self.__cancelled:
+            self.__cancelled = True
+            self.__generator.close()
+
+    def is_alive(self) -> bool:
+        """
+        Check if the task is still pending.
+
+        Returns:
+            bool: False if the task was cancelled or ran to completion.
+        """
+        return not (self.__finished or self.__cancelled)
+
+    def step(self) -> bool:
+        """
+        Resume the task until its next yield.
+
+        Returns:
+            bool: True if the task has more work to do.
+        """
+        if not self.is_alive():
+            return False
+        try:
+            next(self.__generator)
+        except StopIteration:
+            self.__finished = True
+        except Exception as error:
+            self.__finished = True
+            print("[TASK ERROR] Task '", self.name, "' was dropped after raising: ", repr(error))
+        return not self.__finished
+
+
+class MidasTaskScheduler:
+    """
+    Runs MidasTasks cooperatively from OnIdle within a per tick time budget.
+
+    Tasks with a lower priority value always run first, tasks of equal priority are
+    resumed round robin. At least one step is taken per tick so that no task starves
+    when the budget is very small.
+
+    Attributes:
+        budget (float): Seconds of work allowed per call to run.
+
+    Methods:
+        __init__(self, budget, clock): Initialize the scheduler.
+        spawn(self, generator, priority, name): Create and queue a new task.
+        cancel(self, task): Cancel a queued task.
+        cancel_all(self): Cancel every queued task.
+        pending(self): Get the number of tasks still queued.
+        run(self, budget): Resume queued tasks until the budget is spent.
+    """
+
+    def __init__(self, budget: float = MIDAS_SCHEDULER_DEFAULT_BUDGET, clock=midaslib_scheduler_time.perf_counter):
+        """
+        Initialize the scheduler.
+
+        Args:
+            budget (float): Seconds of work allowed per call to run.
+            clock: Monotonic clock returning seconds, used to measure the budget.
+        """
+        self.budget = budget
+        self.__clock = clock
+        self.__queue = []
+        self.__sequence = 0
+
+    def __push(self, task: MidasTask):
+        self.__sequence += 1
+        midaslib_scheduler_heapq.heappush(self.__queue, (task.priority, self.__sequence, task))
+
+    def spawn(self, generator, priority: int = MIDAS_TASK_PRIORITY_NORMAL, name: str = "") -> MidasTask:
+        """
+        Create and queue a new task.
+
+        Args:
+            generator: The generator holding the work of the task.
+            priority (int): Priority of the task, lower values run first.
+            name (str): Name of the task, used in error reports.
+
+        Returns:
+            MidasTask: The queued task, keep it to cancel the task later.
+        """
+        task = MidasTask(generator, priority, name)
+        self.__push(task)
+        return task
+
+    def cancel(self, task: MidasTask):
+        """
+        Cancel a queued task. Cancelled tasks are discarded the next time they are popped.
+
+        Args:
+            task (MidasTask): The task to cancel.
+        """
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self):
+        """
+        Cancel every queued task.
+        """
+        for _, _, task in self.__queue:
+            task.cancel()
+        self.__queue.clear()
+
+    def pending(self) -> int:
+        """
+        Get the number of tasks still queued.
+
+        Returns:
+            int: Number of live tasks in the queue.
+        """
+        return sum(1 for _, _, task in self.__queue if task.is_alive())
+
+    def run(self, budget: float = None) -> int:
+        """
+        Resume queued tasks until the budget is spent or the queue is empty.
+
+        Args:
+            budget (float): Seconds of work allowed for this call, defaults to the scheduler budget.
+
+        Returns:
+            int: Number of task steps taken.
+        """
+        if budget is None:
+            budget = self.budget
+        deadline = self.__clock() + budget
+        steps = 0
+        while self.__queue:
+            _, _, task = midaslib_scheduler_heapq.heappop(self.__queue)
+            if not task.is_alive():
+                continue
+            steps += 1
+            if task.step():
+                self.__push(task)
+            if self.__clock() >= deadline:
+                break
+        return steps
@@ -0,0 +1,155 @@
+import time as midaslib_startup_time
+
+
+class MidasStartupProfiler:
+    """
+    Measures how long the parts of a script take while FL Studio loads it.
+
+    Wrap module imports and the body of OnInit, then print the report once the device is initialized:
+
+        StartupProfiler = MidasStartupProfiler()
+        with StartupProfiler.measure("import midas.hardware.apc40.app"):
+            import midas.hardware.apc40.app
+
+    Attributes:
+        records (list): List of (label, seconds) tuples in the order they were measured.
+
+    Methods:
+        __init__(self, clock): Initialize the profiler.
+        measure(self, label): Context manager measuring the enclosed block.
+        begin(self, label): Start measuring a section.
+        end(self, label): Stop measuring a section.
+        total(self): Get the total measured time.
+        report(self): Print the measured sections, slowest first.
+    """
+
+    def __init__(self, clock=midaslib_startup_time.perf_counter):
+        """
+        Initialize the profiler.
+
+        Args:
+            clock: Monotonic clock returning seconds.
+        """
+        self.records = []
+        self.__clock = clock
+        self.__started = {}
+
+    def measure(self, label: str):
+        """
+        Context manager measuring the enclosed block.
+
+        Args:
+            label (str): Name of the measured section.
+
+        Returns:
+            A context manager recording the section when it exits.
+        """
+        return _MidasStartupSection(self, label)
+
+    def begin(self, label: str):
+        """
+        Start measuring a section.
+
+        Args:
+            label (str): Name of the measured section.
+        """
+        self.__started[label] = self.__clock()
+
+    def end(self, label: str):
+        """
+        Stop measuring a section started with begin.
+
+        Args:
+            label (str): Name of the measured section.
+        """
+        started = self.__started.pop(label, None)
+        if started is not None:
+            self.records.append((label, self.__clock() - started))
+
+    def total(self) -> float:
+        """
+        Get the total measured time.
+
+        Returns:
+            float: Sum of all measured sections in seconds.
+        """
+        return sum(seconds for _, seconds in self.records)
+
+    def report(self):
+        """
+        Print the measured sections, slowest first.
+        """
+        print("[Startup Profile] Total: ", round(self.total() * 1000.0, 3), " ms")
+        for label, seconds in sorted(self.records, key=lambda record: record[1], reverse=True):
+            print("    ", round(seconds * 1000.0, 3), " ms : ", label)
+
+
+class _MidasStartupSection:
+    def __init__(self, profiler: MidasStartupProfiler, label: str):
+        self.__profiler = profiler
+        self.__label = label
+
+    def __enter__(self):
+        self.__profiler.begin(self.__label)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__profiler.end(self.__label)
+        return False
+
+
+class MidasLazy:
+    """
+    Defers building an object until it is first used.
+
+    Module level tables and applications can be wrapped so that importing the module stays
+    cheap. The object is built by the first call to get, or ahead of time from OnIdle by
+    queueing it with MidasOS.defer_init once the device is linked.
+
+    Methods:
+        __init__(self, factory, name): Initialize the lazy object.
+        get(self): Get the object, building it on first use.
+        is_built(self): Check if the object was built already.
+        reset(self): Drop the object, it will be built again on next use.
+    """
+
+    def __init__(self, factory, name: str = ""):
+        """
+        Initialize the lazy object.
+
+        Args:
+            factory: Callable without arguments building the object.
+            name (str): Name of the object, used in reports.
+        """
+        self.name = name or getattr(factory, "__name__", "MidasLazy")
+        self.__factory = factory
+        self.__value = None
+        self.__built = False
+
+    def get(self):
+        """
+        Get the object, building it on first use.
+
+        Returns:
+            The object returned by the factory.
+        """
+        if not self.__built:
+            self.__value = self.__factory()
+            self.__built = True
+        return self.__value
+
+    def is_built(self) -> bool:
+        """
+        Check if the object was built already.
+
+        Returns:
+            bool: True if the factory has been called.
+        """
+        return self.__built
+
+    def reset(self):
+        """
+        Drop the object, it will be built again on next use.
+        """
+        self.__value = None
+        self.__built = False
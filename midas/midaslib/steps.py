@@ -0,0 +1,192 @@
+from array import array as midaslib_steps_array
+import midaslib.flsi.fl_midi as midaslib_steps_fl_midi
+import midaslib.worker as midaslib_steps_worker
+
+# Step parameters edited from a surface: velocity, pitch, pan, release and shift.
+MIDAS_STEP_PARAMS = (
+    midaslib_steps_fl_midi.pVelocity,
+    midaslib_steps_fl_midi.pPitch,
+    midaslib_steps_fl_midi.pPan,
+    midaslib_steps_fl_midi.pRelease,
+    midaslib_steps_fl_midi.pShift,
+)
+
+
+class MidasStepParamCache:
+    """
+    Cache of the step parameters of a window of steps of one channel, with coalesced writes.
+
+    load reads every parameter of every step of the window in one pass when the window
+    changes, knob feedback then reads from the cache. Writes made with set update the cache
+    at once and are queued per (step, param), a knob sweep only keeps the last value of each
+    step until flush writes the queue to FL Studio, for example once per OnIdle tick.
+
+    Steps outside the window are read from FL Studio directly. Forward OnDirtyChannel and
+    OnRefresh to the cache so the window is read again after changes made elsewhere.
+
+    Attributes:
+        channel (int): Channel of the window, None if nothing is loaded.
+        start (int): First step of the window.
+        length (int): Number of steps in the window.
+
+    Methods:
+        __init__(self, get_current_step_param, set_step_parameter_by_index, get_pattern, params): Initialize an empty cache.
+        load(self, channel, start, length): Read every parameter of a window in one pass.
+        is_loaded(self, channel, start, length): Check if a window is cached.
+        get(self, step, param): Get a step parameter.
+        set(self, step, param, value): Update a step parameter and queue the write.
+        has_pending(self): Check if writes are queued.
+        flush(self): Write the queued step parameters to FL Studio.
+        invalidate(self): Drop the window, queued writes are flushed first.
+        on_dirty_channel(self, index, flag): Forward OnDirtyChannel to the cache.
+        on_refresh(self, flags): Forward OnRefresh to the cache.
+    """
+
+    def __init__(self, get_current_step_param, set_step_parameter_by_index, get_pattern, params: tuple = MIDAS_STEP_PARAMS):
+        """
+        Initialize an empty cache.
+
+        Args:
+            get_current_step_param: Returns a parameter of a step of a channel in the current pattern.
+            set_step_parameter_by_index: Sets a parameter of a step of a channel in a pattern.
+            get_pattern: Returns the current pattern number.
+            params (tuple): Step parameters read by load, pPitch to pShift.
+        """
+        self.channel = None
+        self.start = 0
+        self.length = 0
+        self.__get_current_step_param = get_current_step_param
+        self.__set_step_parameter_by_index = set_step_parameter_by_index
+        self.__get_pattern = get_pattern
+        self.__params = params
+        self.__pattern = 0
+        self.__values = {}
+        self.__pending = {}
+
+    def load(self, channel: int, start: int, length: int):
+        """
+        Read every parameter of every step of a window in one pass, does nothing if the window is cached.
+
+        Args:
+            channel (int): Channel index.
+            start (int): First step of the window.
+            length (int): Number of steps in the window.
+        """
+        if self.is_loaded(channel, start, length):
+            return
+        midaslib_steps_worker.require_main_thread("MidasStepParamCache")
+        self.flush() # queued writes belong to the previous window
+        self.channel = channel
+        self.start = start
+        self.length = length
+        self.__pattern = self.__get_pattern() or 0
+        self.__values = {}
+        for param in self.__params:
+            self.__values[param] = midaslib_steps_array("i", [
+                self.__get_current_step_param(channel, start + i, param) or 0 for i in range(length)
+            ])
+
+    def is_loaded(self, channel: int, start: int, length: int) -> bool:
+        """
+        Check if a window is cached.
+
+        Args:
+            channel (int): Channel index.
+            start (int): First step of the window.
+            length (int): Number of steps in the window.
+
+        Returns:
+            bool: True if get reads the window from the cache.
+        """
+        return self.channel == channel and self.start == start and self.length == length
+
+    def get(self, step: int, param: int) -> int:
+        """
+        Get a parameter of a step of the loaded channel.
+
+        Args:
+            step (int): Step position.
+            param (int): One of the pPitch to pShift constants.
+
+        Returns:
+            int: The value of the parameter.
+        """
+        if self.channel is None or param not in self.__values or not self.start <= step < self.start + self.length:
+            return self.__get_current_step_param(self.channel, step, param) or 0 # not cached, FL Studio decides what happens
+        return self.__values[param][step - self.start]
+
+    def set(self, step: int, param: int, value: int) -> bool:
+        """
+        Update a parameter of a step of the loaded window and queue the write, the last value of a step wins.
+
+        Args:
+            step (int): Step position, inside the window.
+            param (int): One of the params of the cache.
+            value (int): New value of the parameter.
+
+        Returns:
+            bool: True if the value changed and a write was queued.
+        """
+        if self.channel is None or param not in self.__values or not self.start <= step < self.start + self.length:
+            print("[STEPS WARNING] Step ", step, " is not in the loaded window, the parameter was not set.")
+            return False
+        values = self.__values[param]
+        if values[step - self.start] == value:
+            return False
+        values[step - self.start] = value
+        self.__pending[(step, param)] = value
+        return True
+
+    def has_pending(self) -> bool:
+        """
+        Check if writes are queued.
+
+        Returns:
+            bool: True if flush would write to FL Studio.
+        """
+        return bool(self.__pending)
+
+    @midaslib_steps_worker.main_thread_only
+    def flush(self) -> int:
+        """
+        Write the queued step parameters to FL Studio, one call per changed (step, param).
+
+        Returns:
+            int: Number of parameters written.
+        """
+        pending = self.__pending
+        self.__pending = {}
+        for (step, param), value in pending.items():
+            self.__set_step_parameter_by_index(self.channel, self.__pattern, step, param, value)
+        return len(pending)
+
+    def invalidate(self):
+        """
+        Drop the window, queued writes are flushed first. The next load reads FL Studio again.
+        """
+        self.flush()
+        self.channel = None
+        self.__values = {}
+
+    def on_dirty_channel(self, index: int, flag: int):
+        """
+        Forward OnDirtyChannel to the cache.
+
+        Args:
+            index (int): Index of the changed channel, -1 for all channels.
+            flag (int): CE_New, CE_Delete, CE_Replace, CE_Rename or CE_Select.
+        """
+        if flag == midaslib_steps_fl_midi.CE_Rename or flag == midaslib_steps_fl_midi.CE_Select:
+            return # The steps did not change.
+        if index < 0 or index == self.channel or flag == midaslib_steps_fl_midi.CE_New or flag == midaslib_steps_fl_midi.CE_Delete:
+            self.invalidate()
+
+    def on_refresh(self, flags: int):
+        """
+        Forward OnRefresh to the cache, a pattern change drops the window.
+
+        Args:
+            flags (int): The HW_Dirty flags of the refresh.
+        """
+        if flags & midaslib_steps_fl_midi.HW_Dirty_Patterns:
+            self.invalidate()
@@ -0,0 +1,179 @@
+import _thread as midaslib_worker_thread
+
+# Identifier of the thread FL Studio runs the script on, the thread that imports this module.
+MIDAS_MAIN_THREAD_ID = midaslib_worker_thread.get_ident()
+
+
+class MidasThreadError(RuntimeError):
+    """
+    Raised when code that must run on the FL Studio main thread is called from another thread.
+    """
+    pass
+
+
+def is_main_thread() -> bool:
+    """
+    Check if the caller runs on the FL Studio main thread.
+
+    Returns:
+        bool: True on the main thread.
+    """
+    return midaslib_worker_thread.get_ident() == MIDAS_MAIN_THREAD_ID
+
+
+def require_main_thread(name: str = "FL Studio API"):
+    """
+    Raise MidasThreadError if the caller is not on the FL Studio main thread.
+
+    Args:
+        name (str): Name of the guarded code, used in the error message.
+    """
+    if not is_main_thread():
+        raise MidasThreadError(name + " must only be called from the FL Studio main thread.")
+
+
+def main_thread_only(function):
+    """
+    Decorator for functions that call the FL Studio API, the call raises MidasThreadError off the main thread.
+
+    Args:
+        function: The function to guard.
+
+    Returns:
+        The guarded function.
+    """
+    def guarded(*args, **kwargs):
+        require_main_thread(function.__qualname__)
+        return function(*args, **kwargs)
+    guarded.__name__ = function.__name__
+    guarded.__qualname__ = function.__qualname__
+    guarded.__doc__ = function.__doc__
+    return guarded
+
+
+class MidasWorker:
+    """
+    Runs pure computations on a background thread and hands the results back on the main thread.
+
+    Jobs must not call the FL Studio API, FL Studio is not thread safe. Everything a job needs
+    is passed in as arguments and everything it produces is returned. Results are passed back
+    through a lock protected queue and the done callbacks run on the main thread inside
+    on_idle, where calling the FL Studio API is allowed again. Every midaslib path that calls
+    FL Studio is guarded with main_thread_only or require_main_thread: the grid, channel rack
+    and step parameter caches, the live grid, the LED state and the write scheduler raise
+    MidasThreadError when a job reaches them by mistake.
+
+    The background thread is started on the first submitted job.
+
+    Methods:
+        __init__(self): Initialize the worker.
+        submit(self, job, args, on_done, on_error): Queue a job for the background thread.
+        pending(self): Get the number of jobs that have not been handed back yet.
+        on_idle(self, max_results): Run the done callbacks of finished jobs on the main thread.
+        stop(self): Stop the background thread once the queued jobs are done.
+    """
+
+    def __init__(self):
+        """
+        Initialize the worker.
+        """
+        self.__lock = midaslib_worker_thread.allocate_lock()
+        self.__wake = midaslib_worker_thread.allocate_lock()
+        self.__wake.acquire()
+        self.__jobs = []
+        self.__results = []
+        self.__pending = 0
+        self.__running = False
+        self.__stopping = False
+
+    @main_thread_only
+    def submit(self, job, args: tuple = (), on_done=None, on_error=None):
+        """
+        Queue a job for the background thread.
+
+        Args:
+            job: Callable doing the computation, it must not call the FL Studio API.
+            args (tuple): Arguments passed to the job.
+            on_done: Called on the main thread with the result of the job.
+            on_error: Called on the main thread with the exception raised by the job.
+        """
+        with self.__lock:
+            self.__jobs.append((job, args, on_done, on_error))
+            self.__pending += 1
+            self.__stopping = False
+            if not self.__running:
+                self.__running = True
+                midaslib_worker_thread.start_new_thread(self.__run, ())
+        self.__signal()
+
+    def pending(self) -> int:
+        """
+        Get the number of jobs that have not been handed back yet.
+
+        Returns:
+            int: Number of queued, running and finished but not yet handed back jobs.
+        """
+        with self.__lock:
+            return self.__pending
+
+    @main_thread_only
+    def on_idle(self, max_results: int = 8) -> int:
+        """
+        Run the done callbacks of finished jobs on the main thread.
+
+        Args:
+            max_results (int): Maximum number of results handed back per call.
+
+        Returns:
+            int: Number of results handed back.
+        """
+        handed_back = 0
+        while handed_back < max_results:
+            with self.__lock:
+                if not self.__results:
+                    break
+                result, error, on_done, on_error = self.__results.pop(0)
+                self.__pending -= 1
+            handed_back += 1
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    print("[WORKER ERROR] Background job failed: ", repr(error))
+            elif on_done is not None:
+                on_done(result)
+        return handed_back
+
+    def stop(self):
+        """
+        Stop the background thread once the queued jobs are done, call from OnDeInit.
+        """
+        with self.__lock:
+            self.__stopping = True
+        self.__signal()
+
+    def __signal(self):
+        try:
+            self.__wake.release()
+        except RuntimeError:
+            pass # Already signalled.
+
+    def __run(self):
+        while True:
+            with self.__lock:
+                if self.__jobs:
+                    job, args, on_done, on_error = self.__jobs.pop(0)
+                elif self.__stopping:
+                    self.__running = False
+                    return
+                else:
+                    job = None
+            if job is None:
+                self.__wake.acquire()
+                continue
+            try:
+                result, error = job(*args), None
+            except Exception as exception:
+                result, error = None, exception
+            with self.__lock:
+                self.__results.append((result, error, on_done, on_error))
@@ -0,0 +1,160 @@
+import time as midaslib_writes_time
+import midaslib.worker as midaslib_writes_worker
+
+MIDAS_WRITE_KIND_CHANNEL = 0 # index is the channel, param one of the MIDAS_WRITE_PARAM constants.
+MIDAS_WRITE_KIND_MIXER = 1 # index is the mixer track, param one of the MIDAS_WRITE_PARAM constants.
+MIDAS_WRITE_KIND_PLUGIN = 2 # index is (index, slot_index), param the plugin parameter index.
+
+MIDAS_WRITE_PARAM_VOLUME = 0
+MIDAS_WRITE_PARAM_PAN = 1
+MIDAS_WRITE_PARAM_PITCH = 2
+
+MIDAS_WRITE_DEFAULT_RATE = 60 # Flushes per second from on_idle.
+
+
+class MidasWriteScheduler:
+    """
+    Queue of parameter writes to FL Studio, only the last value of each target is written.
+
+    Knobs send a CC for every step they turn, writing each one to FL Studio makes a sweep
+    cost one setter call per CC. Apps queue the value instead, keyed by (kind, index, param):
+    a new value replaces the queued one, and on_idle writes the queue at most rate times per
+    second. release writes a target at once so the final position of a released control is
+    never late. The scheduler sits in MidasOS, so no app needs its own throttling.
+
+    Setters registered with register for the built in kinds:
+        MIDAS_WRITE_KIND_CHANNEL: channels.setChannelVolume, setChannelPan, setChannelPitch.
+        MIDAS_WRITE_KIND_MIXER: mixer.setTrackVolume, setTrackPan.
+        MIDAS_WRITE_KIND_PLUGIN: plugins.setParamValue.
+
+    Methods:
+        __init__(self, rate, clock): Initialize an empty queue.
+        register(self, kind, write): Set the function writing the targets of a kind.
+        queue(self, kind, index, param, value): Queue a value, replacing the queued value of the target.
+        get(self, kind, index, param): Get the queued value of a target.
+        has_pending(self): Check if writes are queued.
+        release(self, kind, index, param): Write the queued value of a target now.
+        flush(self): Write every queued value now.
+        discard(self): Drop every queued value.
+        on_idle(self): Write the queue if the interval of the rate elapsed.
+    """
+
+    def __init__(self, rate: float = MIDAS_WRITE_DEFAULT_RATE, clock=midaslib_writes_time.perf_counter):
+        """
+        Initialize an empty queue.
+
+        Args:
+            rate (float): Maximum flushes per second from on_idle, 0 writes on every on_idle.
+            clock: Monotonic clock returning seconds.
+        """
+        self.__interval = 1 / rate if rate > 0 else 0
+        self.__clock = clock
+        self.__last_flush = None
+        self.__writers = {}
+        self.__pending = {}
+
+    def register(self, kind: int, write):
+        """
+        Set the function writing the targets of a kind.
+
+        Args:
+            kind (int): One of the MIDAS_WRITE_KIND constants, or any key chosen by the device script.
+            write: Called with (index, param, value) for every flushed target of the kind.
+        """
+        self.__writers[kind] = write
+
+    def queue(self, kind: int, index, param: int, value) -> bool:
+        """
+        Queue a value, replacing the value queued for the same target.
+
+        Args:
+            kind (int): Kind of the target.
+            index: Channel, mixer track or plugin of the target.
+            param (int): Parameter of the target.
+            value: Value to write.
+
+        Returns:
+            bool: True if the value was queued.
+        """
+        if kind not in self.__writers:
+            print("[WRITES WARNING] No writer registered for kind ", kind, ", the value was not queued.")
+            return False
+        self.__pending[(kind, index, param)] = value
+        return True
+
+    def get(self, kind: int, index, param: int, default=None):
+        """
+        Get the queued value of a target.
+
+        Args:
+            kind (int): Kind of the target.
+            index: Channel, mixer track or plugin of the target.
+            param (int): Parameter of the target.
+            default: Returned if nothing is queued for the target.
+
+        Returns:
+            The queued value, or default.
+        """
+        return self.__pending.get((kind, index, param), default)
+
+    def has_pending(self) -> bool:
+        """
+        Check if writes are queued.
+
+        Returns:
+            bool: True if flush would write to FL Studio.
+        """
+        return bool(self.__pending)
+
+    @midaslib_writes_worker.main_thread_only
+    def release(self, kind: int, index, param: int) -> bool:
+        """
+        Write the queued value of a target now, call when its control is released.
+
+        Args:
+            kind (int): Kind of the target.
+            index: Channel, mixer track or plugin of the target.
+            param (int): Parameter of the target.
+
+        Returns:
+            bool: True if a value was written.
+        """
+        key = (kind, index, param)
+        if key not in self.__pending:
+            return False
+        self.__writers[kind](index, param, self.__pending.pop(key))
+        return True
+
+    @midaslib_writes_worker.main_thread_only
+    def flush(self) -> int:
+        """
+        Write every queued value now, one setter call per target.
+
+        Returns:
+            int: Number of values written.
+        """
+        pending = self.__pending
+        self.__pending = {}
+        for (kind, index, param), value in pending.items():
+            self.__writers[kind](index, param, value)
+        self.__last_flush = self.__clock()
+        return len(pending)
+
+    def discard(self):
+        """
+        Drop every queued value without writing it.
+        """
+        self.__pending.clear()
+
+    def on_idle(self) -> int:
+        """
+        Write the queue if the interval of the rate elapsed since the last flush, call from OnIdle.
+
+        Returns:
+            int: Number of values written.
+        """
+        if not self.__pending:
+            return 0
+        if self.__last_flush is not None and self.__clock() - self.__last_flush < self.__interval:
+            return 0
+        return self.flush()